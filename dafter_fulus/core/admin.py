@@ -2,8 +2,21 @@
 Admin configuration for the Money Tracker app.
 """
 
-from django.contrib import admin
-from .models import Account, Transaction
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.db.models import Sum
+from django.db.models.expressions import RawSQL
+
+from email_tracker.archive import reparse_raw_emails
+from email_tracker.models import RawEmail
+
+from .admin_tools import CachedValuesFieldListFilter, LargeTableAdmin
+from .models import (
+    SEARCH_TABLE, Account, AccountRollup, Bank, Branch, Counterparty, ParseBatch, ParseCacheEntry, Transaction,
+    TransactionRepository, search_expression
+)
+from .services import get_parse_executor
 
 @admin.register(Account)
 class AccountAdmin(admin.ModelAdmin):
@@ -13,11 +26,106 @@ class AccountAdmin(admin.ModelAdmin):
     list_filter = ('bank_name', 'currency')
     readonly_fields = ('created_at', 'updated_at')
 
+class TransactionActionForm(helpers.ActionForm):
+    """Action form with the category the recategorise action sets."""
+    category = forms.CharField(max_length=500, required=False, label='Category')
+
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
-    """Admin configuration for the Transaction model."""
+class TransactionAdmin(LargeTableAdmin):
+    """Admin configuration for the Transaction model, kept fast on million-row tables."""
     list_display = ('transaction_id', 'account', 'transaction_type', 'amount', 'currency', 'date_time')
+    list_select_related = ('account',)
     search_fields = ('transaction_id', 'description', 'account__account_number')
-    list_filter = ('transaction_type', 'currency', 'bank_name')
+    # No date_hierarchy: it aggregates the date of every row on each page view
+    list_filter = ('transaction_type', ('currency', CachedValuesFieldListFilter), 'bank', 'date_time')
+    # Only the default newest-id-first order is served by an index
+    sortable_by = ()
     readonly_fields = ('created_at', 'updated_at')
-    date_hierarchy = 'date_time'
\ No newline at end of file
+    # Counterparties can number in the thousands; a select of them all would be slow
+    raw_id_fields = ('bank', 'branch', 'sender', 'receiver', 'counterparty', 'from_party', 'to_party')
+    action_form = TransactionActionForm
+    actions = ('recategorize_selected', 'reparse_selected')
+
+    def get_estimated_count(self):
+        """Transaction count from the account rollups; None, so rows are counted, when there are none."""
+        return AccountRollup.objects.aggregate(total=Sum('transaction_count'))['total'] or None
+
+    def get_search_results(self, request, queryset, search_term):
+        """Match words through the full-text index and account numbers exactly, instead of LIKE scans."""
+        expression = search_expression(search_term)
+        if expression is None:
+            return queryset, False
+        matches = RawSQL(
+            f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+            f'UNION SELECT id FROM {Transaction._meta.db_table} WHERE account_id IN '
+            f'(SELECT id FROM {Account._meta.db_table} WHERE account_number = %s)',
+            [expression, search_term.strip()]
+        )
+        return queryset.filter(pk__in=matches), False
+
+    def get_deleted_objects(self, objs, request):
+        """Summarise a deletion instead of collecting and listing every row and its related objects."""
+        count = len(objs) if isinstance(objs, (list, tuple)) else objs.count()
+        name = self.opts.verbose_name_plural
+        perms_needed = set() if self.has_delete_permission(request) else {name}
+        return [f'{count} {name}'], {name: count}, perms_needed, []
+
+    def delete_queryset(self, request, queryset):
+        """Delete in one set-based pass that keeps the rollups and aggregates in step."""
+        if TransactionRepository.delete_transactions(queryset) is None:
+            self.message_user(request, 'Error deleting transactions, see the log.', messages.ERROR)
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, Transaction.objects.filter(pk=obj.pk))
+
+    @admin.action(description='Set the category of selected transactions', permissions=['change'])
+    def recategorize_selected(self, request, queryset):
+        category = request.POST.get('category', '').strip()
+        updated = TransactionRepository.recategorize_transactions(queryset, category)
+        if updated is None:
+            self.message_user(request, 'Error recategorising transactions, see the log.', messages.ERROR)
+        elif category:
+            self.message_user(request, f'Set the category of {updated} transactions to "{category}".')
+        else:
+            self.message_user(request, f'Cleared the category of {updated} transactions.')
+
+    @admin.action(description='Reparse selected transactions from their stored emails', permissions=['change'])
+    def reparse_selected(self, request, queryset):
+        totals = reparse_raw_emails(RawEmail.objects.filter(transaction__in=queryset), get_parse_executor())
+        if not totals['messages']:
+            self.message_user(request, 'None of the selected transactions has a stored email.', messages.WARNING)
+            return
+        self.message_user(
+            request,
+            f"Reparsed {totals['messages']} emails: {totals['updated']} transactions updated, "
+            f"{totals['created']} created, {totals['errors']} errors."
+        )
+
+@admin.register(Bank, Branch, Counterparty)
+class DimensionAdmin(admin.ModelAdmin):
+    """Admin configuration for the interned name models; names are indexed for search, so read-only."""
+    list_display = ('name', 'key')
+    search_fields = ('name',)
+    readonly_fields = ('name', 'key')
+
+@admin.register(AccountRollup)
+class AccountRollupAdmin(admin.ModelAdmin):
+    """Admin configuration for the AccountRollup model."""
+    list_display = ('account', 'currency', 'transaction_count', 'net_balance', 'last_transaction_at')
+    list_filter = ('currency',)
+    readonly_fields = [field.name for field in AccountRollup._meta.fields]
+
+@admin.register(ParseCacheEntry)
+class ParseCacheEntryAdmin(LargeTableAdmin):
+    """Admin configuration for the ParseCacheEntry model."""
+    list_display = ('key', 'parser_version', 'transaction', 'hits', 'last_used_at')
+    list_select_related = ('transaction',)
+    list_filter = (('parser_version', CachedValuesFieldListFilter),)
+    readonly_fields = [field.name for field in ParseCacheEntry._meta.fields]
+
+@admin.register(ParseBatch)
+class ParseBatchAdmin(admin.ModelAdmin):
+    """Admin configuration for the ParseBatch model."""
+    list_display = ('id', 'source', 'message_count', 'parsed_count', 'error_count', 'saved_count', 'created_at')
+    list_filter = ('source',)
+    readonly_fields = [field.name for field in ParseBatch._meta.fields]
@@ -0,0 +1,80 @@
+"""
+Admin building blocks for tables too large to count, scan or sort per page view.
+
+A stock changelist counts every matching row (twice, with the unfiltered
+total), builds filter choices with DISTINCT scans and, with date_hierarchy,
+aggregates the date column of the whole table. LargeTableAdmin replaces
+those with bounded or cached queries.
+"""
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.utils.functional import cached_property
+
+
+class CappedCountPaginator(Paginator):
+    """
+    Paginator that never counts more than ADMIN_COUNT_LIMIT rows.
+
+    An unfiltered list takes its size from ``estimated_count`` when one is
+    given. A filtered list counts up to the limit, so page links stop there;
+    narrowing the filters reaches the rest.
+    """
+
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True,
+                 estimated_count=None, limit=None):
+        """
+        Args:
+            estimated_count (callable): Returns the row count of the unfiltered
+                table without scanning it, or None when it cannot.
+            limit (int): Rows counted at most (default: ADMIN_COUNT_LIMIT).
+        """
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        self.estimated_count = estimated_count
+        self.limit = limit or settings.ADMIN_COUNT_LIMIT
+
+    @cached_property
+    def count(self):
+        if self.estimated_count is not None and not self.object_list.query.has_filters():
+            estimate = self.estimated_count()
+            if estimate is not None:
+                return estimate
+        return self.object_list.order_by()[:self.limit].count()
+
+
+class CachedValuesFieldListFilter(admin.AllValuesFieldListFilter):
+    """AllValuesFieldListFilter whose distinct values are cached for ADMIN_FILTER_CACHE_SECONDS."""
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        key = f'admin_filter_choices:{model._meta.label_lower}:{field_path}'
+        choices = cache.get(key)
+        if choices is None:
+            choices = list(self.lookup_choices)
+            cache.set(key, choices, settings.ADMIN_FILTER_CACHE_SECONDS)
+        self.lookup_choices = choices
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    ModelAdmin for large tables: capped counts, no facet or full-result counts.
+
+    Subclasses should also join the foreign keys they display with
+    list_select_related, filter with choices that cost no scan (field choices,
+    small related tables or CachedValuesFieldListFilter), search through an
+    index, and avoid date_hierarchy.
+    """
+    paginator = CappedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    def get_estimated_count(self):
+        """Row count of the unfiltered table if something cheaper than COUNT(*) knows it, else None."""
+        return None
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        return self.paginator(
+            queryset, per_page, orphans, allow_empty_first_page, estimated_count=self.get_estimated_count
+        )
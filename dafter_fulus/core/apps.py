@@ -3,10 +3,21 @@ Django app configuration for Money Tracker.
 """
 
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
 
 
 class MoneyTrackerAppConfig(AppConfig):
     """Configuration for the Money Tracker app."""
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'money_tracker_app'
-    verbose_name = 'Money Tracker'
\ No newline at end of file
+    verbose_name = 'Money Tracker'
+
+    def ready(self):
+        from .database import configure_sqlite
+        from .dimensions import clear_resolvers
+        from .services import warm_services
+
+        connection_created.connect(configure_sqlite, dispatch_uid='money_tracker_configure_sqlite')
+        post_migrate.connect(clear_resolvers, dispatch_uid='money_tracker_clear_resolvers')
+        warm_services()
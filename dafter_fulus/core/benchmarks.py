@@ -0,0 +1,331 @@
+"""
+Benchmark suite for parsing, ingestion and the account pages.
+
+run_benchmarks() measures the current database, so it is meant to run on a
+scratch database (the run_benchmarks command creates one). Results are a flat
+mapping of benchmark name to timings, suitable for storing as JSON and
+comparing against a baseline with compare_results().
+"""
+
+import gc
+import logging
+import statistics
+import threading
+import time
+
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from .ingest import ingest_emails
+from .models import Account, Transaction, TransactionRepository
+from .parsing import RuleBasedParser
+from .synthetic import account_numbers, generate_emails, generate_transactions
+from .write_queue import get_write_queue
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+POPULATE_BATCH_SIZE = 5000
+
+
+def _timing(ops, samples):
+    """Summarise per-repeat wall times of ``ops`` operations each."""
+    seconds = statistics.median(samples)
+    return {
+        'ops': ops,
+        'repeats': len(samples),
+        'seconds': seconds,
+        'ms_per_op': seconds / ops * 1000 if ops else 0.0,
+        'ops_per_second': ops / seconds if seconds else 0.0,
+        'best_ms_per_op': min(samples) / ops * 1000 if ops else 0.0,
+    }
+
+
+def measure(fn, ops=1, repeat=5, setup=None):
+    """
+    Time a callable, returning the median of several repeats.
+
+    Args:
+        fn (callable): Work to time; called with no arguments.
+        ops (int): Operations performed by one call, to derive rates.
+        repeat (int): Number of timed calls.
+        setup (callable): Called before each timed call, untimed.
+
+    Returns:
+        dict: ops, repeats, seconds, ms_per_op, ops_per_second and best_ms_per_op.
+    """
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        began = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - began)
+    return _timing(ops, samples)
+
+
+def _fallback_parser():
+    """The external TransactionParser, or None when it cannot be imported."""
+    try:
+        from . import path_setup  # noqa: F401
+        from money_tracker.services.parser_service import TransactionParser
+    except ImportError:
+        return None
+    return TransactionParser()
+
+
+def bench_parsing(count, repeat):
+    """Parse throughput of the rule-based parser and of the fallback TransactionParser."""
+    emails = list(generate_emails(count, seed=1, noise=0.05))
+    results = {}
+    rule_parser = RuleBasedParser()
+    results['parse.rule_based'] = measure(
+        lambda: [rule_parser.parse_email(email_data) for email_data in emails], ops=count, repeat=repeat
+    )
+
+    fallback = _fallback_parser()
+    if fallback is not None:
+        def parse_with_fallback():
+            for email_data in emails:
+                try:
+                    fallback.parse_email(email_data)
+                except Exception:
+                    pass
+        results['parse.transaction_parser'] = measure(parse_with_fallback, ops=count, repeat=repeat)
+        default_parser = RuleBasedParser(fallback=fallback)
+        results['parse.default'] = measure(
+            lambda: [default_parser.parse_email(email_data) for email_data in emails], ops=count, repeat=repeat
+        )
+    return results
+
+
+def bench_writes(create_count, ingest_count, repeat):
+    """Rates of single-row creates and batched email ingestion, each starting from an empty table."""
+    parsed = [
+        RuleBasedParser().parse_email(email_data)
+        for email_data in generate_emails(create_count, seed=2)
+    ]
+    emails = list(generate_emails(ingest_count, seed=3, noise=0.05))
+    parser = RuleBasedParser()
+
+    def clear():
+        Transaction.objects.all().delete()
+        TransactionRepository.rebuild_rollups()
+        TransactionRepository.rebuild_period_aggregates()
+
+    return {
+        'write.create_transaction': measure(
+            lambda: [TransactionRepository.create_transaction(data) for data in parsed],
+            ops=create_count, repeat=repeat, setup=clear
+        ),
+        'write.ingest_emails': measure(
+            lambda: ingest_emails(emails, parser), ops=ingest_count, repeat=repeat, setup=clear
+        ),
+    }
+
+
+def populate(size, accounts=5, progress=None):
+    """
+    Fill the transaction table with synthetic rows up to ``size`` rows.
+
+    Rows are inserted directly, then the rollups and period aggregates are
+    rebuilt once, so large sizes take seconds rather than hours.
+
+    Args:
+        size (int): Target number of transactions.
+        accounts (int): Number of accounts to spread the rows over.
+        progress (callable): Called with the row count after each batch.
+
+    Returns:
+        list: The accounts, ordered by account number.
+    """
+    existing = {account.account_number: account for account in Account.objects.all()}
+    for number in account_numbers(accounts):
+        if number not in existing:
+            existing[number] = Account.objects.create(account_number=number, bank_name='Bank Muscat')
+    account_list = [existing[number] for number in account_numbers(accounts)]
+
+    current = Transaction.objects.count()
+    while current < size:
+        count = min(POPULATE_BATCH_SIZE, size - current)
+        Transaction.objects.bulk_create(generate_transactions(account_list, count, offset=current))
+        current += count
+        if progress:
+            progress(current)
+    TransactionRepository.rebuild_rollups()
+    TransactionRepository.rebuild_period_aggregates()
+    return account_list
+
+
+def bench_reads(size, repeat, accounts=5):
+    """Latency of the account summary and the account pages at one table size."""
+    account_list = populate(size, accounts)
+    account_number = account_list[0].account_number
+    client = Client()
+    accounts_url = reverse('accounts')
+    details_url = reverse('account_details', args=[account_number])
+
+    def get(url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {response.status_code}")
+
+    get(accounts_url)
+    return {
+        f'read.get_account_summary@{size}': measure(
+            lambda: TransactionRepository.get_account_summary(account_number), repeat=repeat * 4
+        ),
+        f'read.accounts_view@{size}': measure(lambda: get(accounts_url), repeat=repeat),
+        f'read.account_details_view@{size}': measure(lambda: get(details_url), repeat=repeat),
+    }
+
+
+def _mixed_load(seconds, readers, writers, account_number, label):
+    """Run reader and writer threads for ``seconds``, returning per-kind operation and error counts."""
+    stop = threading.Event()
+    counts = {'reads': [0] * readers, 'writes': [0] * writers, 'errors': [0] * (readers + writers)}
+    details_url = reverse('account_details', args=[account_number])
+
+    def read(index):
+        client = Client()
+        try:
+            while not stop.is_set():
+                if client.get(details_url).status_code == 200:
+                    counts['reads'][index] += 1
+                else:
+                    counts['errors'][index] += 1
+        finally:
+            connection.close()
+
+    def write(index):
+        sequence = 0
+        try:
+            while not stop.is_set():
+                sequence += 1
+                transaction = TransactionRepository.create_transaction({
+                    'account_number': account_number,
+                    'transaction_type': 'expense',
+                    'amount': '1.250',
+                    'transaction_id': f'MIX-{label}-{index}-{sequence}',
+                })
+                if transaction is None:
+                    counts['errors'][readers + index] += 1
+                else:
+                    counts['writes'][index] += 1
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=read, args=(index,)) for index in range(readers)]
+    threads += [threading.Thread(target=write, args=(index,)) for index in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {kind: sum(values) for kind, values in counts.items()}
+
+
+def bench_mixed_load(seconds, readers=4, writers=4, size=10_000):
+    """
+    Read and write throughput with page views and single-row writes running concurrently.
+
+    Runs once with writes made directly by the writer threads and once through
+    the write queue. Needs a database the threads can share, i.e. not an
+    in-memory test database inside a TestCase.
+
+    Args:
+        seconds (float): Duration of each run.
+        readers (int): Threads requesting the account_details page.
+        writers (int): Threads creating transactions one at a time.
+        size (int): Transactions in the table before the runs.
+
+    Returns:
+        dict: Benchmark name to timings, each with an extra ``errors`` count.
+    """
+    account_number = populate(size)[0].account_number
+    results = {}
+    for label, queued in (('direct', False), ('queued', True)):
+        with override_settings(WRITE_QUEUE_ENABLED=queued):
+            counts = _mixed_load(seconds, readers, writers, account_number, label)
+        # Closes the writer thread's connection before the database goes away
+        get_write_queue().stop()
+        for kind, threads in (('reads', readers), ('writes', writers)):
+            if not threads:
+                continue
+            results[f'mixed.{kind}.{label}@{readers}r{writers}w'] = dict(
+                _timing(counts[kind], [seconds]), errors=counts['errors']
+            )
+    return results
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, parse_count=5000, create_count=500, ingest_count=5000, repeat=5,
+                   mixed_seconds=0, mixed_threads=(4, 4), progress=None):
+    """
+    Run the whole suite against the current database.
+
+    The database is modified: write benchmarks empty the transaction table,
+    and read benchmarks fill it up to each size in turn.
+
+    Args:
+        sizes (list): Transaction table sizes for the read benchmarks.
+        parse_count (int): Emails parsed per parse repeat.
+        create_count (int): Transactions created one at a time per repeat.
+        ingest_count (int): Emails ingested per repeat.
+        repeat (int): Timed repeats per benchmark.
+        mixed_seconds (float): Duration of each mixed read/write run; 0 skips them.
+        mixed_threads (tuple): Reader and writer threads of the mixed runs.
+        progress (callable): Called with the name of each stage as it starts.
+
+    Returns:
+        dict: Benchmark name to timings (see measure).
+    """
+    def stage(name):
+        if progress:
+            progress(name)
+        logger.info(f"Benchmark stage: {name}")
+
+    results = {}
+    stage('parsing')
+    results.update(bench_parsing(parse_count, repeat))
+    stage('writes')
+    results.update(bench_writes(create_count, ingest_count, repeat))
+    Transaction.objects.all().delete()
+    for size in sorted(sizes):
+        stage(f'reads at {size:,} transactions')
+        results.update(bench_reads(size, repeat))
+    if mixed_seconds:
+        stage('mixed read/write load')
+        results.update(bench_mixed_load(mixed_seconds, *mixed_threads))
+    return results
+
+
+def compare_results(results, baseline, threshold=0.2):
+    """
+    Compare results with a baseline run.
+
+    Args:
+        results (dict): Current results.
+        baseline (dict): Results of the baseline run.
+        threshold (float): Relative slowdown in ms_per_op counted as a regression.
+
+    Returns:
+        list: Dicts with name, baseline_ms, current_ms, change (relative, positive
+        is slower) and regressed, for benchmarks present in both runs.
+    """
+    rows = []
+    for name in sorted(results.keys() & baseline.keys()):
+        before = baseline[name]['ms_per_op']
+        after = results[name]['ms_per_op']
+        change = (after - before) / before if before else 0.0
+        rows.append({
+            'name': name,
+            'baseline_ms': before,
+            'current_ms': after,
+            'change': change,
+            'regressed': change > threshold,
+        })
+    return rows
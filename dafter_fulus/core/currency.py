@@ -0,0 +1,104 @@
+"""
+Currency minor units.
+
+Amounts are stored as integers in the currency's minor unit (baisa for OMR,
+cents for USD), so totals are exact integer sums in the database. These
+helpers convert at the edges: parsed amounts on the way in, Decimals for
+display on the way out.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+# ISO 4217 minor-unit exponents of the currencies seen in bank alerts
+CURRENCY_EXPONENTS = {
+    'OMR': 3,
+    'BHD': 3,
+    'KWD': 3,
+    'JOD': 3,
+    'IQD': 3,
+    'TND': 3,
+    'LYD': 3,
+    'AED': 2,
+    'SAR': 2,
+    'QAR': 2,
+    'EGP': 2,
+    'USD': 2,
+    'EUR': 2,
+    'GBP': 2,
+    'INR': 2,
+    'PKR': 2,
+    'PHP': 2,
+    'LKR': 2,
+    'BDT': 2,
+    'CHF': 2,
+    'CNY': 2,
+    'AUD': 2,
+    'CAD': 2,
+    'SGD': 2,
+    'MYR': 2,
+    'THB': 2,
+    'TRY': 2,
+    'JPY': 0,
+    'KRW': 0,
+    'VND': 0,
+    'IDR': 2,
+}
+
+# Exponent assumed for currencies missing from the table
+DEFAULT_EXPONENT = 2
+
+
+def currency_exponent(currency):
+    """
+    Return the number of minor-unit digits of a currency.
+
+    Args:
+        currency (str): ISO 4217 code.
+
+    Returns:
+        int: Exponent, DEFAULT_EXPONENT for unknown codes.
+    """
+    return CURRENCY_EXPONENTS.get((currency or '').upper(), DEFAULT_EXPONENT)
+
+
+def to_minor_units(amount, currency):
+    """
+    Convert an amount in major units to an integer of minor units.
+
+    Floats are converted through their shortest repr, so a parsed 12.345
+    becomes exactly 12345 baisa; amounts with more digits than the currency
+    allows are rounded half up.
+
+    Args:
+        amount (int, float, str or Decimal): Amount in major units; None is 0.
+        currency (str): ISO 4217 code.
+
+    Returns:
+        int: Amount in minor units.
+
+    Raises:
+        ValueError: If the amount is not a finite number.
+    """
+    if amount is None:
+        return 0
+    try:
+        value = Decimal(str(amount).replace(',', '')) if not isinstance(amount, Decimal) else amount
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {amount!r}")
+    if not value.is_finite():
+        raise ValueError(f"Invalid amount: {amount!r}")
+    return int(value.scaleb(currency_exponent(currency)).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_minor_units(value, currency):
+    """
+    Convert an integer of minor units to a Decimal in major units.
+
+    Args:
+        value (int): Amount in minor units; None is 0.
+        currency (str): ISO 4217 code.
+
+    Returns:
+        Decimal: Amount with exactly the currency's number of decimal places.
+    """
+    return Decimal(value or 0).scaleb(-currency_exponent(currency))
@@ -0,0 +1,33 @@
+"""
+Per-connection SQLite configuration.
+"""
+
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Apply SQLITE_PRAGMAS to a new SQLite connection.
+
+    Connected to the connection_created signal in the app config. With
+    persistent connections this runs once per connection, not per request.
+
+    Args:
+        sender: Database backend class.
+        connection: The new DatabaseWrapper.
+    """
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        if 'journal_mode' in settings.SQLITE_PRAGMAS:
+            cursor.execute('PRAGMA journal_mode')
+            mode = cursor.fetchone()[0]
+            # In-memory databases (tests) cannot use WAL and silently keep their mode
+            if mode.lower() != str(settings.SQLITE_PRAGMAS['journal_mode']).lower():
+                logger.warning(f"SQLite journal_mode is {mode}, not {settings.SQLITE_PRAGMAS['journal_mode']}")
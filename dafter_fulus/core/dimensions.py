@@ -0,0 +1,158 @@
+"""
+Interned names: banks, branches and counterparties stored once and referenced by id.
+
+Transactions repeat the same few hundred names across millions of rows, so
+each name lives in a dimension table (see the Dimension models) under a key
+normalised for case and whitespace, and transactions hold a foreign key.
+
+Ingestion resolves names through one DimensionResolver per dimension: an
+in-process LRU of key to id in front of the table. Misses are looked up, and
+the ones still missing inserted, with one query per chunk. Ids are only
+cached once the transaction that read or created them commits, so a rolled
+back insert never leaves a dangling id in the cache.
+"""
+
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import transaction as db_transaction
+
+# SQLite allows 999 variables per statement in older builds
+LOOKUP_CHUNK_SIZE = 500
+
+_resolvers = {}
+_resolvers_lock = threading.Lock()
+
+
+def normalize_name(value):
+    """
+    Dimension key of a name: whitespace runs collapsed to one space and case folded.
+
+    Args:
+        value (str): Name as parsed; may be None.
+
+    Returns:
+        str: Key, or '' when the name is empty.
+    """
+    if not value:
+        return ''
+    return ' '.join(str(value).split()).casefold()
+
+
+class DimensionResolver:
+    """
+    Resolve names to ids of one dimension model, creating missing rows.
+
+    ``stats`` counts cache hits and misses over the life of the object.
+    """
+
+    def __init__(self, model, max_size=None):
+        """
+        Args:
+            model: Dimension model with ``name`` and unique ``key`` fields.
+            max_size (int): Keys kept in the cache (default: DIMENSION_CACHE_SIZE).
+        """
+        self.model = model
+        self.max_size = max_size or settings.DIMENSION_CACHE_SIZE
+        self.stats = {'hits': 0, 'misses': 0}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resolve(self, name):
+        """
+        Resolve one name.
+
+        Args:
+            name (str): Name as parsed; may be None.
+
+        Returns:
+            int: Id of the dimension row, or None for an empty name.
+        """
+        return self.resolve_many([name]).get(normalize_name(name))
+
+    def resolve_many(self, names):
+        """
+        Resolve a batch of names.
+
+        The first spelling seen of a key becomes the stored name.
+
+        Args:
+            names (iterable): Names as parsed; empty ones are skipped.
+
+        Returns:
+            dict: Key to id for every non-empty name.
+        """
+        spellings = {}
+        for name in names:
+            key = normalize_name(name)
+            if key and key not in spellings:
+                spellings[key] = ' '.join(str(name).split())
+
+        ids = {}
+        with self._lock:
+            for key in spellings:
+                pk = self._cache.get(key)
+                if pk is not None:
+                    self._cache.move_to_end(key)
+                    ids[key] = pk
+            self.stats['hits'] += len(ids)
+            self.stats['misses'] += len(spellings) - len(ids)
+
+        missing = [key for key in spellings if key not in ids]
+        if not missing:
+            return ids
+
+        found = {}
+        for chunk in _chunks(missing, LOOKUP_CHUNK_SIZE):
+            found.update(self.model.objects.filter(key__in=chunk).values_list('key', 'pk'))
+            new = [key for key in chunk if key not in found]
+            if new:
+                # Another writer may insert the same keys meanwhile; read back whichever row won
+                self.model.objects.bulk_create(
+                    [self.model(key=key, name=spellings[key]) for key in new], ignore_conflicts=True
+                )
+                found.update(self.model.objects.filter(key__in=new).values_list('key', 'pk'))
+
+        db_transaction.on_commit(lambda: self._remember(found))
+        ids.update(found)
+        return ids
+
+    def clear(self):
+        """Forget every cached id, e.g. after dimension rows were deleted."""
+        with self._lock:
+            self._cache.clear()
+
+    def _remember(self, found):
+        with self._lock:
+            self._cache.update(found)
+            for key in found:
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def clear_resolvers(**kwargs):
+    """
+    Empty every resolver cache.
+
+    Connected to post_migrate in the app config: flush and migrate may delete
+    the dimension rows cached ids point to.
+    """
+    with _resolvers_lock:
+        resolvers = list(_resolvers.values())
+    for resolver in resolvers:
+        resolver.clear()
+
+
+def get_resolver(model):
+    """The process-wide DimensionResolver of a dimension model, created on first use."""
+    with _resolvers_lock:
+        if model not in _resolvers:
+            _resolvers[model] = DimensionResolver(model)
+        return _resolvers[model]
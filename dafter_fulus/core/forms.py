@@ -3,11 +3,16 @@ Forms for the Money Tracker app.
 """
 
 from django import forms
+from django.conf import settings
 
 class EmailContentForm(forms.Form):
     """Form for pasting email content."""
     source = forms.ChoiceField(
-        choices=[('paste', 'Paste Email Content'), ('upload', 'Upload Email File')],
+        choices=[
+            ('paste', 'Paste Email Content'),
+            ('upload', 'Upload Email File'),
+            ('archive', 'Import Mailbox Archive (.mbox or .zip of .eml files)')
+        ],
         widget=forms.RadioSelect,
         initial='paste'
     )
@@ -43,8 +48,15 @@ class EmailContentForm(forms.Form):
 
         if source == 'paste' and not email_content:
             self.add_error('email_content', 'Please paste email content')
-        elif source == 'upload' and not email_file:
+        elif source in ('upload', 'archive') and not email_file:
             self.add_error('email_file', 'Please upload an email file')
+        elif source == 'archive' and email_file.size > settings.IMPORT_UPLOAD_MAX_BYTES:
+            # The import runs inside the request; large archives go through the management command
+            self.add_error(
+                'email_file',
+                f'Archives over {settings.IMPORT_UPLOAD_MAX_BYTES // (1024 * 1024)} MB must be imported '
+                f'with "manage.py import_emails"'
+            )
 
         return cleaned_data
 
@@ -96,4 +108,67 @@ class EmailFetchForm(forms.Form):
         required=False,
         initial=True,
         widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
-    )
\ No newline at end of file
+    )
+
+class TransactionExportForm(forms.Form):
+    """Form for exporting the transactions of an account."""
+    start_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    end_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    format = forms.ChoiceField(
+        choices=[('csv', 'CSV'), ('jsonl', 'JSON Lines')],
+        initial='csv',
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    gzip = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+
+        if start_date and end_date and start_date > end_date:
+            self.add_error('end_date', 'End date must not be before start date')
+
+        return cleaned_data
+
+class TransactionSearchForm(forms.Form):
+    """Form for searching transactions."""
+    q = forms.CharField(
+        max_length=200,
+        required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Description, counterparty, branch or reference'})
+    )
+    account = forms.CharField(
+        max_length=50,
+        required=False,
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Any account'})
+    )
+    start_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+    end_date = forms.DateField(
+        required=False,
+        widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+
+        if start_date and end_date and start_date > end_date:
+            self.add_error('end_date', 'End date must not be before start date')
+
+        return cleaned_data
+
@@ -0,0 +1,160 @@
+"""
+Shared pipeline that parses batches of emails and stores their transactions.
+"""
+
+import logging
+
+from .metrics import timed
+from .models import IngestOutcome, TransactionRepository
+from .parse_cache import with_message_fields
+from .parsing import parse_safely
+
+logger = logging.getLogger(__name__)
+
+
+def _parse(parser, emails):
+    """Parse with a ParseExecutor, or one email at a time with a plain parser."""
+    if hasattr(parser, 'parse_many'):
+        return parser.parse_many(emails)
+    return [parse_safely(parser, email_data) for email_data in emails]
+
+
+def parse_emails(emails, parser, cache=None):
+    """
+    Parse a batch of emails, answering repeats from the parse cache.
+
+    Emails with the same content are parsed once per batch. The cache is
+    skipped when the parser does not report a ``version``.
+
+    Args:
+        emails (list): Email data dicts.
+        parser: ParseExecutor, or any object with ``parse_email(email_data)``.
+        cache (ParseCache): Parse cache, or None to parse everything.
+
+    Returns:
+        list: One dict per email, in input order, with ``transaction`` (dict
+        or None), ``error`` (str or None), ``key`` (cache key or None),
+        ``cached`` (bool) and ``stored_id`` (primary key of the transaction
+        already saved for this content, or None).
+    """
+    emails = list(emails)
+    version = getattr(parser, 'version', None)
+    if cache is None or version is None:
+        return [
+            dict(result, key=None, cached=False, stored_id=None)
+            for result in _parse(parser, emails)
+        ]
+
+    keys, entries = cache.lookup(emails, version)
+    results = [None] * len(emails)
+    misses = {}
+    for index, (email_data, key) in enumerate(zip(emails, keys)):
+        entry = entries.get(key)
+        if entry is None:
+            misses.setdefault(key, []).append(index)
+            continue
+        results[index] = {
+            'transaction': cache.restore(entry, email_data),
+            'error': None,
+            'key': key,
+            'cached': True,
+            'stored_id': entry.transaction_id
+        }
+
+    parsed = _parse(parser, [emails[indexes[0]] for indexes in misses.values()])
+    cache.store(version, [(key, result['transaction']) for key, result in zip(misses, parsed) if not result['error']])
+
+    for (key, indexes), result in zip(misses.items(), parsed):
+        for position, index in enumerate(indexes):
+            transaction_data = result['transaction']
+            if position:
+                transaction_data = with_message_fields(transaction_data, emails[index])
+            results[index] = dict(result, transaction=transaction_data, key=key, cached=False, stored_id=None)
+    return results
+
+
+def ingest_emails(emails, parser, cache=None, save=True, upsert=False, existing_ids=None):
+    """
+    Parse a batch of emails and store the transactions found.
+
+    Transactions the parse cache already links to a stored row are counted
+    as duplicates without querying for them; newly stored rows are linked
+    so that the next copy of the email is skipped the same way. With
+    ``upsert``, existing rows are overwritten with the new parse instead.
+
+    Args:
+        emails (list): Email data dicts.
+        parser: ParseExecutor, or any object with ``parse_email(email_data)``.
+        cache (ParseCache): Parse cache, or None to parse everything.
+        save (bool): Store the parsed transactions.
+        upsert (bool): Update existing transactions instead of skipping them.
+        existing_ids (list): With upsert, the primary key of the transaction
+            each email produced before, or None; aligned with emails.
+
+    Returns:
+        dict: ``results`` (as returned by parse_emails, with ``stored_id``
+        set for every stored transaction and, when saving, ``outcome`` set to
+        the IngestOutcome of every parsed one) plus counts of messages,
+        parsed, errors, created, duplicates, updated, hits and misses.
+    """
+    emails = list(emails)
+    with timed('parse'):
+        results = parse_emails(emails, parser, cache)
+    stats = {
+        'results': results,
+        'messages': len(results),
+        'parsed': sum(1 for result in results if result['transaction']),
+        'errors': 0,
+        'created': 0,
+        'duplicates': 0,
+        'updated': 0,
+        'hits': sum(1 for result in results if result['cached']),
+        'misses': sum(1 for result in results if result['key'] and not result['cached']),
+    }
+    for email_data, result in zip(emails, results):
+        if result['error']:
+            stats['errors'] += 1
+            logger.error(f"Error parsing email {email_data.get('id')}: {result['error']}")
+
+    if not save or not stats['parsed']:
+        return stats
+
+    with timed('db_persist'):
+        if upsert:
+            existing_ids = list(existing_ids or [None] * len(results))
+            pending = [
+                (result, existing_id or result['stored_id'])
+                for result, existing_id in zip(results, existing_ids) if result['transaction']
+            ]
+            outcomes = TransactionRepository.upsert_transactions(
+                [result['transaction'] for result, _ in pending],
+                [existing_id for _, existing_id in pending]
+            )
+        else:
+            for result in results:
+                if result['transaction'] and result['stored_id']:
+                    result['outcome'] = IngestOutcome.DUPLICATE
+                    stats['duplicates'] += 1
+            pending = [(result, None) for result in results if result['transaction'] and not result['stored_id']]
+            outcomes = TransactionRepository.bulk_create_transactions(
+                result['transaction'] for result, _ in pending
+            )
+
+    links = {}
+    for (result, _), outcome in zip(pending, outcomes):
+        result['outcome'] = outcome['status']
+        if outcome['status'] == IngestOutcome.CREATED:
+            stats['created'] += 1
+        elif outcome['status'] == IngestOutcome.DUPLICATE:
+            stats['duplicates'] += 1
+        elif outcome['status'] == IngestOutcome.UPDATED:
+            stats['updated'] += 1
+        else:
+            continue
+        result['stored_id'] = outcome['transaction'].pk
+        if result['key']:
+            links[result['key']] = result['stored_id']
+
+    if cache is not None and links:
+        cache.link(links)
+    return stats
@@ -0,0 +1,201 @@
+"""
+Management command comparing transaction lookup and insert costs with and
+without the composite indexes and the (account, transaction_id) constraint.
+"""
+
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from ...models import Account, Bank, Branch, Counterparty, Transaction
+
+INSERT_COLUMNS = (
+    'account_id', 'transaction_type', 'amount_minor', 'currency', 'date_time',
+    'description', 'transaction_id', 'email_id', 'created_at', 'updated_at'
+)
+
+TRANSACTION_TYPES = ('income', 'expense', 'transfer')
+
+
+class Command(BaseCommand):
+    """Benchmark the transaction table on a synthetic SQLite database."""
+    help = 'Measure transaction lookup and insert costs before and after the indexes on a large table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help='Rows in the synthetic table.')
+        parser.add_argument('--accounts', type=int, default=20, help='Number of accounts the rows are spread over.')
+        parser.add_argument('--lookups', type=int, default=200, help='Point lookups per measurement.')
+        parser.add_argument('--inserts', type=int, default=2000, help='Rows inserted per insert measurement.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows per insert transaction.')
+        parser.add_argument('--workdir', help='Directory for the scratch databases (default: a temporary directory).')
+        parser.add_argument('--output', help='Write the results as JSON to this path.')
+
+    def handle(self, *args, **options):
+        workdir = options['workdir'] or tempfile.mkdtemp(prefix='txn-bench-')
+        os.makedirs(workdir, exist_ok=True)
+        cleanup = not options['workdir']
+        table = Transaction._meta.db_table
+        random.seed(42)
+
+        create_tables, create_indexes = self._schema_sql()
+        base_path = os.path.join(workdir, 'base.db')
+        if os.path.exists(base_path):
+            os.remove(base_path)
+
+        self.stdout.write(f"Populating {options['rows']:,} rows in {base_path}")
+        started = time.perf_counter()
+        db = sqlite3.connect(base_path)
+        for statement in create_tables:
+            db.execute(statement)
+        self._populate(db, table, options['rows'], options['accounts'])
+        db.close()
+        self.stdout.write(f"Populated in {time.perf_counter() - started:.1f}s")
+
+        schemas = {
+            # The original schema only had the implicit foreign key index
+            'before': [f'CREATE INDEX "bench_account_id_idx" ON "{table}" ("account_id")'],
+            'after': create_indexes,
+        }
+        results = {}
+        for name, statements in schemas.items():
+            path = os.path.join(workdir, f'{name}.db')
+            shutil.copyfile(base_path, path)
+            db = sqlite3.connect(path)
+            for statement in statements:
+                db.execute(statement)
+            db.execute('ANALYZE')
+            db.commit()
+            results[name] = self._measure(db, table, name == 'after', options)
+            db.close()
+            os.remove(path)
+        os.remove(base_path)
+        if cleanup:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self._report(results)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({'options': {k: options[k] for k in ('rows', 'accounts', 'lookups', 'inserts', 'batch_size')},
+                           'results': results}, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def _schema_sql(self):
+        """Return (CREATE TABLE statements, index and constraint statements) for the current models."""
+        with connection.schema_editor(collect_sql=True, atomic=False) as editor:
+            for model in (Account, Bank, Branch, Counterparty, Transaction):
+                editor.create_model(model)
+        statements = [statement.rstrip(';') for statement in editor.collected_sql]
+        tables = [statement for statement in statements if statement.startswith('CREATE TABLE')]
+        indexes = [statement for statement in statements if not statement.startswith('CREATE TABLE')]
+        return tables, indexes
+
+    def _populate(self, db, table, rows, accounts):
+        """Fill the account and transaction tables with synthetic data."""
+        now = datetime(2024, 1, 1).isoformat(sep=' ')
+        db.executemany(
+            f'INSERT INTO "{Account._meta.db_table}" (id, account_number, bank_name, balance_minor, currency, '
+            'created_at, updated_at) VALUES (?, ?, ?, 0, ?, ?, ?)',
+            [(i, f'ACC{i:06d}', 'Bank Muscat', 'OMR', now, now) for i in range(1, accounts + 1)]
+        )
+        sql = f'INSERT INTO "{table}" ({", ".join(INSERT_COLUMNS)}) VALUES ({", ".join("?" * len(INSERT_COLUMNS))})'
+        start = datetime(2015, 1, 1)
+        chunk = 50_000
+        for offset in range(0, rows, chunk):
+            db.executemany(sql, (self._row(i, accounts, start, now) for i in range(offset, min(offset + chunk, rows))))
+            db.commit()
+
+    @staticmethod
+    def _row(i, accounts, start, now):
+        """Build the values of synthetic transaction ``i``."""
+        return (
+            i % accounts + 1,
+            TRANSACTION_TYPES[i % 3],
+            random.randrange(100, 500_000),
+            'OMR',
+            (start + timedelta(minutes=5 * i)).isoformat(sep=' '),
+            'Synthetic transaction',
+            f'TXN{i:010d}',
+            f'<msg-{i}@bank.example>',
+            now,
+            now,
+        )
+
+    def _measure(self, db, table, conflict_ignoring, options):
+        """Time the hot queries and inserts on one database."""
+        rows, accounts, lookups = options['rows'], options['accounts'], options['lookups']
+        start = datetime(2015, 1, 1)
+        samples = [random.randrange(rows) for _ in range(lookups)]
+        results = {}
+
+        def timed(label, count, fn):
+            began = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - began
+            results[label] = {'ops': count, 'seconds': elapsed, 'us_per_op': elapsed / count * 1e6}
+
+        timed('duplicate_lookup', lookups, lambda: [
+            db.execute(f'SELECT id FROM "{table}" WHERE account_id = ? AND transaction_id = ?',
+                       (i % accounts + 1, f'TXN{i:010d}')).fetchone()
+            for i in samples
+        ])
+        timed('email_id_lookup', lookups, lambda: [
+            db.execute(f'SELECT id FROM "{table}" WHERE email_id = ?', (f'<msg-{i}@bank.example>',)).fetchone()
+            for i in samples
+        ])
+        range_samples = samples[:max(1, lookups // 10)]
+        timed('date_range_page', len(range_samples), lambda: [
+            db.execute(
+                f'SELECT id, date_time, amount_minor FROM "{table}" WHERE account_id = ? '
+                'AND date_time >= ? AND date_time <= ? ORDER BY date_time DESC LIMIT 50',
+                (i % accounts + 1, (start + timedelta(minutes=5 * i)).isoformat(sep=' '),
+                 (start + timedelta(minutes=5 * i, days=90)).isoformat(sep=' '))
+            ).fetchall()
+            for i in range_samples
+        ])
+
+        # Insert new rows, a tenth of them repeats of existing transaction IDs
+        now = datetime(2024, 1, 1).isoformat(sep=' ')
+        new_rows = [
+            self._row(rows + i if i % 10 else random.randrange(rows), accounts, start, now)
+            for i in range(options['inserts'])
+        ]
+        placeholders = ", ".join("?" * len(INSERT_COLUMNS))
+
+        def insert_with_lookup():
+            # The original write path: read for a duplicate, then insert the row
+            for offset in range(0, len(new_rows), options['batch_size']):
+                for row in new_rows[offset:offset + options['batch_size']]:
+                    found = db.execute(
+                        f'SELECT id FROM "{table}" WHERE account_id = ? AND transaction_id = ?', (row[0], row[6])
+                    ).fetchone()
+                    if not found:
+                        db.execute(f'INSERT INTO "{table}" ({", ".join(INSERT_COLUMNS)}) VALUES ({placeholders})', row)
+                db.commit()
+
+        def insert_ignoring_conflicts():
+            # The constraint rejects duplicates, so batches are written without reading first
+            for offset in range(0, len(new_rows), options['batch_size']):
+                db.executemany(
+                    f'INSERT OR IGNORE INTO "{table}" ({", ".join(INSERT_COLUMNS)}) VALUES ({placeholders})',
+                    new_rows[offset:offset + options['batch_size']]
+                )
+                db.commit()
+
+        timed('insert', len(new_rows), insert_ignoring_conflicts if conflict_ignoring else insert_with_lookup)
+        return results
+
+    def _report(self, results):
+        """Print a before/after comparison table."""
+        self.stdout.write(f"{'operation':<20}{'before us/op':>15}{'after us/op':>15}{'speedup':>10}")
+        for label in results['before']:
+            before = results['before'][label]['us_per_op']
+            after = results['after'][label]['us_per_op']
+            self.stdout.write(f"{label:<20}{before:>15.1f}{after:>15.1f}{before / after:>9.1f}x")
@@ -0,0 +1,61 @@
+"""
+Management command that streams the transactions of an account to a file.
+"""
+
+import sys
+import time as timer
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ...export import EXPORT_FORMATS, export_transactions
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    """Write an account's transactions as CSV or JSON Lines without loading them into memory."""
+    help = 'Export the transactions of an account over a date range as CSV or JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('account_number', help='Account to export.')
+        parser.add_argument('--start', type=_date, help='First day to export (YYYY-MM-DD).')
+        parser.add_argument('--end', type=_date, help='Last day to export, inclusive (YYYY-MM-DD).')
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv', help='Output format.')
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output.')
+        parser.add_argument('--chunk-size', type=int, help='Rows read and encoded at a time (default: EXPORT_CHUNK_SIZE).')
+        parser.add_argument('--output', '-o', default='-', help='Output file (default: standard output).')
+
+    def handle(self, *args, **options):
+        start = options['start'] and timezone.make_aware(datetime.combine(options['start'], time.min))
+        end = options['end'] and timezone.make_aware(datetime.combine(options['end'], time.max))
+        blocks = export_transactions(
+            options['account_number'],
+            start,
+            end,
+            options['format'],
+            compress=options['gzip'],
+            chunk_size=options['chunk_size']
+        )
+
+        began = timer.perf_counter()
+        written = 0
+        output = sys.stdout.buffer if options['output'] == '-' else open(options['output'], 'wb')
+        try:
+            for block in blocks:
+                output.write(block)
+                written += len(block)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+
+        if options['output'] != '-':
+            self.stdout.write(self.style.SUCCESS(
+                f"Wrote {written:,} bytes to {options['output']} in {timer.perf_counter() - began:.1f}s"
+            ))
@@ -0,0 +1,162 @@
+"""
+Management command reporting what a worker imports and builds before serving requests.
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Lines written by python -X importtime: "import time: self [us] | cumulative | imported package"
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+# Run in a fresh interpreter: boot a WSGI worker, load the URLconf, then time the requested pages
+STARTUP_SCRIPT = '''
+import json, sys, time
+began = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+booted = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+routed = time.perf_counter()
+timings = {'boot_ms': (booted - began) * 1000, 'urlconf_ms': (routed - booted) * 1000, 'requests': []}
+if sys.argv[1:]:
+    from django.test import Client
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+    client = Client()
+    for url in sys.argv[1:]:
+        for attempt in ('cold', 'warm'):
+            started = time.perf_counter()
+            status = client.get(url).status_code
+            timings['requests'].append({
+                'url': url, 'attempt': attempt, 'status': status, 'ms': (time.perf_counter() - started) * 1000
+            })
+from money_tracker_app.services import registry
+timings['services_built'] = [name for name in registry.names if registry.is_built(name)]
+print(json.dumps(timings))
+'''
+
+
+def parse_importtime(lines):
+    """
+    Parse the output of ``python -X importtime``.
+
+    Args:
+        lines (iterable): Lines written to stderr.
+
+    Returns:
+        list: Dicts with module, self_us, cumulative_us and depth (0 for
+        modules imported directly by the script), in import order.
+    """
+    imports = []
+    for line in lines:
+        match = IMPORTTIME_LINE.match(line.rstrip('\n'))
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append({
+                'module': module,
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us),
+                'depth': (len(indent) - 1) // 2,
+            })
+    return imports
+
+
+def summarize_imports(imports, top=20, prefixes=None):
+    """
+    Summarise parsed import times.
+
+    Args:
+        imports (list): As returned by parse_importtime.
+        top (int): Number of modules listed.
+        prefixes (tuple): Only list modules starting with one of these.
+
+    Returns:
+        dict: total_ms (sum over directly imported modules), module_count and
+        slowest, the top modules by cumulative time.
+    """
+    listed = [
+        entry for entry in imports
+        if not prefixes or entry['module'].startswith(tuple(prefixes))
+    ]
+    return {
+        'total_ms': sum(entry['cumulative_us'] for entry in imports if entry['depth'] == 0) / 1000,
+        'module_count': len(imports),
+        'slowest': sorted(listed, key=lambda entry: entry['cumulative_us'], reverse=True)[:top],
+    }
+
+
+class Command(BaseCommand):
+    """Profile worker startup: import time per module, boot time and cold request latency."""
+    help = 'Boot a worker in a fresh interpreter under -X importtime and report its startup cost.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'urls',
+            nargs='*',
+            help='Pages requested after boot, each twice (cold, then warm), e.g. /accounts/.'
+        )
+        parser.add_argument('--top', type=int, default=25, help='Modules listed, slowest first.')
+        parser.add_argument(
+            '--prefix',
+            action='append',
+            help='Only list modules starting with this prefix; may be repeated (e.g. money_tracker_app).'
+        )
+        parser.add_argument('--output', help='Write the report as JSON to this path.')
+        parser.add_argument(
+            '--budget-ms',
+            type=float,
+            help='Exit with an error when boot plus URLconf loading takes longer than this.'
+        )
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        # The child must find the same settings and modules as this process
+        env['PYTHONPATH'] = os.pathsep.join(path for path in sys.path if path)
+        process = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT, *options['urls']],
+            capture_output=True,
+            text=True,
+            env=env
+        )
+        if process.returncode != 0:
+            errors = '\n'.join(line for line in process.stderr.splitlines() if not IMPORTTIME_LINE.match(line))
+            raise CommandError(f"Worker startup failed:\n{errors[-2000:]}")
+        try:
+            timings = json.loads(process.stdout.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            raise CommandError(f"Unexpected output from the startup script:\n{process.stdout[-2000:]}")
+
+        imports = parse_importtime(process.stderr.splitlines())
+        report = dict(timings, imports=summarize_imports(imports, options['top'], options['prefix']))
+        self._report(report)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+        startup_ms = report['boot_ms'] + report['urlconf_ms']
+        if options['budget_ms'] is not None and startup_ms > options['budget_ms']:
+            raise CommandError(f"Startup took {startup_ms:.0f} ms, over the budget of {options['budget_ms']:.0f} ms")
+
+    def _report(self, report):
+        """Print the startup timings and the slowest imports."""
+        imports = report['imports']
+        self.stdout.write(f"Worker boot:      {report['boot_ms']:>9.1f} ms")
+        self.stdout.write(f"URLconf and views:{report['urlconf_ms']:>9.1f} ms")
+        self.stdout.write(f"Imports:          {imports['total_ms']:>9.1f} ms over {imports['module_count']} modules")
+        self.stdout.write(f"Services built:   {', '.join(report['services_built']) or 'none'}")
+        for request in report['requests']:
+            self.stdout.write(
+                f"GET {request['url']} ({request['attempt']}): {request['status']} in {request['ms']:.1f} ms"
+            )
+        self.stdout.write(f"\n{'module':<60}{'self ms':>10}{'cumul. ms':>12}")
+        for entry in imports['slowest']:
+            name = '  ' * entry['depth'] + entry['module']
+            self.stdout.write(f"{name[:59]:<60}{entry['self_us'] / 1000:>10.1f}{entry['cumulative_us'] / 1000:>12.1f}")
@@ -0,0 +1,34 @@
+"""
+Management command to rebuild and verify the per-account rollups.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import AccountRollup, TransactionRepository
+
+
+class Command(BaseCommand):
+    """Recompute AccountRollup rows from the full transaction history."""
+    help = 'Rebuild account rollups from scratch, or verify them with --check.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only verify the stored rollups; exit with an error if any differ.'
+        )
+
+    def handle(self, *args, **options):
+        mismatched = TransactionRepository.rebuild_rollups(dry_run=options['check'])
+
+        for account_id, currency in mismatched:
+            self.stdout.write(f"Rollup out of date: account {account_id} ({currency})")
+
+        if options['check']:
+            if mismatched:
+                raise CommandError(f"{len(mismatched)} account rollups are out of date")
+            self.stdout.write(self.style.SUCCESS('All account rollups are up to date'))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Rebuilt {AccountRollup.objects.count()} account rollups ({len(mismatched)} corrected)"
+            ))
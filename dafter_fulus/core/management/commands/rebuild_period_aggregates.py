@@ -0,0 +1,34 @@
+"""
+Management command to rebuild the daily and monthly transaction aggregates.
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ...models import TransactionRepository
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    """Recompute DailyAggregate and MonthlyAggregate rows from the transaction table."""
+    help = 'Rebuild the daily and monthly aggregates over a date range (default: all transactions).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=_date, help='First day to rebuild (YYYY-MM-DD).')
+        parser.add_argument('--end', type=_date, help='Last day to rebuild, inclusive (YYYY-MM-DD).')
+
+    def handle(self, *args, **options):
+        if options['start'] and options['end'] and options['start'] > options['end']:
+            raise CommandError('--start must not be after --end')
+
+        written = TransactionRepository.rebuild_period_aggregates(options['start'], options['end'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written['daily']} daily and {written['monthly']} monthly aggregates"
+        ))
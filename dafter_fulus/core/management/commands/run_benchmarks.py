@@ -0,0 +1,135 @@
+"""
+Management command that runs the benchmark suite on a scratch database.
+"""
+
+import json
+import os
+import platform
+import tempfile
+import time
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from ...benchmarks import DEFAULT_SIZES, compare_results, run_benchmarks
+
+
+class Command(BaseCommand):
+    """Measure parsing, ingestion and read latency; store the results as JSON and compare with a baseline."""
+    help = 'Run the parsing, ingestion and account page benchmarks on a scratch copy of the database schema.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=int,
+            nargs='+',
+            default=list(DEFAULT_SIZES),
+            help='Transaction table sizes for the read benchmarks (default: 1k to 1M).'
+        )
+        parser.add_argument('--parse-count', type=int, default=5000, help='Emails parsed per repeat.')
+        parser.add_argument('--create-count', type=int, default=500, help='Single-row creates per repeat.')
+        parser.add_argument('--ingest-count', type=int, default=5000, help='Emails ingested per repeat.')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed repeats per benchmark.')
+        parser.add_argument(
+            '--mixed-seconds',
+            type=float,
+            default=5,
+            help='Duration of each concurrent read/write run, direct and through the write queue; 0 skips them.'
+        )
+        parser.add_argument('--mixed-readers', type=int, default=4, help='Reader threads in the mixed runs.')
+        parser.add_argument('--mixed-writers', type=int, default=4, help='Writer threads in the mixed runs.')
+        parser.add_argument('--output', help='Write the results as JSON to this path.')
+        parser.add_argument('--baseline', help='JSON results of an earlier run to compare against.')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Relative slowdown counted as a regression (default: 0.2).'
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Exit with an error when any benchmark regressed beyond the threshold.'
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)['results']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {str(e)}")
+
+        # Never touch real data: run on a freshly migrated test database, on disk
+        # rather than in memory so SQLite timings are representative
+        test_settings = connection.settings_dict['TEST']
+        if connection.vendor == 'sqlite' and not test_settings.get('NAME'):
+            test_settings['NAME'] = os.path.join(tempfile.gettempdir(), f'benchmarks-{os.getpid()}.sqlite3')
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        started = time.perf_counter()
+        try:
+            results = run_benchmarks(
+                sizes=options['sizes'],
+                parse_count=options['parse_count'],
+                create_count=options['create_count'],
+                ingest_count=options['ingest_count'],
+                repeat=options['repeat'],
+                mixed_seconds=options['mixed_seconds'],
+                mixed_threads=(options['mixed_readers'], options['mixed_writers']),
+                progress=lambda stage: self.stdout.write(f"Running {stage}...")
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self._report(results)
+        run = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'seconds': time.perf_counter() - started,
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'database_profile': settings.DATABASE_PROFILE,
+                'machine': platform.machine(),
+                'options': {
+                    key: options[key]
+                    for key in ('sizes', 'parse_count', 'create_count', 'ingest_count', 'repeat', 'mixed_seconds',
+                                'mixed_readers', 'mixed_writers')
+                },
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(run, f, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            rows = compare_results(results, baseline, options['threshold'])
+            self._report_comparison(rows)
+            regressed = [row['name'] for row in rows if row['regressed']]
+            if regressed and options['fail_on_regression']:
+                raise CommandError(f"{len(regressed)} benchmarks regressed: {', '.join(regressed)}")
+
+    def _report(self, results):
+        """Print one line per benchmark."""
+        self.stdout.write(f"{'benchmark':<44}{'ms/op':>12}{'ops/s':>14}")
+        for name, timing in results.items():
+            self.stdout.write(f"{name:<44}{timing['ms_per_op']:>12.3f}{timing['ops_per_second']:>14,.0f}")
+
+    def _report_comparison(self, rows):
+        """Print the comparison with the baseline, flagging regressions."""
+        self.stdout.write(f"{'benchmark':<44}{'baseline ms':>14}{'current ms':>14}{'change':>10}")
+        for row in rows:
+            line = (
+                f"{row['name']:<44}{row['baseline_ms']:>14.3f}{row['current_ms']:>14.3f}"
+                f"{row['change']:>+10.1%}"
+            )
+            self.stdout.write(self.style.ERROR(line + '  REGRESSED') if row['regressed'] else line)
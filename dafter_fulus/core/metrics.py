@@ -0,0 +1,224 @@
+"""
+In-process metrics exposed in the Prometheus text format.
+
+Histograms live in the memory of each process, so every worker of a
+multi-process server reports its own series; scrape them per process or run
+the metrics endpoint behind a single worker.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond ORM calls to long IMAP syncs
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """Cumulative histogram with one series per combination of label values."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """
+        Record one observation.
+
+        Args:
+            value (float): Observed value.
+            **labels: One value per label name.
+        """
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+            series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def collect(self):
+        """Return {label values: {'buckets': [(bound, cumulative count)], 'sum', 'count'}}."""
+        with self._lock:
+            snapshot = {key: dict(series, counts=list(series['counts'])) for key, series in self._series.items()}
+        collected = {}
+        for key, series in snapshot.items():
+            cumulative, buckets = 0, []
+            for bound, count in zip(self.buckets + (float('inf'),), series['counts']):
+                cumulative += count
+                buckets.append((bound, cumulative))
+            collected[key] = {'buckets': buckets, 'sum': series['sum'], 'count': series['count']}
+        return collected
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for key, series in sorted(self.collect().items()):
+            for bound, count in series['buckets']:
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames, key, ('le', _format_value(bound)))} {count}"
+                )
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series['count']}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    """Monotonic counter with one series per combination of label values."""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for key, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if existing.kind != metric.kind or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """Register (or return the already registered) histogram."""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def counter(self, name, documentation, labelnames=()):
+        """Register (or return the already registered) counter."""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: Exposition text, newline terminated.
+        """
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Clear every recorded value; for tests."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.reset()
+
+
+REGISTRY = MetricsRegistry()
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'money_tracker_request_seconds', 'Wall time of HTTP requests by view.', ('view', 'method', 'status')
+)
+REQUEST_QUERIES = REGISTRY.histogram(
+    'money_tracker_request_db_queries', 'ORM queries per HTTP request by view.', ('view',),
+    buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_SECONDS = REGISTRY.histogram(
+    'money_tracker_request_db_seconds', 'Time spent in SQL per HTTP request by view.', ('view',)
+)
+SLOW_REQUESTS = REGISTRY.counter(
+    'money_tracker_slow_requests_total', 'HTTP requests slower than SLOW_REQUEST_MS by view.', ('view',)
+)
+SUMMARY_CACHE_LOOKUPS = REGISTRY.counter(
+    'money_tracker_summary_cache_lookups_total', 'Account summary cache lookups by result: hit or miss.',
+    ('result',)
+)
+STAGE_SECONDS = REGISTRY.histogram(
+    'money_tracker_stage_seconds', 'Wall time of pipeline stages: imap_fetch, parse, db_persist.', ('stage',)
+)
+WRITE_BATCH_SIZE = REGISTRY.histogram(
+    'money_tracker_write_batch_writes', 'Writes committed together by the write queue.',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+WRITE_WAIT_SECONDS = REGISTRY.histogram(
+    'money_tracker_write_wait_seconds', 'Time from submitting a write to its commit.'
+)
+SERVICE_BUILD_SECONDS = REGISTRY.histogram(
+    'money_tracker_service_build_seconds', 'Time to build a service on first use or warm-up.', ('service',)
+)
+
+
+@contextmanager
+def timed(stage):
+    """
+    Record the wall time of a block in the stage histogram.
+
+    Args:
+        stage (str): Stage label, e.g. 'parse', 'imap_fetch' or 'db_persist'.
+    """
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - began, stage=stage)
@@ -0,0 +1,104 @@
+"""
+Middleware for the Money Tracker app.
+"""
+
+import logging
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+from .metrics import REQUEST_DB_SECONDS, REQUEST_QUERIES, REQUEST_SECONDS, SLOW_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Recorder of the request being handled, for queries run on its behalf by other threads
+_current_recorder = ContextVar('query_recorder', default=None)
+
+
+def current_query_recorder():
+    """The QueryRecorder of the request handled in this context, or None outside a request."""
+    return _current_recorder.get()
+
+
+class QueryRecorder:
+    """Database execute wrapper counting queries and their time, optionally per statement."""
+
+    def __init__(self, keep_statements=False):
+        self.count = 0
+        self.seconds = 0.0
+        self.keep_statements = keep_statements
+        # SQL text to [executions, total seconds]
+        self.statements = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - began
+            self.count += 1
+            self.seconds += elapsed
+            if self.keep_statements:
+                entry = self.statements.setdefault(sql, [0, 0.0])
+                entry[0] += 1
+                entry[1] += elapsed
+
+    def top(self, limit):
+        """The ``limit`` statements with the most total time, as (sql, executions, seconds)."""
+        ranked = sorted(self.statements.items(), key=lambda item: item[1][1], reverse=True)
+        return [(sql, count, seconds) for sql, (count, seconds) in ranked[:limit]]
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unresolved'
+    return match.view_name or match._func_path
+
+
+class MetricsMiddleware:
+    """
+    Record wall time, query count and SQL time of every request in the metrics histograms.
+
+    Requests slower than SLOW_REQUEST_MS are logged with their
+    SLOW_REQUEST_TOP_SQL most expensive statements. Writes the request waits
+    for on the write queue's thread are counted; queries run by async views in
+    other threads are not.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        slow_ms = settings.SLOW_REQUEST_MS
+        recorder = QueryRecorder(keep_statements=slow_ms > 0)
+        began = time.perf_counter()
+        token = _current_recorder.set(recorder)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(recorder))
+                response = self.get_response(request)
+        finally:
+            _current_recorder.reset(token)
+        elapsed = time.perf_counter() - began
+
+        view = _view_name(request)
+        REQUEST_SECONDS.observe(elapsed, view=view, method=request.method, status=response.status_code)
+        REQUEST_QUERIES.observe(recorder.count, view=view)
+        REQUEST_DB_SECONDS.observe(recorder.seconds, view=view)
+
+        if slow_ms > 0 and elapsed * 1000 >= slow_ms:
+            SLOW_REQUESTS.inc(view=view)
+            top = ''.join(
+                f"\n  {seconds * 1000:.1f}ms x{count}: {sql[:500]}"
+                for sql, count, seconds in recorder.top(settings.SLOW_REQUEST_TOP_SQL)
+            )
+            logger.warning(
+                f"Slow request {request.method} {request.path} ({view}): {elapsed * 1000:.0f}ms, "
+                f"{recorder.count} queries in {recorder.seconds * 1000:.0f}ms{top}"
+            )
+        return response
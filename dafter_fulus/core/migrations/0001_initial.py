@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Account',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('account_number', models.CharField(max_length=50, unique=True)),
+                ('bank_name', models.CharField(max_length=100)),
+                ('account_holder', models.CharField(blank=True, max_length=100, null=True)),
+                ('balance', models.FloatField(default=0.0)),
+                ('currency', models.CharField(default='OMR', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Transaction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('transaction_type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense'), ('transfer', 'Transfer'), ('unknown', 'Unknown')], default='unknown', max_length=10)),
+                ('amount', models.FloatField()),
+                ('currency', models.CharField(default='OMR', max_length=10)),
+                ('date_time', models.DateTimeField()),
+                ('description', models.TextField(blank=True, null=True)),
+                ('transaction_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('bank_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('branch', models.CharField(blank=True, max_length=200, null=True)),
+                ('transaction_sender', models.CharField(blank=True, max_length=200, null=True)),
+                ('transaction_receiver', models.CharField(blank=True, max_length=200, null=True)),
+                ('counterparty_name', models.CharField(blank=True, max_length=200, null=True)),
+                ('from_party', models.CharField(blank=True, max_length=200, null=True)),
+                ('to_party', models.CharField(blank=True, max_length=200, null=True)),
+                ('transaction_details', models.CharField(blank=True, max_length=500, null=True)),
+                ('country', models.CharField(blank=True, max_length=100, null=True)),
+                ('email_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('email_date', models.CharField(blank=True, max_length=200, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='money_tracker_app.account')),
+            ],
+        ),
+    ]
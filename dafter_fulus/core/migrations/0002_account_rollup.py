@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('money_tracker_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(default='OMR', max_length=10)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('income_count', models.IntegerField(default=0)),
+                ('expense_count', models.IntegerField(default=0)),
+                ('transfer_count', models.IntegerField(default=0)),
+                ('total_income', models.FloatField(default=0.0)),
+                ('total_expense', models.FloatField(default=0.0)),
+                ('total_transfer', models.FloatField(default=0.0)),
+                ('net_balance', models.FloatField(default=0.0)),
+                ('first_transaction_at', models.DateTimeField(blank=True, null=True)),
+                ('last_transaction_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='money_tracker_app.account')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('account', 'currency'), name='unique_rollup_per_account_currency')],
+            },
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def normalize_transaction_ids(apps, schema_editor):
+    """
+    Turn blank transaction IDs into NULL and drop duplicate rows so the constraint can be added.
+
+    The rollups of accounts that lost rows are rebuilt from their remaining transactions.
+    """
+    Transaction = apps.get_model('money_tracker_app', 'Transaction')
+    Transaction.objects.filter(transaction_id='').update(transaction_id=None)
+
+    duplicates = (
+        Transaction.objects.filter(transaction_id__isnull=False)
+        .values('account_id', 'transaction_id')
+        .annotate(keep=models.Min('id'), copies=models.Count('id'))
+        .filter(copies__gt=1)
+    )
+    affected = set()
+    for duplicate in duplicates:
+        Transaction.objects.filter(
+            account_id=duplicate['account_id'],
+            transaction_id=duplicate['transaction_id']
+        ).exclude(id=duplicate['keep']).delete()
+        affected.add(duplicate['account_id'])
+
+    if affected:
+        rebuild_rollups(apps, affected)
+
+
+def rebuild_rollups(apps, account_ids):
+    """Recompute the rollups and balances of some accounts, as rebuild_account_rollups does."""
+    Account = apps.get_model('money_tracker_app', 'Account')
+    AccountRollup = apps.get_model('money_tracker_app', 'AccountRollup')
+    Transaction = apps.get_model('money_tracker_app', 'Transaction')
+
+    annotations = {
+        'transaction_count': models.Count('id'),
+        'first_transaction_at': models.Min('date_time'),
+        'last_transaction_at': models.Max('date_time')
+    }
+    for transaction_type in ('income', 'expense', 'transfer'):
+        of_type = models.Q(transaction_type=transaction_type)
+        annotations[f'total_{transaction_type}'] = Coalesce(models.Sum('amount', filter=of_type), 0.0)
+        annotations[f'{transaction_type}_count'] = models.Count('id', filter=of_type)
+
+    rows = (
+        Transaction.objects.filter(account_id__in=account_ids)
+        .order_by().values('account_id', 'currency').annotate(**annotations)
+    )
+    rollups = []
+    for row in rows:
+        row['net_balance'] = row['total_income'] - row['total_expense']
+        rollups.append(AccountRollup(**row))
+
+    AccountRollup.objects.filter(account_id__in=account_ids).delete()
+    AccountRollup.objects.bulk_create(rollups)
+    balances = {(rollup.account_id, rollup.currency): rollup.net_balance for rollup in rollups}
+    for account in Account.objects.filter(pk__in=account_ids):
+        Account.objects.filter(pk=account.pk).update(balance=balances.get((account.pk, account.currency), 0.0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('money_tracker_app', '0002_account_rollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='transaction',
+            name='account',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='money_tracker_app.account'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['account', 'date_time'], name='transaction_account_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['email_id'], name='transaction_email_id_idx'),
+        ),
+        migrations.RunPython(normalize_transaction_ids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='transaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('transaction_id__isnull', False)), fields=('account', 'transaction_id'), name='unique_transaction_id_per_account'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('money_tracker_app', '0004_parse_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(default='OMR', max_length=10)),
+                ('transaction_type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense'), ('transfer', 'Transfer'), ('unknown', 'Unknown')], max_length=10)),
+                ('category', models.CharField(blank=True, default='', max_length=500)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('total_amount', models.FloatField(default=0.0)),
+                ('day', models.DateField()),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='money_tracker_app.account')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='daily_aggregate_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('account', 'day', 'currency', 'transaction_type', 'category'), name='unique_daily_aggregate')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlyAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency', models.CharField(default='OMR', max_length=10)),
+                ('transaction_type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense'), ('transfer', 'Transfer'), ('unknown', 'Unknown')], max_length=10)),
+                ('category', models.CharField(blank=True, default='', max_length=500)),
+                ('transaction_count', models.IntegerField(default=0)),
+                ('total_amount', models.FloatField(default=0.0)),
+                ('month', models.DateField()),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='money_tracker_app.account')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month'], name='monthly_aggregate_month_idx')],
+                'constraints': [models.UniqueConstraint(fields=('account', 'month', 'currency', 'transaction_type', 'category'), name='unique_monthly_aggregate')],
+            },
+        ),
+    ]
@@ -0,0 +1,103 @@
+from django.db import migrations, models
+
+from money_tracker_app.currency import currency_exponent, to_minor_units
+
+BATCH_SIZE = 2000
+
+
+def to_minor(apps, schema_editor):
+    """Convert stored float amounts to integer minor units."""
+    Transaction = apps.get_model('money_tracker_app', 'Transaction')
+    Account = apps.get_model('money_tracker_app', 'Account')
+    AccountRollup = apps.get_model('money_tracker_app', 'AccountRollup')
+    DailyAggregate = apps.get_model('money_tracker_app', 'DailyAggregate')
+    MonthlyAggregate = apps.get_model('money_tracker_app', 'MonthlyAggregate')
+
+    last_pk = 0
+    while True:
+        batch = list(Transaction.objects.filter(pk__gt=last_pk).order_by('pk').only('amount', 'currency')[:BATCH_SIZE])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        for row in batch:
+            row.amount_minor = to_minor_units(row.amount, row.currency)
+        Transaction.objects.bulk_update(batch, ['amount_minor'])
+
+    accounts = list(Account.objects.all())
+    for account in accounts:
+        account.balance_minor = to_minor_units(account.balance, account.currency)
+    Account.objects.bulk_update(accounts, ['balance_minor'], batch_size=BATCH_SIZE)
+
+    # Scale the float totals in place; the column types change to integers below
+    for model, fields in (
+        (AccountRollup, ['total_income', 'total_expense', 'total_transfer', 'net_balance']),
+        (DailyAggregate, ['total_amount']),
+        (MonthlyAggregate, ['total_amount']),
+    ):
+        for currency in model.objects.values_list('currency', flat=True).distinct():
+            scale = 10 ** currency_exponent(currency)
+            rows = list(model.objects.filter(currency=currency))
+            for row in rows:
+                for field in fields:
+                    setattr(row, field, round(getattr(row, field) * scale))
+            model.objects.bulk_update(rows, fields, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('money_tracker_app', '0005_period_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='amount_minor',
+            field=models.BigIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='balance_minor',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(to_minor, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='transaction',
+            name='amount',
+        ),
+        migrations.RemoveField(
+            model_name='account',
+            name='balance',
+        ),
+        migrations.AlterField(
+            model_name='accountrollup',
+            name='total_income',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='accountrollup',
+            name='total_expense',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='accountrollup',
+            name='total_transfer',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='accountrollup',
+            name='net_balance',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='dailyaggregate',
+            name='total_amount',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='monthlyaggregate',
+            name='total_amount',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('money_tracker_app', '0006_minor_units'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParseBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('paste', 'Pasted'), ('upload', 'Uploaded'), ('fetch', 'Fetched')], max_length=10)),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('parsed_count', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0)),
+                ('saved_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('saved_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ParseBatchItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('email_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('subject', models.CharField(blank=True, default='', max_length=500)),
+                ('status', models.CharField(choices=[('parsed', 'Parsed'), ('unparsed', 'No transaction'), ('failed', 'Failed'), ('saved', 'Saved'), ('duplicate', 'Already saved'), ('rejected', 'Rejected')], max_length=10)),
+                ('transaction_data', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='money_tracker_app.parsebatch')),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='money_tracker_app.transaction')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('batch', 'position'), name='unique_parse_batch_position')],
+            },
+        ),
+    ]
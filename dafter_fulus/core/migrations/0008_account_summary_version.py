@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('money_tracker_app', '0007_parse_batches'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='summary_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,59 @@
+from django.db import migrations
+
+TABLE = 'money_tracker_app_transaction'
+FTS_TABLE = 'money_tracker_app_transaction_fts'
+COLUMNS = (
+    'description', 'counterparty_name', 'from_party', 'to_party', 'transaction_details', 'branch', 'transaction_id'
+)
+
+NEW = ', '.join(f'new.{column}' for column in COLUMNS)
+OLD = ', '.join(f'old.{column}' for column in COLUMNS)
+
+CREATE = (
+    # External content: the index stores tokens only and reads text from the transaction table
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        {', '.join(COLUMNS)},
+        content='{TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {', '.join(COLUMNS)}) VALUES (new.id, {NEW});
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {', '.join(COLUMNS)}) VALUES ('delete', old.id, {OLD});
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF {', '.join(COLUMNS)} ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {', '.join(COLUMNS)}) VALUES ('delete', old.id, {OLD});
+        INSERT INTO {FTS_TABLE}(rowid, {', '.join(COLUMNS)}) VALUES (new.id, {NEW});
+    END""",
+    # Index the existing rows
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+DROP = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        # FTS5 is SQLite only
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return apply
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('money_tracker_app', '0008_account_summary_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(CREATE), run(DROP)),
+    ]
@@ -0,0 +1,232 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+from money_tracker_app.dimensions import normalize_name
+
+TABLE = 'money_tracker_app_transaction'
+FTS_TABLE = 'money_tracker_app_transaction_fts'
+SEARCH_VIEW = 'money_tracker_app_transaction_search'
+COLUMNS = (
+    'description', 'counterparty_name', 'from_party', 'to_party', 'transaction_details', 'branch', 'transaction_id'
+)
+
+# (text column, foreign key column, dimension model); the text columns sharing
+# a name with their foreign key field are renamed out of the way first
+SOURCES = (
+    ('bank_name', 'bank_id', 'Bank'),
+    ('branch_text', 'branch_id', 'Branch'),
+    ('transaction_sender', 'sender_id', 'Counterparty'),
+    ('transaction_receiver', 'receiver_id', 'Counterparty'),
+    ('counterparty_name', 'counterparty_id', 'Counterparty'),
+    ('from_party_text', 'from_party_id', 'Counterparty'),
+    ('to_party_text', 'to_party_id', 'Counterparty'),
+)
+
+BATCH_SIZE = 2000
+
+
+def _name(table, pk):
+    return f'(SELECT name FROM {table} WHERE id = {pk})'
+
+
+def _values(row):
+    """FTS column values of a transaction row, interned names read from their tables."""
+    return ', '.join((
+        f'{row}.description',
+        _name('money_tracker_app_counterparty', f'{row}.counterparty_id'),
+        _name('money_tracker_app_counterparty', f'{row}.from_party_id'),
+        _name('money_tracker_app_counterparty', f'{row}.to_party_id'),
+        f'{row}.transaction_details',
+        _name('money_tracker_app_branch', f'{row}.branch_id'),
+        f'{row}.transaction_id',
+    ))
+
+
+# Index as in 0009, over the transaction table with its text columns
+OLD_CREATE = (
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        {', '.join(COLUMNS)},
+        content='{TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {', '.join(COLUMNS)}) VALUES (new.id, {', '.join(f'new.{c}' for c in COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {', '.join(COLUMNS)})
+        VALUES ('delete', old.id, {', '.join(f'old.{c}' for c in COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF {', '.join(COLUMNS)} ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {', '.join(COLUMNS)})
+        VALUES ('delete', old.id, {', '.join(f'old.{c}' for c in COLUMNS)});
+        INSERT INTO {FTS_TABLE}(rowid, {', '.join(COLUMNS)}) VALUES (new.id, {', '.join(f'new.{c}' for c in COLUMNS)});
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+# Same index, with a view joining the names in as its content. Dimension
+# names never change, so the delete triggers pass the values that were indexed.
+NEW_CREATE = (
+    f"""CREATE VIEW {SEARCH_VIEW} AS SELECT
+        transaction_row.id AS id,
+        transaction_row.description AS description,
+        counterparty.name AS counterparty_name,
+        from_party.name AS from_party,
+        to_party.name AS to_party,
+        transaction_row.transaction_details AS transaction_details,
+        branch.name AS branch,
+        transaction_row.transaction_id AS transaction_id
+    FROM {TABLE} AS transaction_row
+    LEFT JOIN money_tracker_app_counterparty AS counterparty ON counterparty.id = transaction_row.counterparty_id
+    LEFT JOIN money_tracker_app_counterparty AS from_party ON from_party.id = transaction_row.from_party_id
+    LEFT JOIN money_tracker_app_counterparty AS to_party ON to_party.id = transaction_row.to_party_id
+    LEFT JOIN money_tracker_app_branch AS branch ON branch.id = transaction_row.branch_id""",
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        {', '.join(COLUMNS)},
+        content='{SEARCH_VIEW}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {', '.join(COLUMNS)}) VALUES (new.id, {_values('new')});
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {', '.join(COLUMNS)}) VALUES ('delete', old.id, {_values('old')});
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF
+        description, counterparty_id, from_party_id, to_party_id, transaction_details, branch_id, transaction_id
+    ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {', '.join(COLUMNS)}) VALUES ('delete', old.id, {_values('old')});
+        INSERT INTO {FTS_TABLE}(rowid, {', '.join(COLUMNS)}) VALUES (new.id, {_values('new')});
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+DROP = (
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_insert',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_delete',
+    f'DROP TRIGGER IF EXISTS {FTS_TABLE}_update',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+    f'DROP VIEW IF EXISTS {SEARCH_VIEW}',
+)
+
+
+def run(statements):
+    def apply(apps, schema_editor):
+        # FTS5 is SQLite only
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return apply
+
+
+def intern_names(apps, schema_editor):
+    """Create one dimension row per distinct normalised name and point transactions at them."""
+    Transaction = apps.get_model('money_tracker_app', 'Transaction')
+
+    mapping = []
+    for model_name in ('Bank', 'Branch', 'Counterparty'):
+        model = apps.get_model('money_tracker_app', model_name)
+        raws = set()
+        for column, _, dimension in SOURCES:
+            if dimension == model_name:
+                raws.update(
+                    Transaction.objects.filter(**{f'{column}__isnull': False})
+                    .order_by().values_list(column, flat=True).distinct()
+                )
+        spellings = {}
+        for raw in sorted(raws):
+            key = normalize_name(raw)
+            if key:
+                spellings.setdefault(key, ' '.join(raw.split()))
+        model.objects.bulk_create(
+            [model(key=key, name=name) for key, name in spellings.items()], batch_size=BATCH_SIZE
+        )
+        ids = dict(model.objects.values_list('key', 'pk'))
+        mapping += [(model_name, raw, ids[normalize_name(raw)]) for raw in raws if normalize_name(raw)]
+
+    # One pass per column, joining through a temporary raw text to id map
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMPORARY TABLE dimension_map '
+            '(dimension VARCHAR(20), raw TEXT, dimension_id INTEGER, PRIMARY KEY (dimension, raw))'
+        )
+        cursor.executemany('INSERT INTO dimension_map VALUES (%s, %s, %s)', mapping)
+        for column, foreign_key, dimension in SOURCES:
+            cursor.execute(
+                f'UPDATE {TABLE} SET {foreign_key} = (SELECT dimension_id FROM dimension_map '
+                f'WHERE dimension = %s AND raw = {TABLE}.{column}) WHERE {column} IS NOT NULL',
+                [dimension]
+            )
+        cursor.execute('DROP TABLE dimension_map')
+
+
+def restore_names(apps, schema_editor):
+    """Copy the interned names back into the text columns."""
+    with schema_editor.connection.cursor() as cursor:
+        for column, foreign_key, dimension in SOURCES:
+            table = apps.get_model('money_tracker_app', dimension)._meta.db_table
+            cursor.execute(
+                f'UPDATE {TABLE} SET {column} = {_name(table, f"{TABLE}.{foreign_key}")} '
+                f'WHERE {foreign_key} IS NOT NULL'
+            )
+
+
+def _dimension(name, verbose_name_plural=None):
+    options = {'ordering': ['name'], 'abstract': False}
+    if verbose_name_plural:
+        options['verbose_name_plural'] = verbose_name_plural
+    return migrations.CreateModel(
+        name=name,
+        fields=[
+            ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ('name', models.CharField(max_length=200)),
+            ('key', models.CharField(max_length=200, unique=True)),
+        ],
+        options=options,
+    )
+
+
+def _reference(model_name, related_name='+', db_index=False):
+    return models.ForeignKey(
+        blank=True, null=True, db_index=db_index, on_delete=django.db.models.deletion.PROTECT,
+        related_name=related_name, to=f'money_tracker_app.{model_name}'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('money_tracker_app', '0009_transaction_search'),
+    ]
+
+    operations = [
+        # The triggers read the text columns, so the index goes first and is rebuilt last
+        migrations.RunPython(run(DROP), run(OLD_CREATE)),
+        _dimension('Bank'),
+        _dimension('Branch', 'branches'),
+        _dimension('Counterparty', 'counterparties'),
+        migrations.RenameField('transaction', 'branch', 'branch_text'),
+        migrations.RenameField('transaction', 'from_party', 'from_party_text'),
+        migrations.RenameField('transaction', 'to_party', 'to_party_text'),
+        migrations.AddField('transaction', 'bank', _reference('Bank')),
+        migrations.AddField('transaction', 'branch', _reference('Branch')),
+        migrations.AddField('transaction', 'sender', _reference('Counterparty')),
+        migrations.AddField('transaction', 'receiver', _reference('Counterparty')),
+        migrations.AddField('transaction', 'counterparty', _reference('Counterparty', 'transactions')),
+        migrations.AddField('transaction', 'from_party', _reference('Counterparty')),
+        migrations.AddField('transaction', 'to_party', _reference('Counterparty')),
+        migrations.RunPython(intern_names, restore_names),
+        migrations.RemoveField('transaction', 'bank_name'),
+        migrations.RemoveField('transaction', 'branch_text'),
+        migrations.RemoveField('transaction', 'transaction_sender'),
+        migrations.RemoveField('transaction', 'transaction_receiver'),
+        migrations.RemoveField('transaction', 'counterparty_name'),
+        migrations.RemoveField('transaction', 'from_party_text'),
+        migrations.RemoveField('transaction', 'to_party_text'),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['counterparty', 'date_time'], name='transaction_counterparty_idx'),
+        ),
+        migrations.RunPython(run(NEW_CREATE), run(DROP)),
+    ]
@@ -4,9 +4,21 @@ Database models for the Bank Email Parser & Account Tracker.
 
 import enum
 import logging
-from datetime import datetime
-from django.db import models
+import re
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from itertools import islice
+from django.conf import settings
+from django.db import IntegrityError, connection, models, transaction as db_transaction
+from django.db.models import Count, F, Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least, TruncDate
 from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .currency import from_minor_units, to_minor_units
+from .dimensions import get_resolver, normalize_name
+from .pagination import page_size_from, paginate
+from .write_queue import serialized
 
 logger = logging.getLogger(__name__)
 
@@ -17,45 +29,130 @@ class TransactionType(models.TextChoices):
     TRANSFER = 'transfer', 'Transfer'
     UNKNOWN = 'unknown', 'Unknown'
 
+class IngestOutcome(models.TextChoices):
+    """Enum for per-item results of a bulk ingestion."""
+    CREATED = 'created', 'Created'
+    DUPLICATE = 'duplicate', 'Duplicate'
+    UPDATED = 'updated', 'Updated'
+    REJECTED = 'rejected', 'Rejected'
+
+def _month_start(day):
+    """First day of the month containing ``day``."""
+    return day.replace(day=1)
+
+def _next_month(day):
+    """First day of the month after the one containing ``day``."""
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+def _day_start(day):
+    """Aware datetime at midnight of ``day`` in the current time zone."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+def _chunked(iterable, size):
+    """Yield lists of at most ``size`` items from ``iterable``."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
 class Account(models.Model):
     """Account model representing a bank account."""
     account_number = models.CharField(max_length=50, unique=True)
     bank_name = models.CharField(max_length=100)
     account_holder = models.CharField(max_length=100, blank=True, null=True)
-    balance = models.FloatField(default=0.0)
+    # In minor units of currency, see currency.py
+    balance_minor = models.BigIntegerField(default=0)
     currency = models.CharField(max_length=10, default='OMR')
+    # Bumped with updated_at by every TransactionRepository write, see summary_cache.py
+    summary_version = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.bank_name} - {self.account_number}"
 
+    @property
+    def balance(self):
+        """Balance in major units, as a Decimal."""
+        return from_minor_units(self.balance_minor, self.currency)
+
+class Dimension(models.Model):
+    """
+    A name stored once and referenced from transactions, see dimensions.py.
+
+    ``key`` is the name normalised for case and whitespace. Names are never
+    edited: the search index reads them when a transaction is reindexed.
+    """
+    name = models.CharField(max_length=200)
+    key = models.CharField(max_length=200, unique=True)
+
+    class Meta:
+        abstract = True
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+class Bank(Dimension):
+    """Bank named on transactions."""
+
+class Branch(Dimension):
+    """Bank branch named on transactions."""
+
+    class Meta(Dimension.Meta):
+        verbose_name_plural = 'branches'
+
+class Counterparty(Dimension):
+    """Sender, receiver or other party named on transactions."""
+
+    class Meta(Dimension.Meta):
+        verbose_name_plural = 'counterparties'
+
 class Transaction(models.Model):
     """Transaction model representing a financial transaction."""
-    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='transactions')
+    # Indexed through the composite indexes below, which all lead with account
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='transactions', db_index=False)
     transaction_type = models.CharField(
         max_length=10,
         choices=TransactionType.choices,
         default=TransactionType.UNKNOWN
     )
-    amount = models.FloatField()
+    # In minor units of currency (baisa for OMR), see currency.py
+    amount_minor = models.BigIntegerField()
     currency = models.CharField(max_length=10, default='OMR')
     date_time = models.DateTimeField()
     description = models.TextField(blank=True, null=True)
     transaction_id = models.CharField(max_length=100, blank=True, null=True)
 
-    # Bank-specific fields
-    bank_name = models.CharField(max_length=100, blank=True, null=True)
-    branch = models.CharField(max_length=200, blank=True, null=True)
+    # Bank-specific fields, interned (see dimensions.py)
+    bank = models.ForeignKey(
+        Bank, on_delete=models.PROTECT, related_name='+', blank=True, null=True, db_index=False
+    )
+    branch = models.ForeignKey(
+        Branch, on_delete=models.PROTECT, related_name='+', blank=True, null=True, db_index=False
+    )
 
-    # Counterparty information
-    transaction_sender = models.CharField(max_length=200, blank=True, null=True)
-    transaction_receiver = models.CharField(max_length=200, blank=True, null=True)
-    counterparty_name = models.CharField(max_length=200, blank=True, null=True)
+    # Counterparty information, interned; only counterparty is indexed (below)
+    sender = models.ForeignKey(
+        Counterparty, on_delete=models.PROTECT, related_name='+', blank=True, null=True, db_index=False
+    )
+    receiver = models.ForeignKey(
+        Counterparty, on_delete=models.PROTECT, related_name='+', blank=True, null=True, db_index=False
+    )
+    counterparty = models.ForeignKey(
+        Counterparty, on_delete=models.PROTECT, related_name='transactions', blank=True, null=True,
+        db_index=False
+    )
 
     # New fields from your function
-    from_party = models.CharField(max_length=200, blank=True, null=True)  # 'me' or actual name
-    to_party = models.CharField(max_length=200, blank=True, null=True)    # 'me' or actual name
+    from_party = models.ForeignKey(  # 'me' or actual name
+        Counterparty, on_delete=models.PROTECT, related_name='+', blank=True, null=True, db_index=False
+    )
+    to_party = models.ForeignKey(  # 'me' or actual name
+        Counterparty, on_delete=models.PROTECT, related_name='+', blank=True, null=True, db_index=False
+    )
     transaction_details = models.CharField(max_length=500, blank=True, null=True)  # TRANSFER, Cash Dep, SALARY, etc.
 
     # Additional fields
@@ -69,13 +166,324 @@ class Transaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Date range queries and history pages, newest first
+            models.Index(fields=['account', 'date_time'], name='transaction_account_date_idx'),
+            # Deduplication when re-fetching mail
+            models.Index(fields=['email_id'], name='transaction_email_id_idx'),
+            # Payments to or from one counterparty, newest first, and per-counterparty totals
+            models.Index(fields=['counterparty', 'date_time'], name='transaction_counterparty_idx'),
+        ]
+        constraints = [
+            # Also serves the (account, transaction_id) duplicate lookup
+            models.UniqueConstraint(
+                fields=['account', 'transaction_id'],
+                condition=models.Q(transaction_id__isnull=False),
+                name='unique_transaction_id_per_account'
+            ),
+        ]
+
     def __str__(self):
         return f"{self.transaction_type} - {self.amount} {self.currency} - {self.date_time}"
 
+    @property
+    def amount(self):
+        """Amount in major units, as a Decimal."""
+        return from_minor_units(self.amount_minor, self.currency)
+
+    # Names of the interned fields; select_related the foreign keys when listing many rows
+
+    @property
+    def bank_name(self):
+        return self.bank.name if self.bank_id else None
+
+    @property
+    def transaction_sender(self):
+        return self.sender.name if self.sender_id else None
+
+    @property
+    def transaction_receiver(self):
+        return self.receiver.name if self.receiver_id else None
+
+    @property
+    def counterparty_name(self):
+        return self.counterparty.name if self.counterparty_id else None
+
+# Parsed name fields stored as dimension references: (transaction data key, foreign key, dimension)
+DIMENSION_FIELDS = (
+    ('bank_name', 'bank', Bank),
+    ('branch', 'branch', Branch),
+    ('transaction_sender', 'sender', Counterparty),
+    ('transaction_receiver', 'receiver', Counterparty),
+    ('counterparty_name', 'counterparty', Counterparty),
+    ('from_party', 'from_party', Counterparty),
+    ('to_party', 'to_party', Counterparty),
+)
+
+# FTS5 index over the free-text columns and interned names, kept in sync by triggers (migration 0010)
+SEARCH_TABLE = 'money_tracker_app_transaction_fts'
+SEARCH_COLUMNS = (
+    'description', 'counterparty_name', 'from_party', 'to_party', 'transaction_details', 'branch', 'transaction_id'
+)
+
+def search_expression(query):
+    """
+    Turn free text into an FTS5 query in which every word must match as a prefix.
+
+    Args:
+        query (str): Free text; punctuation and FTS5 syntax are ignored.
+
+    Returns:
+        str: FTS5 MATCH expression, or None if the text has no words.
+    """
+    words = re.findall(r'\w+', query or '')
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+# Rollup columns maintained incrementally by TransactionRepository
+ROLLUP_FIELDS = (
+    'transaction_count', 'income_count', 'expense_count', 'transfer_count',
+    'total_income', 'total_expense', 'total_transfer', 'net_balance',
+    'first_transaction_at', 'last_transaction_at'
+)
+
+# Parsed columns rewritten when a transaction is upserted
+UPSERT_FIELDS = (
+    'transaction_type', 'amount_minor', 'currency', 'date_time', 'description', 'transaction_id',
+    'bank_id', 'branch_id', 'sender_id', 'receiver_id', 'counterparty_id',
+    'from_party_id', 'to_party_id', 'transaction_details', 'country', 'email_id', 'email_date'
+)
+
+class AccountRollup(models.Model):
+    """
+    Running totals per account and currency, maintained by TransactionRepository.
+
+    Totals are in minor units of the currency.
+    """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='rollups')
+    currency = models.CharField(max_length=10, default='OMR')
+
+    transaction_count = models.IntegerField(default=0)
+    income_count = models.IntegerField(default=0)
+    expense_count = models.IntegerField(default=0)
+    transfer_count = models.IntegerField(default=0)
+
+    total_income = models.BigIntegerField(default=0)
+    total_expense = models.BigIntegerField(default=0)
+    total_transfer = models.BigIntegerField(default=0)
+    net_balance = models.BigIntegerField(default=0)
+
+    first_transaction_at = models.DateTimeField(blank=True, null=True)
+    last_transaction_at = models.DateTimeField(blank=True, null=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'currency'], name='unique_rollup_per_account_currency')
+        ]
+
+    def __str__(self):
+        return f"{self.account_id} - {self.currency} - {self.net_balance}"
+
+class PeriodAggregate(models.Model):
+    """
+    Transaction count and total per account, currency, type and category over one period.
+
+    Totals are in minor units of the currency.
+    """
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='+')
+    currency = models.CharField(max_length=10, default='OMR')
+    transaction_type = models.CharField(max_length=10, choices=TransactionType.choices)
+    # Transaction.transaction_details, '' when missing
+    category = models.CharField(max_length=500, blank=True, default='')
+    transaction_count = models.IntegerField(default=0)
+    total_amount = models.BigIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+class DailyAggregate(PeriodAggregate):
+    """Per-day totals; days are calendar days in settings.TIME_ZONE."""
+    day = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['account', 'day', 'currency', 'transaction_type', 'category'],
+                name='unique_daily_aggregate'
+            )
+        ]
+        indexes = [models.Index(fields=['day'], name='daily_aggregate_day_idx')]
+
+    def __str__(self):
+        return f"{self.account_id} - {self.day} - {self.transaction_type} - {self.total_amount}"
+
+class MonthlyAggregate(PeriodAggregate):
+    """Per-month totals, keyed by the first day of the month."""
+    month = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['account', 'month', 'currency', 'transaction_type', 'category'],
+                name='unique_monthly_aggregate'
+            )
+        ]
+        indexes = [models.Index(fields=['month'], name='monthly_aggregate_month_idx')]
+
+    def __str__(self):
+        return f"{self.account_id} - {self.month:%Y-%m} - {self.transaction_type} - {self.total_amount}"
+
+class ParseCacheEntry(models.Model):
+    """Parse result of an email, keyed by a hash of its normalised content and the parser version."""
+    key = models.CharField(max_length=64, primary_key=True)
+    parser_version = models.CharField(max_length=64)
+    # None when the email held no transaction
+    result = models.JSONField(blank=True, null=True)
+    # Set once the parsed transaction is stored, so later hits skip the duplicate check
+    transaction = models.ForeignKey(
+        Transaction, on_delete=models.SET_NULL, related_name='+', blank=True, null=True
+    )
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def __str__(self):
+        return f"{self.key[:12]} - {self.parser_version}"
+
+class ParseBatchSource(models.TextChoices):
+    """Enum for where the emails of a parse batch came from."""
+    PASTE = 'paste', 'Pasted'
+    UPLOAD = 'upload', 'Uploaded'
+    FETCH = 'fetch', 'Fetched'
+
+class ParseItemStatus(models.TextChoices):
+    """Enum for the state of one email of a parse batch."""
+    PARSED = 'parsed', 'Parsed'
+    UNPARSED = 'unparsed', 'No transaction'
+    FAILED = 'failed', 'Failed'
+    SAVED = 'saved', 'Saved'
+    DUPLICATE = 'duplicate', 'Already saved'
+    REJECTED = 'rejected', 'Rejected'
+
+class ParseBatch(models.Model):
+    """Results of one parse or fetch run, reviewed on the results page and saved on demand."""
+    source = models.CharField(max_length=10, choices=ParseBatchSource.choices)
+    message_count = models.PositiveIntegerField(default=0)
+    parsed_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    saved_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    saved_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.get_source_display()} batch {self.pk} - {self.parsed_count}/{self.message_count} parsed"
+
+    @cached_property
+    def unsaved_count(self):
+        """Parsed transactions not stored yet."""
+        return self.items.filter(status=ParseItemStatus.PARSED).count()
+
+class ParseBatchItem(models.Model):
+    """One email of a parse batch and the transaction parsed from it."""
+    batch = models.ForeignKey(ParseBatch, on_delete=models.CASCADE, related_name='items')
+    position = models.PositiveIntegerField()
+    email_id = models.CharField(max_length=255, blank=True, null=True)
+    subject = models.CharField(max_length=500, blank=True, default='')
+    status = models.CharField(max_length=10, choices=ParseItemStatus.choices)
+    transaction_data = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    transaction = models.ForeignKey(
+        Transaction, on_delete=models.SET_NULL, related_name='+', blank=True, null=True
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['batch', 'position'], name='unique_parse_batch_position')
+        ]
+
+    def __str__(self):
+        return f"{self.batch_id}:{self.position} - {self.status}"
+
 class TransactionRepository:
-    """Repository class for transaction operations."""
+    """
+    Repository class for transaction operations.
+
+    Public write methods are @serialized: with WRITE_QUEUE_ENABLED they run on
+    the single writer thread of write_queue.py.
+    """
+
+    DEFAULT_BATCH_SIZE = 500
+
+    @staticmethod
+    def _resolve_dimensions(transactions_data):
+        """
+        Resolve the names in transaction data to dimension ids, one lookup per dimension.
+
+        Args:
+            transactions_data (list): Transaction data dicts.
+
+        Returns:
+            dict: (dimension model, normalised name) to id.
+        """
+        names = defaultdict(list)
+        for transaction_data in transactions_data:
+            for data_key, _, model in DIMENSION_FIELDS:
+                if transaction_data.get(data_key):
+                    names[model].append(transaction_data[data_key])
+        return {
+            (model, key): pk
+            for model, values in names.items()
+            for key, pk in get_resolver(model).resolve_many(values).items()
+        }
 
     @staticmethod
+    def _build_transaction(account, transaction_data, dimension_ids=None):
+        """
+        Build an unsaved Transaction from parsed transaction data.
+
+        Args:
+            account (Account): Account the transaction belongs to.
+            transaction_data (dict): Transaction data.
+            dimension_ids (dict): Names already resolved by _resolve_dimensions;
+                resolved here when None.
+
+        Returns:
+            Transaction: Unsaved transaction instance.
+        """
+        if dimension_ids is None:
+            dimension_ids = TransactionRepository._resolve_dimensions([transaction_data])
+        # Convert transaction type
+        transaction_type_str = (transaction_data.get('transaction_type') or 'unknown').lower()
+        if transaction_type_str not in TransactionType.values:
+            transaction_type = TransactionType.UNKNOWN
+        else:
+            transaction_type = transaction_type_str
+        currency = transaction_data.get('currency', 'OMR')
+
+        return Transaction(
+            account=account,
+            transaction_type=transaction_type,
+            amount_minor=to_minor_units(transaction_data.get('amount'), currency),
+            currency=currency,
+            date_time=transaction_data.get('date_time', timezone.now()),
+            description=transaction_data.get('description'),
+            transaction_id=transaction_data.get('transaction_id') or None,
+            transaction_details=transaction_data.get('transaction_details'),
+            country=transaction_data.get('country'),
+            email_id=transaction_data.get('email_id'),
+            email_date=transaction_data.get('email_date'),
+            **{
+                f'{field}_id': dimension_ids.get((model, normalize_name(transaction_data.get(data_key))))
+                for data_key, field, model in DIMENSION_FIELDS
+            }
+        )
+
+    @staticmethod
+    @serialized
     def create_account(account_data):
         """
         Create a new account.
@@ -111,6 +519,7 @@ class TransactionRepository:
             return None
 
     @staticmethod
+    @serialized
     def create_transaction(transaction_data):
         """
         Create a new transaction.
@@ -141,47 +550,23 @@ class TransactionRepository:
                 if not account:
                     return None
 
-            # Check if transaction already exists (by transaction_id and date)
-            if transaction_data.get('transaction_id'):
-                try:
-                    existing_transaction = Transaction.objects.get(
-                        account=account,
-                        transaction_id=transaction_data['transaction_id']
+            transaction = TransactionRepository._build_transaction(account, transaction_data)
+            try:
+                with db_transaction.atomic():
+                    transaction.save()
+                    TransactionRepository._apply_deltas(
+                        TransactionRepository._deltas(Transaction.objects.filter(pk=transaction.pk))
                     )
-                    logger.info(f"Transaction {transaction_data['transaction_id']} already exists")
-                    return existing_transaction
-                except Transaction.DoesNotExist:
-                    pass
-
-            # Convert transaction type
-            transaction_type_str = transaction_data.get('transaction_type', 'unknown').lower()
-            if transaction_type_str not in [choice[0] for choice in TransactionType.choices]:
-                transaction_type = TransactionType.UNKNOWN
-            else:
-                transaction_type = transaction_type_str
-
-            transaction = Transaction(
-                account=account,
-                transaction_type=transaction_type,
-                amount=transaction_data.get('amount', 0.0),
-                currency=transaction_data.get('currency', 'OMR'),
-                date_time=transaction_data.get('date_time', timezone.now()),
-                description=transaction_data.get('description'),
-                transaction_id=transaction_data.get('transaction_id'),
-                bank_name=transaction_data.get('bank_name'),
-                branch=transaction_data.get('branch'),
-                transaction_sender=transaction_data.get('transaction_sender'),
-                transaction_receiver=transaction_data.get('transaction_receiver'),
-                counterparty_name=transaction_data.get('counterparty_name'),
-                from_party=transaction_data.get('from_party'),
-                to_party=transaction_data.get('to_party'),
-                transaction_details=transaction_data.get('transaction_details'),
-                country=transaction_data.get('country'),
-                email_id=transaction_data.get('email_id'),
-                email_date=transaction_data.get('email_date')
-            )
-
-            transaction.save()
+            except IntegrityError:
+                # The unique constraint on (account, transaction_id) caught a duplicate
+                if not transaction.transaction_id:
+                    raise
+                existing_transaction = Transaction.objects.get(
+                    account=account,
+                    transaction_id=transaction.transaction_id
+                )
+                logger.info(f"Transaction {transaction.transaction_id} already exists")
+                return existing_transaction
             logger.info(f"Created transaction: {transaction.id}")
             return transaction
 
@@ -189,6 +574,655 @@ class TransactionRepository:
             logger.error(f"Error creating transaction: {str(e)}")
             return None
 
+    @staticmethod
+    @serialized
+    def bulk_create_transactions(transactions_data, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Create many transactions with a fixed number of queries per batch.
+
+        Accounts are resolved with one query per batch (and remembered across
+        batches), missing accounts are created in bulk, duplicates are detected
+        with a single ``IN`` query per batch and new rows are written with
+        ``bulk_create`` inside one database transaction per batch.
+
+        Args:
+            transactions_data (iterable): Iterable of transaction data dicts.
+            batch_size (int): Number of items written per database transaction.
+
+        Returns:
+            list: One dict per input item, in input order, with keys
+            ``status`` (IngestOutcome), ``transaction`` (Transaction or None)
+            and ``reason`` (str or None).
+        """
+        results = []
+        accounts = {}
+        for batch in _chunked(transactions_data, batch_size):
+            results.extend(TransactionRepository._ingest_batch(batch, accounts))
+
+        created = sum(1 for result in results if result['status'] == IngestOutcome.CREATED)
+        logger.info(f"Bulk ingestion: {created} created out of {len(results)} transactions")
+        return results
+
+    @staticmethod
+    def _ingest_batch(batch, accounts):
+        """
+        Ingest one batch for bulk_create_transactions.
+
+        Args:
+            batch (list): Transaction data dicts.
+            accounts (dict): Account number to Account cache shared across batches.
+
+        Returns:
+            list: Outcome dicts for the batch, in input order.
+        """
+        results = [None] * len(batch)
+        pending = []
+        for index, transaction_data in enumerate(batch):
+            if not transaction_data or not transaction_data.get('account_number'):
+                results[index] = {
+                    'status': IngestOutcome.REJECTED,
+                    'transaction': None,
+                    'reason': 'No account number provided for transaction'
+                }
+            else:
+                pending.append((index, transaction_data))
+
+        if not pending:
+            return results
+
+        error = None
+        for _ in range(2):
+            # Only remember accounts once the batch has committed
+            resolved = dict(accounts)
+            try:
+                TransactionRepository._write_batch(pending, resolved, results)
+                accounts.update(resolved)
+                return results
+            except IntegrityError as e:
+                # A concurrent writer inserted one of these rows after the
+                # duplicate check; retrying reports it as a duplicate
+                error = e
+            except Exception as e:
+                error = e
+                break
+
+        logger.error(f"Error creating transaction batch: {str(error)}")
+        for index, _ in pending:
+            results[index] = {
+                'status': IngestOutcome.REJECTED,
+                'transaction': None,
+                'reason': str(error)
+            }
+
+        return results
+
+    @staticmethod
+    def _write_batch(pending, resolved, results):
+        """
+        Write one batch in a single database transaction.
+
+        Args:
+            pending (list): (index, transaction data) pairs with an account number.
+            resolved (dict): Account number to Account cache, updated in place.
+            results (list): Outcome list for the batch, filled in place.
+        """
+        with db_transaction.atomic():
+            # Resolve accounts, creating the missing ones in bulk
+            missing = {data['account_number'] for _, data in pending} - resolved.keys()
+            if missing:
+                for account in Account.objects.filter(account_number__in=missing):
+                    resolved[account.account_number] = account
+                new_accounts = {}
+                for _, data in pending:
+                    number = data['account_number']
+                    if number not in resolved and number not in new_accounts:
+                        new_accounts[number] = Account(
+                            account_number=number,
+                            bank_name=data.get('bank_name') or 'Unknown',
+                            currency=data.get('currency', 'OMR')
+                        )
+                if new_accounts:
+                    Account.objects.bulk_create(new_accounts.values(), ignore_conflicts=True)
+                    for account in Account.objects.filter(account_number__in=new_accounts.keys()):
+                        resolved[account.account_number] = account
+                    logger.info(f"Created {len(new_accounts)} accounts")
+
+            # Check for existing transactions with one IN query
+            keyed = [
+                (resolved[data['account_number']].id, data.get('transaction_id'))
+                for _, data in pending
+            ]
+            transaction_ids = {tid for _, tid in keyed if tid}
+            existing = {}
+            if transaction_ids:
+                existing_rows = Transaction.objects.filter(
+                    account_id__in={account_id for account_id, _ in keyed},
+                    transaction_id__in=transaction_ids
+                ).only('id', 'account_id', 'transaction_id')
+                existing = {(row.account_id, row.transaction_id): row for row in existing_rows}
+
+            dimension_ids = TransactionRepository._resolve_dimensions(
+                [data for (_, data), key in zip(pending, keyed) if not (key[1] and key in existing)]
+            )
+            to_create = []
+            for (index, data), key in zip(pending, keyed):
+                if key[1] and key in existing:
+                    results[index] = {
+                        'status': IngestOutcome.DUPLICATE,
+                        'transaction': existing[key],
+                        'reason': f"Transaction {key[1]} already exists"
+                    }
+                    continue
+                try:
+                    transaction = TransactionRepository._build_transaction(
+                        resolved[data['account_number']], data, dimension_ids
+                    )
+                    # Foreign keys were just resolved; validating them would cost a query each
+                    transaction.full_clean(
+                        exclude=['account'] + [field for _, field, _ in DIMENSION_FIELDS],
+                        validate_unique=False, validate_constraints=False
+                    )
+                except Exception as e:
+                    results[index] = {
+                        'status': IngestOutcome.REJECTED,
+                        'transaction': None,
+                        'reason': str(e)
+                    }
+                    continue
+                if key[1]:
+                    # Later copies within the same batch are duplicates too
+                    existing[key] = transaction
+                to_create.append((index, transaction))
+                results[index] = {
+                    'status': IngestOutcome.CREATED,
+                    'transaction': transaction,
+                    'reason': None
+                }
+
+            created = Transaction.objects.bulk_create([transaction for _, transaction in to_create])
+            if created:
+                TransactionRepository._apply_deltas(
+                    TransactionRepository._deltas(
+                        Transaction.objects.filter(pk__in=[transaction.pk for transaction in created])
+                    )
+                )
+
+    @staticmethod
+    @serialized
+    def upsert_transactions(transactions_data, existing_ids=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Create new transactions and overwrite the parsed fields of existing ones.
+
+        An item updates the row given in ``existing_ids`` or, failing that,
+        the row bulk_create_transactions reports it as a duplicate of.
+
+        Args:
+            transactions_data (iterable): Transaction data dicts.
+            existing_ids (list): Primary key of the row each item replaces, or
+                None; aligned with transactions_data.
+            batch_size (int): Number of items written per database transaction.
+
+        Returns:
+            list: Outcome dicts as returned by bulk_create_transactions, with
+            ``IngestOutcome.UPDATED`` for rewritten rows.
+        """
+        transactions_data = list(transactions_data)
+        existing_ids = list(existing_ids or [None] * len(transactions_data))
+        results = [None] * len(transactions_data)
+
+        new_indexes = [index for index, pk in enumerate(existing_ids) if not pk]
+        created = TransactionRepository.bulk_create_transactions(
+            [transactions_data[index] for index in new_indexes], batch_size
+        )
+        updates = [(index, pk) for index, pk in enumerate(existing_ids) if pk]
+        for index, result in zip(new_indexes, created):
+            results[index] = result
+            if result['status'] == IngestOutcome.DUPLICATE:
+                updates.append((index, result['transaction'].pk))
+
+        for batch in _chunked(updates, batch_size):
+            try:
+                TransactionRepository._update_batch(batch, transactions_data, results)
+            except Exception as e:
+                logger.error(f"Error updating transaction batch: {str(e)}")
+                for index, _ in batch:
+                    results[index] = {'status': IngestOutcome.REJECTED, 'transaction': None, 'reason': str(e)}
+
+        updated = sum(1 for result in results if result['status'] == IngestOutcome.UPDATED)
+        logger.info(f"Upsert: {updated} updated out of {len(results)} transactions")
+        return results
+
+    @staticmethod
+    def _update_batch(batch, transactions_data, results):
+        """
+        Rewrite one batch of existing rows in a single database transaction.
+
+        Args:
+            batch (list): (index, primary key) pairs.
+            transactions_data (list): Transaction data dicts, indexed by the pairs.
+            results (list): Outcome list, filled in place.
+        """
+        with db_transaction.atomic():
+            rows = Transaction.objects.select_related('account').in_bulk({pk for _, pk in batch})
+            old_deltas = TransactionRepository._deltas(Transaction.objects.filter(pk__in=rows))
+            dimension_ids = TransactionRepository._resolve_dimensions(
+                [transactions_data[index] for index, pk in batch if pk in rows]
+            )
+
+            for index, pk in batch:
+                row = rows.get(pk)
+                if row is None:
+                    results[index] = {
+                        'status': IngestOutcome.REJECTED,
+                        'transaction': None,
+                        'reason': f"Transaction {pk} no longer exists"
+                    }
+                    continue
+                try:
+                    parsed = TransactionRepository._build_transaction(
+                        row.account, transactions_data[index], dimension_ids
+                    )
+                except ValueError as e:
+                    results[index] = {'status': IngestOutcome.REJECTED, 'transaction': None, 'reason': str(e)}
+                    continue
+                for field in UPSERT_FIELDS:
+                    setattr(row, field, getattr(parsed, field))
+                row.updated_at = timezone.now()
+                results[index] = {'status': IngestOutcome.UPDATED, 'transaction': row, 'reason': None}
+
+            Transaction.objects.bulk_update(rows.values(), UPSERT_FIELDS + ('updated_at',))
+            TransactionRepository._apply_deltas(old_deltas, sign=-1)
+            TransactionRepository._apply_deltas(
+                TransactionRepository._deltas(Transaction.objects.filter(pk__in=rows))
+            )
+
+    @staticmethod
+    @serialized
+    def delete_transactions(transactions):
+        """
+        Delete transactions and keep the account rollups in step.
+
+        Args:
+            transactions (QuerySet): Transactions to delete.
+
+        Returns:
+            int: Number of deleted transactions, or None if deletion fails.
+        """
+        try:
+            with db_transaction.atomic():
+                deltas = TransactionRepository._deltas(transactions)
+                deleted, _ = transactions.delete()
+                TransactionRepository._apply_deltas(deltas, sign=-1)
+            logger.info(f"Deleted {deleted} transactions")
+            return deleted
+
+        except Exception as e:
+            logger.error(f"Error deleting transactions: {str(e)}")
+            return None
+
+    @staticmethod
+    @serialized
+    def recategorize_transactions(transactions, category, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Set the category (transaction_details) of transactions with one UPDATE per batch.
+
+        Rows are taken in primary key batches, so a selection filtered on the
+        old category is not changed under its own feet. The period aggregates
+        move the batch from its old categories to the new one.
+
+        Args:
+            transactions (QuerySet): Transactions to recategorise.
+            category (str): New category; empty clears it.
+            batch_size (int): Rows updated per database transaction.
+
+        Returns:
+            int: Number of updated transactions, or None if the update fails.
+        """
+        category = category or None
+        updated = 0
+        last_pk = 0
+        try:
+            while True:
+                pks = list(
+                    transactions.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+                )
+                if not pks:
+                    break
+                last_pk = pks[-1]
+                with db_transaction.atomic():
+                    rows = Transaction.objects.filter(pk__in=pks)
+                    deltas = TransactionRepository._period_deltas(rows)
+                    updated += rows.update(transaction_details=category, updated_at=timezone.now())
+                    TransactionRepository._apply_period_deltas(deltas, sign=-1)
+                    TransactionRepository._apply_period_deltas(TransactionRepository._period_deltas(rows))
+            logger.info(f"Recategorised {updated} transactions as {category!r}")
+            return updated
+
+        except Exception as e:
+            logger.error(f"Error recategorising transactions: {str(e)}")
+            return None
+
+    @staticmethod
+    def _deltas(transactions):
+        """
+        Capture what some transactions contribute to every maintained aggregate.
+
+        Args:
+            transactions (QuerySet): Transactions to aggregate.
+
+        Returns:
+            tuple: (rollup deltas, period deltas) for _apply_deltas.
+        """
+        return TransactionRepository._rollup_deltas(transactions), TransactionRepository._period_deltas(transactions)
+
+    @staticmethod
+    def _apply_deltas(deltas, sign=1):
+        """
+        Add (or with ``sign=-1`` subtract) the output of _deltas to the stored aggregates.
+
+        Must run inside the database transaction that changed the rows.
+        """
+        rollup_deltas, period_deltas = deltas
+        TransactionRepository._apply_rollup_deltas(rollup_deltas, sign)
+        TransactionRepository._apply_period_deltas(period_deltas, sign)
+
+    @staticmethod
+    def _rollup_deltas(transactions):
+        """
+        Aggregate transactions into rollup values per (account, currency).
+
+        Args:
+            transactions (QuerySet): Transactions to aggregate.
+
+        Returns:
+            dict: Mapping of (account_id, currency) to rollup field values.
+        """
+        annotations = {
+            'transaction_count': Count('id'),
+            'first_transaction_at': Min('date_time'),
+            'last_transaction_at': Max('date_time')
+        }
+        for transaction_type in (TransactionType.INCOME, TransactionType.EXPENSE, TransactionType.TRANSFER):
+            of_type = Q(transaction_type=transaction_type)
+            annotations[f'total_{transaction_type}'] = Coalesce(Sum('amount_minor', filter=of_type), 0)
+            annotations[f'{transaction_type}_count'] = Count('id', filter=of_type)
+
+        rows = transactions.order_by().values('account_id', 'currency').annotate(**annotations)
+        deltas = {}
+        for row in rows:
+            key = (row.pop('account_id'), row.pop('currency'))
+            row['net_balance'] = row['total_income'] - row['total_expense']
+            deltas[key] = row
+        return deltas
+
+    @staticmethod
+    def _apply_rollup_deltas(deltas, sign=1):
+        """
+        Add (or with ``sign=-1`` subtract) rollup deltas to the stored rollups.
+
+        Must run inside the database transaction that changed the rows.
+
+        Args:
+            deltas (dict): Output of _rollup_deltas.
+            sign (int): 1 for inserted rows, -1 for deleted rows.
+        """
+        if not deltas:
+            return
+
+        AccountRollup.objects.bulk_create(
+            [AccountRollup(account_id=account_id, currency=currency) for account_id, currency in deltas],
+            ignore_conflicts=True
+        )
+        additive = [field for field in ROLLUP_FIELDS if not field.endswith('_at')]
+        for (account_id, currency), delta in deltas.items():
+            rollup = AccountRollup.objects.filter(account_id=account_id, currency=currency)
+            changes = {field: F(field) + sign * delta[field] for field in additive}
+            if sign > 0:
+                first, last = delta['first_transaction_at'], delta['last_transaction_at']
+                changes['first_transaction_at'] = Least(Coalesce('first_transaction_at', first), first)
+                changes['last_transaction_at'] = Greatest(Coalesce('last_transaction_at', last), last)
+            else:
+                # Extremes cannot be subtracted, so read them back from the remaining rows
+                remaining = Transaction.objects.filter(account_id=account_id, currency=currency).aggregate(
+                    first_transaction_at=Min('date_time'),
+                    last_transaction_at=Max('date_time')
+                )
+                changes.update(remaining)
+            rollup.update(**changes)
+            Account.objects.filter(pk=account_id, currency=currency).update(
+                balance_minor=F('balance_minor') + sign * delta['net_balance']
+            )
+        if sign < 0:
+            # A rollup left without transactions would not match a rebuild, which has no row for it
+            AccountRollup.objects.filter(
+                account_id__in={account_id for account_id, _ in deltas}, transaction_count=0
+            ).delete()
+        # Invalidates cached summaries of the touched accounts in every process
+        Account.objects.filter(pk__in={account_id for account_id, _ in deltas}).update(
+            summary_version=F('summary_version') + 1,
+            updated_at=timezone.now()
+        )
+
+    @staticmethod
+    def _period_deltas(transactions):
+        """
+        Aggregate transactions into daily and monthly aggregate values.
+
+        Args:
+            transactions (QuerySet): Transactions to aggregate.
+
+        Returns:
+            dict: ``daily`` and ``monthly`` mappings of (account_id, period,
+            currency, transaction_type, category) to [count, total].
+        """
+        rows = transactions.order_by().values(
+            'account_id', 'currency', 'transaction_type',
+            day=TruncDate('date_time'),
+            category=Coalesce('transaction_details', Value(''))
+        ).annotate(transaction_count=Count('id'), total_amount=Sum('amount_minor'))
+
+        daily = {}
+        monthly = defaultdict(lambda: [0, 0])
+        for row in rows:
+            key = (row['currency'], row['transaction_type'], row['category'])
+            daily[(row['account_id'], row['day']) + key] = [row['transaction_count'], row['total_amount']]
+            month = monthly[(row['account_id'], _month_start(row['day'])) + key]
+            month[0] += row['transaction_count']
+            month[1] += row['total_amount']
+        return {'daily': daily, 'monthly': dict(monthly)}
+
+    @staticmethod
+    def _apply_period_deltas(deltas, sign=1):
+        """
+        Add (or with ``sign=-1`` subtract) period deltas to the stored aggregates.
+
+        Aggregates left without transactions are deleted. Must run inside the
+        database transaction that changed the rows.
+
+        Args:
+            deltas (dict): Output of _period_deltas.
+            sign (int): 1 for inserted rows, -1 for deleted rows.
+        """
+        for model, period_field, values in (
+            (DailyAggregate, 'day', deltas['daily']),
+            (MonthlyAggregate, 'month', deltas['monthly'])
+        ):
+            if not values:
+                continue
+            keys = [
+                {'account_id': account_id, period_field: period, 'currency': currency,
+                 'transaction_type': transaction_type, 'category': category}
+                for account_id, period, currency, transaction_type, category in values
+            ]
+            if sign > 0:
+                model.objects.bulk_create([model(**key) for key in keys], ignore_conflicts=True)
+            for key, (count, total) in zip(keys, values.values()):
+                model.objects.filter(**key).update(
+                    transaction_count=F('transaction_count') + sign * count,
+                    total_amount=F('total_amount') + sign * total
+                )
+            if sign < 0:
+                model.objects.filter(
+                    account_id__in={key['account_id'] for key in keys},
+                    transaction_count__lte=0
+                ).delete()
+
+    @staticmethod
+    @serialized
+    def rebuild_period_aggregates(start_day=None, end_day=None):
+        """
+        Recompute the daily and monthly aggregates of a range from the transaction table.
+
+        The range is widened to whole months, since monthly rows are summed
+        from the daily ones.
+
+        Args:
+            start_day (date): First day to rebuild (default: first transaction).
+            end_day (date): Last day to rebuild, inclusive (default: last transaction).
+
+        Returns:
+            dict: Number of ``daily`` and ``monthly`` rows written.
+        """
+        if start_day is None or end_day is None:
+            bounds = Transaction.objects.aggregate(first=Min('date_time'), last=Max('date_time'))
+            if bounds['first'] is None:
+                with db_transaction.atomic():
+                    DailyAggregate.objects.all().delete()
+                    MonthlyAggregate.objects.all().delete()
+                return {'daily': 0, 'monthly': 0}
+            start_day = start_day or timezone.localtime(bounds['first']).date()
+            end_day = end_day or timezone.localtime(bounds['last']).date()
+
+        first_month, end_month = _month_start(start_day), _next_month(end_day)
+        transactions = Transaction.objects.filter(
+            date_time__gte=_day_start(first_month),
+            date_time__lt=_day_start(end_month)
+        )
+        with db_transaction.atomic():
+            deltas = TransactionRepository._period_deltas(transactions)
+            DailyAggregate.objects.filter(day__gte=first_month, day__lt=end_month).delete()
+            MonthlyAggregate.objects.filter(month__gte=first_month, month__lt=end_month).delete()
+            for model, period_field, values in (
+                (DailyAggregate, 'day', deltas['daily']),
+                (MonthlyAggregate, 'month', deltas['monthly'])
+            ):
+                model.objects.bulk_create(
+                    (
+                        model(
+                            account_id=account_id, currency=currency, transaction_type=transaction_type,
+                            category=category, transaction_count=count, total_amount=total,
+                            **{period_field: period}
+                        )
+                        for (account_id, period, currency, transaction_type, category), (count, total)
+                        in values.items()
+                    ),
+                    batch_size=TransactionRepository.DEFAULT_BATCH_SIZE
+                )
+
+        logger.info(
+            f"Rebuilt period aggregates from {first_month} to {end_month}: "
+            f"{len(deltas['daily'])} daily, {len(deltas['monthly'])} monthly"
+        )
+        return {'daily': len(deltas['daily']), 'monthly': len(deltas['monthly'])}
+
+    @staticmethod
+    @serialized
+    def rebuild_rollups(dry_run=False):
+        """
+        Recompute every account rollup from the transaction table.
+
+        Args:
+            dry_run (bool): Only compare, do not write.
+
+        Returns:
+            list: (account_id, currency) keys whose stored rollup differed.
+        """
+        expected = TransactionRepository._rollup_deltas(Transaction.objects.all())
+        stored = {
+            (rollup.account_id, rollup.currency): rollup
+            for rollup in AccountRollup.objects.all()
+        }
+
+        mismatched = []
+        for key in expected.keys() | stored.keys():
+            values = expected.get(key)
+            rollup = stored.get(key)
+            if values is None or rollup is None:
+                mismatched.append(key)
+                continue
+            if any(getattr(rollup, field) != values[field] for field in ROLLUP_FIELDS):
+                mismatched.append(key)
+
+        if dry_run:
+            return sorted(mismatched)
+
+        with db_transaction.atomic():
+            AccountRollup.objects.all().delete()
+            AccountRollup.objects.bulk_create([
+                AccountRollup(account_id=account_id, currency=currency, **values)
+                for (account_id, currency), values in expected.items()
+            ])
+            for account in Account.objects.all():
+                values = expected.get((account.id, account.currency))
+                balance = values['net_balance'] if values else 0
+                if account.balance_minor != balance:
+                    Account.objects.filter(pk=account.pk).update(balance_minor=balance)
+            Account.objects.filter(pk__in={account_id for account_id, _ in mismatched}).update(
+                summary_version=F('summary_version') + 1,
+                updated_at=timezone.now()
+            )
+
+        logger.info(f"Rebuilt {len(expected)} account rollups, {len(mismatched)} differed")
+        return sorted(mismatched)
+
+    @staticmethod
+    def _with_summary(accounts):
+        """
+        Annotate an Account queryset with per-type totals and counts.
+
+        Values are read from the account rollups, so the cost does not depend
+        on the number of transactions.
+
+        Args:
+            accounts (QuerySet): Account queryset.
+
+        Returns:
+            QuerySet: Annotated account queryset.
+        """
+        annotations = {
+            'first_transaction_at': Min('rollups__first_transaction_at'),
+            'last_transaction_at': Max('rollups__last_transaction_at')
+        }
+        for field in ROLLUP_FIELDS:
+            if not field.endswith('_at'):
+                annotations[field] = Sum(f'rollups__{field}')
+        return accounts.annotate(**annotations)
+
+    @staticmethod
+    def _summary_from_account(account):
+        """
+        Build a summary dict from an account annotated by _with_summary.
+
+        Args:
+            account (Account): Annotated account.
+
+        Returns:
+            dict: Account summary, amounts as Decimals in the account currency.
+        """
+        return {
+            'account': account,
+            'transaction_count': account.transaction_count or 0,
+            'income_count': account.income_count or 0,
+            'expense_count': account.expense_count or 0,
+            'transfer_count': account.transfer_count or 0,
+            'total_income': from_minor_units(account.total_income, account.currency),
+            'total_expense': from_minor_units(account.total_expense, account.currency),
+            'total_transfer': from_minor_units(account.total_transfer, account.currency),
+            'net_balance': from_minor_units(account.net_balance, account.currency),
+            'first_transaction_at': account.first_transaction_at,
+            'last_transaction_at': account.last_transaction_at
+        }
+
     @staticmethod
     def get_account_summary(account_number):
         """
@@ -202,57 +1236,459 @@ class TransactionRepository:
         """
         try:
             try:
-                account = Account.objects.get(account_number=account_number)
+                account = TransactionRepository._with_summary(
+                    Account.objects.filter(account_number=account_number)
+                ).get()
             except Account.DoesNotExist:
                 return None
 
-            transactions = Transaction.objects.filter(account=account)
-
-            total_income = sum(t.amount for t in transactions if t.transaction_type == TransactionType.INCOME)
-            total_expense = sum(t.amount for t in transactions if t.transaction_type == TransactionType.EXPENSE)
-            total_transfer = sum(t.amount for t in transactions if t.transaction_type == TransactionType.TRANSFER)
-
-            return {
-                'account': account,
-                'transaction_count': transactions.count(),
-                'total_income': total_income,
-                'total_expense': total_expense,
-                'total_transfer': total_transfer,
-                'net_balance': total_income - total_expense,
-                'transactions': transactions
-            }
+            return TransactionRepository._summary_from_account(account)
 
         except Exception as e:
             logger.error(f"Error getting account summary: {str(e)}")
             return None
 
     @staticmethod
-    def get_transactions_by_date_range(account_number, start_date, end_date):
+    def get_account_summaries():
+        """
+        Get summaries for all accounts.
+
+        Returns:
+            list: Account summaries ordered by account number.
+        """
+        try:
+            accounts = TransactionRepository._with_summary(
+                Account.objects.order_by('account_number')
+            )
+            return [TransactionRepository._summary_from_account(account) for account in accounts]
+
+        except Exception as e:
+            logger.error(f"Error getting account summaries: {str(e)}")
+            return []
+
+    @staticmethod
+    def get_transactions_by_date_range(account_number, start_date, end_date,
+                                       before=None, after=None, page_size=None):
         """
         Get transactions within a date range for an account.
 
+        Without pagination arguments the full queryset is returned. With
+        ``page_size`` or a cursor, one keyset page is returned instead (see
+        pagination.paginate).
+
         Args:
             account_number (str): Account number.
-            start_date (datetime): Start date.
-            end_date (datetime): End date.
+            start_date (datetime): Start date, or None for no lower bound.
+            end_date (datetime): End date, or None for no upper bound.
+            before (str): Cursor; page through rows older than it.
+            after (str): Cursor; page through rows newer than it.
+            page_size (int): Rows per page.
 
         Returns:
-            QuerySet: List of transactions.
+            QuerySet or dict: List of transactions, or a page of them.
         """
+        paginated = page_size is not None or before or after
         try:
             try:
                 account = Account.objects.get(account_number=account_number)
             except Account.DoesNotExist:
-                return []
+                return paginate(Transaction.objects.none(), page_size=page_size) if paginated else []
 
-            transactions = Transaction.objects.filter(
-                account=account,
-                date_time__gte=start_date,
-                date_time__lte=end_date
-            ).order_by('-date_time')
+            transactions = Transaction.objects.filter(account=account)
+            if start_date is not None:
+                transactions = transactions.filter(date_time__gte=start_date)
+            if end_date is not None:
+                transactions = transactions.filter(date_time__lte=end_date)
+            transactions = transactions.order_by('-date_time', '-id')
 
+            if paginated:
+                return paginate(transactions, before=before, after=after, page_size=page_size)
             return transactions
 
         except Exception as e:
             logger.error(f"Error getting transactions by date range: {str(e)}")
-            return []
\ No newline at end of file
+            return paginate(Transaction.objects.none(), page_size=page_size) if paginated else []
+
+    @staticmethod
+    def search(query, account=None, date_range=None, page=1, page_size=None):
+        """
+        Full-text search over the description, counterparty, parties, details, branch and reference.
+
+        Every word of the query must match the start of a word in one of those
+        columns. Ranking costs time per match, so only the SEARCH_RANK_WINDOW
+        most recently stored matches (highest ids, which FTS5 walks without
+        sorting) are ranked by BM25, best match first. Pages past them list
+        the remaining matches most recently stored first, so every match is
+        still reachable.
+
+        Args:
+            query (str): Free text.
+            account (str): Account number to search within.
+            date_range (tuple): (start, end) datetimes, inclusive; either may be None.
+            page (int): 1-based page number.
+            page_size (int): Results per page, clamped like other transaction pages.
+
+        Returns:
+            dict: ``transactions`` (list), ``page``, ``page_size``, ``has_next``,
+            ``ranked_count`` (matches ranked) and ``ranking_truncated`` (whether
+            more matches exist than were ranked).
+        """
+        page_size = page_size_from(page_size)
+        try:
+            page = max(int(page or 1), 1)
+        except (TypeError, ValueError):
+            page = 1
+        results = {
+            'transactions': [], 'page': page, 'page_size': page_size, 'has_next': False,
+            'ranked_count': 0, 'ranking_truncated': False
+        }
+
+        expression = search_expression(query)
+        if expression is None:
+            return results
+
+        table = Transaction._meta.db_table
+        conditions = [f'{SEARCH_TABLE} MATCH %s']
+        params = [expression]
+        if account:
+            conditions.append(
+                f'transaction_row.account_id = (SELECT id FROM {Account._meta.db_table} WHERE account_number = %s)'
+            )
+            params.append(account)
+        start, end = date_range or (None, None)
+        if start:
+            conditions.append('transaction_row.date_time >= %s')
+            params.append(connection.ops.adapt_datetimefield_value(start))
+        if end:
+            conditions.append('transaction_row.date_time <= %s')
+            params.append(connection.ops.adapt_datetimefield_value(end))
+        matches = (
+            f'FROM {SEARCH_TABLE} JOIN {table} AS transaction_row ON transaction_row.id = {SEARCH_TABLE}.rowid '
+            f'WHERE {" AND ".join(conditions)}'
+        )
+        window = settings.SEARCH_RANK_WINDOW
+        offset = (page - 1) * page_size
+
+        try:
+            with connection.cursor() as cursor:
+                # Walking the matches by descending id stops at the window; only those get ranked
+                cursor.execute(
+                    f'SELECT rowid FROM ('
+                    f'SELECT {SEARCH_TABLE}.rowid AS rowid, {SEARCH_TABLE}.rank AS rank {matches} '
+                    f'ORDER BY {SEARCH_TABLE}.rowid DESC LIMIT %s'
+                    f') ORDER BY rank',
+                    params + [window]
+                )
+                ranked = [row[0] for row in cursor.fetchall()]
+                # One extra row tells whether there is a next page
+                ids = ranked[offset:offset + page_size + 1]
+                truncated = bool(ranked) and len(ranked) == window
+                if truncated and len(ids) <= page_size:
+                    # The matches older than the window follow, unranked
+                    cursor.execute(
+                        f'SELECT {SEARCH_TABLE}.rowid {matches} AND {SEARCH_TABLE}.rowid < %s '
+                        f'ORDER BY {SEARCH_TABLE}.rowid DESC LIMIT %s OFFSET %s',
+                        params + [min(ranked), page_size + 1 - len(ids), max(offset - window, 0)]
+                    )
+                    ids += [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error searching transactions for {query!r}: {str(e)}")
+            return results
+
+        results['ranked_count'] = len(ranked)
+        results['ranking_truncated'] = truncated
+        rows = Transaction.objects.select_related('account', 'counterparty', 'to_party').in_bulk(ids[:page_size])
+        results['transactions'] = [rows[pk] for pk in ids[:page_size] if pk in rows]
+        results['has_next'] = len(ids) > page_size
+        return results
+
+    @staticmethod
+    def get_period_totals(start_date, end_date, period='month', account_number=None):
+        """
+        Get transaction counts and totals per period over a date range.
+
+        Whole months are read from the monthly aggregates and whole days from
+        the daily ones; only the partial days at either edge of the range are
+        summed from the transaction table, so the cost does not grow with the
+        number of transactions in the range.
+
+        Args:
+            start_date (datetime or date): Start of the range, inclusive.
+            end_date (datetime or date): End of the range, exclusive.
+            period (str): 'month' or 'day'.
+            account_number (str): Only this account (default: all accounts).
+
+        Returns:
+            list: Dicts with period (date of the day or first of the month),
+            account_id, currency, transaction_type, category, transaction_count
+            total_amount (Decimal) and total_minor (int), ordered by period.
+        """
+        if period not in ('day', 'month'):
+            raise ValueError(f"Unknown period: {period}")
+
+        def aware(value):
+            if not isinstance(value, datetime):
+                return _day_start(value)
+            return timezone.make_aware(value) if timezone.is_naive(value) else value
+
+        try:
+            start, end = aware(start_date), aware(end_date)
+            filters = {}
+            if account_number is not None:
+                try:
+                    filters['account_id'] = Account.objects.get(account_number=account_number).pk
+                except Account.DoesNotExist:
+                    return []
+            if start >= end:
+                return []
+
+            # Whole days covered by the range: [first_day, end_day)
+            local_start, local_end = timezone.localtime(start), timezone.localtime(end)
+            first_day = local_start.date()
+            if local_start != _day_start(first_day):
+                first_day += timedelta(days=1)
+            end_day = local_end.date()
+
+            totals = defaultdict(lambda: [0, 0])
+            bucket = _month_start if period == 'month' else (lambda day: day)
+            group = ('account_id', 'currency', 'transaction_type', 'category')
+
+            def add(rows, period_field):
+                for row in rows:
+                    entry = totals[(bucket(row[period_field]),) + tuple(row[field] for field in group)]
+                    entry[0] += row['transaction_count']
+                    entry[1] += row['total_amount']
+
+            def add_days(first, last):
+                if first < last:
+                    add(DailyAggregate.objects.filter(day__gte=first, day__lt=last, **filters).values(
+                        'day', *group, 'transaction_count', 'total_amount'
+                    ), 'day')
+
+            def add_raw(first, last):
+                if first < last:
+                    add(Transaction.objects.filter(
+                        date_time__gte=first, date_time__lt=last, **filters
+                    ).order_by().values(
+                        'account_id', 'currency', 'transaction_type',
+                        day=TruncDate('date_time'),
+                        category=Coalesce('transaction_details', Value(''))
+                    ).annotate(transaction_count=Count('id'), total_amount=Sum('amount_minor')), 'day')
+
+            if first_day >= end_day:
+                add_raw(start, end)
+            else:
+                add_raw(start, _day_start(first_day))
+                add_raw(_day_start(end_day), end)
+                first_month = first_day if first_day.day == 1 else _next_month(first_day)
+                end_month = _month_start(end_day)
+                if period == 'month' and first_month < end_month:
+                    add_days(first_day, first_month)
+                    add(MonthlyAggregate.objects.filter(
+                        month__gte=first_month, month__lt=end_month, **filters
+                    ).values('month', *group, 'transaction_count', 'total_amount'), 'month')
+                    add_days(end_month, end_day)
+                else:
+                    add_days(first_day, end_day)
+
+            return [
+                dict(
+                    zip(('period',) + group, key),
+                    transaction_count=count,
+                    total_amount=from_minor_units(total, key[2]),
+                    total_minor=total
+                )
+                for key, (count, total) in sorted(totals.items(), key=lambda item: item[0])
+                if count
+            ]
+
+        except Exception as e:
+            logger.error(f"Error getting period totals: {str(e)}")
+            return []
+
+    @staticmethod
+    def get_counterparty_totals(start_date=None, end_date=None, account_number=None, counterparty=None):
+        """
+        Get transaction counts and totals per counterparty.
+
+        Rows are grouped on the indexed counterparty foreign key; names are
+        read afterwards for the groups only.
+
+        Args:
+            start_date (datetime): Start of the range, inclusive (default: unbounded).
+            end_date (datetime): End of the range, exclusive (default: unbounded).
+            account_number (str): Only this account (default: all accounts).
+            counterparty (str): Only this counterparty, matched on its normalised name.
+
+        Returns:
+            list: Dicts with counterparty_id, counterparty (name), currency,
+            transaction_type, transaction_count, total_amount (Decimal) and
+            total_minor (int), ordered by counterparty name.
+        """
+        try:
+            transactions = Transaction.objects.filter(counterparty__isnull=False)
+            if account_number is not None:
+                transactions = transactions.filter(account__account_number=account_number)
+            if counterparty is not None:
+                transactions = transactions.filter(counterparty__key=normalize_name(counterparty))
+            if start_date is not None:
+                transactions = transactions.filter(date_time__gte=start_date)
+            if end_date is not None:
+                transactions = transactions.filter(date_time__lt=end_date)
+
+            rows = list(
+                transactions.order_by().values('counterparty_id', 'currency', 'transaction_type')
+                .annotate(transaction_count=Count('id'), total_minor=Sum('amount_minor'))
+            )
+            names = dict(
+                Counterparty.objects.filter(pk__in={row['counterparty_id'] for row in rows}).values_list('pk', 'name')
+            )
+            for row in rows:
+                row['counterparty'] = names.get(row['counterparty_id'])
+                row['total_amount'] = from_minor_units(row['total_minor'], row['currency'])
+            return sorted(rows, key=lambda row: (row['counterparty'] or '', row['currency'], row['transaction_type']))
+
+        except Exception as e:
+            logger.error(f"Error getting counterparty totals: {str(e)}")
+            return []
+
+class ParseBatchRepository:
+    """Repository class for parse batch operations."""
+
+    # Ingestion outcome to item status
+    OUTCOME_STATUS = {
+        IngestOutcome.CREATED: ParseItemStatus.SAVED,
+        IngestOutcome.UPDATED: ParseItemStatus.SAVED,
+        IngestOutcome.DUPLICATE: ParseItemStatus.DUPLICATE,
+        IngestOutcome.REJECTED: ParseItemStatus.REJECTED,
+    }
+
+    @staticmethod
+    def create_batch(source, emails, results):
+        """
+        Store the results of a parse run.
+
+        Batches older than PARSE_BATCH_RETENTION_DAYS are deleted first.
+
+        Args:
+            source (str): ParseBatchSource value.
+            emails (list): Email data dicts.
+            results (list): Parse results aligned with emails, as returned by
+                ingest_emails (``transaction``, ``error`` and, for saved
+                runs, ``outcome`` and ``stored_id``).
+
+        Returns:
+            ParseBatch: The saved batch.
+        """
+        ParseBatchRepository.delete_expired(settings.PARSE_BATCH_RETENTION_DAYS)
+
+        items = []
+        for position, (email_data, result) in enumerate(zip(emails, results)):
+            if result.get('error'):
+                status = ParseItemStatus.FAILED
+            elif not result.get('transaction'):
+                status = ParseItemStatus.UNPARSED
+            else:
+                status = ParseBatchRepository.OUTCOME_STATUS.get(result.get('outcome'), ParseItemStatus.PARSED)
+            items.append(ParseBatchItem(
+                position=position,
+                email_id=(email_data.get('id') or '')[:255] or None,
+                subject=(email_data.get('subject') or '')[:500],
+                status=status,
+                transaction_data=result.get('transaction'),
+                error=result.get('error'),
+                transaction_id=result.get('stored_id') if status != ParseItemStatus.PARSED else None
+            ))
+
+        with db_transaction.atomic():
+            batch = ParseBatch.objects.create(
+                source=source,
+                message_count=len(items),
+                parsed_count=sum(1 for item in items if item.transaction_data),
+                error_count=sum(1 for item in items if item.status == ParseItemStatus.FAILED),
+                saved_count=sum(1 for item in items if item.transaction_id),
+                saved_at=timezone.now() if any(item.transaction_id for item in items) else None
+            )
+            for item in items:
+                item.batch = batch
+            ParseBatchItem.objects.bulk_create(items, batch_size=TransactionRepository.DEFAULT_BATCH_SIZE)
+        return batch
+
+    @staticmethod
+    def get_batch(batch_id):
+        """
+        Get a parse batch.
+
+        Args:
+            batch_id (int): Batch primary key.
+
+        Returns:
+            ParseBatch: The batch, or None if it does not exist.
+        """
+        try:
+            return ParseBatch.objects.get(pk=batch_id)
+        except (ParseBatch.DoesNotExist, ValueError, TypeError):
+            return None
+
+    @staticmethod
+    def save_batch(batch, batch_size=TransactionRepository.DEFAULT_BATCH_SIZE):
+        """
+        Store every parsed, unsaved transaction of a batch.
+
+        Args:
+            batch (ParseBatch): Batch to save.
+            batch_size (int): Items stored per database transaction.
+
+        Returns:
+            dict: Counts of created, duplicates and rejected items.
+        """
+        stats = {'created': 0, 'duplicates': 0, 'rejected': 0}
+        pending = batch.items.filter(status=ParseItemStatus.PARSED).order_by('position')
+        last_position = -1
+        while True:
+            # Keyset over the position, since saved items drop out of the filter
+            items = list(pending.filter(position__gt=last_position)[:batch_size])
+            if not items:
+                break
+            last_position = items[-1].position
+
+            outcomes = TransactionRepository.bulk_create_transactions(
+                [item.transaction_data for item in items], batch_size=batch_size
+            )
+            for item, outcome in zip(items, outcomes):
+                item.status = ParseBatchRepository.OUTCOME_STATUS[outcome['status']]
+                item.transaction = outcome['transaction']
+                item.error = outcome['reason'] if outcome['status'] == IngestOutcome.REJECTED else item.error
+                if outcome['status'] == IngestOutcome.CREATED:
+                    stats['created'] += 1
+                elif outcome['status'] == IngestOutcome.DUPLICATE:
+                    stats['duplicates'] += 1
+                else:
+                    stats['rejected'] += 1
+            ParseBatchItem.objects.bulk_update(items, ['status', 'transaction', 'error'])
+
+        if stats['created'] or stats['duplicates']:
+            ParseBatch.objects.filter(pk=batch.pk).update(
+                saved_count=F('saved_count') + stats['created'] + stats['duplicates'],
+                saved_at=timezone.now()
+            )
+            batch.refresh_from_db()
+        logger.info(f"Saved parse batch {batch.pk}: {stats}")
+        return stats
+
+    @staticmethod
+    def delete_expired(days):
+        """
+        Delete batches created more than ``days`` days ago.
+
+        Args:
+            days (int): Retention in days; 0 keeps everything.
+
+        Returns:
+            int: Number of batches deleted.
+        """
+        if not days:
+            return 0
+        expired = ParseBatch.objects.filter(created_at__lt=timezone.now() - timedelta(days=days))
+        deleted, per_model = expired.delete()
+        return per_model.get(ParseBatch._meta.label, 0)
@@ -0,0 +1,126 @@
+"""
+Keyset (cursor) pagination for transaction lists.
+
+Pages are ordered newest first on (date_time, id). A cursor encodes the
+position of a row, so fetching any page is an index range scan of page_size
+rows no matter how deep into the history it is.
+"""
+
+import base64
+import binascii
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+
+# Columns shown in transaction history tables
+TRANSACTION_LIST_FIELDS = (
+    'date_time', 'transaction_type', 'amount_minor', 'currency', 'description',
+    'sender__name', 'receiver__name'
+)
+
+# Interned names read with them, joined in the same query
+TRANSACTION_LIST_RELATED = ('sender', 'receiver')
+
+
+def encode_cursor(transaction):
+    """
+    Encode the position of a transaction as an opaque cursor.
+
+    Args:
+        transaction (Transaction): Transaction with date_time and pk loaded.
+
+    Returns:
+        str: URL-safe cursor.
+    """
+    raw = f"{transaction.date_time.isoformat()}|{transaction.pk}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): Cursor string.
+
+    Returns:
+        tuple: (datetime, int) position, or None if the cursor is invalid.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        date_time, pk = raw.rsplit('|', 1)
+        return datetime.fromisoformat(date_time), int(pk)
+    except (ValueError, UnicodeError, binascii.Error):
+        return None
+
+
+def page_size_from(value):
+    """
+    Clamp a requested page size to the configured bounds.
+
+    Args:
+        value: Requested page size (may be None or a string).
+
+    Returns:
+        int: Page size to use.
+    """
+    try:
+        page_size = int(value)
+    except (TypeError, ValueError):
+        return settings.TRANSACTIONS_PAGE_SIZE
+    return max(1, min(page_size, settings.TRANSACTIONS_MAX_PAGE_SIZE))
+
+
+def paginate(transactions, before=None, after=None, page_size=None):
+    """
+    Return one page of transactions, newest first.
+
+    Args:
+        transactions (QuerySet): Transactions to paginate.
+        before (str): Cursor; return the rows older than it.
+        after (str): Cursor; return the rows newer than it.
+        page_size (int): Rows per page.
+
+    Returns:
+        dict: Page with ``transactions`` (list), ``next_cursor`` (older rows),
+        ``previous_cursor`` (newer rows) and ``page_size``.
+    """
+    page_size = page_size_from(page_size)
+    position = decode_cursor(after) if after else None
+    newer = position is not None
+    if not newer and before:
+        position = decode_cursor(before)
+
+    if position is None:
+        queryset = transactions.order_by('-date_time', '-id')
+    else:
+        date_time, pk = position
+        # The redundant inclusive bound lets the database seek into the
+        # (account, date_time) index instead of scanning from the top
+        if newer:
+            queryset = transactions.filter(date_time__gte=date_time).filter(
+                Q(date_time__gt=date_time) | Q(date_time=date_time, id__gt=pk)
+            ).order_by('date_time', 'id')
+        else:
+            queryset = transactions.filter(date_time__lte=date_time).filter(
+                Q(date_time__lt=date_time) | Q(date_time=date_time, id__lt=pk)
+            ).order_by('-date_time', '-id')
+
+    rows = list(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if newer:
+        rows.reverse()
+
+    if newer:
+        has_older, has_newer = True, has_more
+    else:
+        has_older, has_newer = has_more, position is not None
+
+    return {
+        'transactions': rows,
+        'next_cursor': encode_cursor(rows[-1]) if rows and has_older else None,
+        'previous_cursor': encode_cursor(rows[0]) if rows and has_newer else None,
+        'page_size': page_size
+    }
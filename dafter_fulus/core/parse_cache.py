@@ -0,0 +1,188 @@
+"""
+Content-addressed cache of parse results.
+
+Entries are keyed by a hash of the normalised email content and the parser
+version, so a message seen before is not parsed again, and any change to the
+parsing rules yields new keys: stale entries simply stop being hit and are
+evicted, least recently used first, once the cache is over its size bound.
+"""
+
+import hashlib
+import logging
+from email.utils import parseaddr
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ParseCacheEntry, _chunked
+
+logger = logging.getLogger(__name__)
+
+# Fields that depend on the delivered copy of an email rather than on its content
+PER_MESSAGE_FIELDS = ('email_id', 'email_date', 'parse_ms')
+
+_default_cache = None
+
+
+def fingerprint(email_data, version):
+    """
+    Hash the parser-relevant content of an email.
+
+    The sender is reduced to its lower-cased address and line endings and
+    trailing whitespace are normalised, so the same alert fetched over IMAP or
+    read from an export hashes the same.
+
+    Args:
+        email_data (dict): Email with from, subject, date and body.
+        version (str): Parser version.
+
+    Returns:
+        str: Hex SHA-256 digest.
+    """
+    body = (email_data.get('body') or '').replace('\r\n', '\n').replace('\r', '\n')
+    body = '\n'.join(line.rstrip() for line in body.strip().split('\n'))
+    parts = (
+        version,
+        parseaddr(email_data.get('from') or '')[1].lower(),
+        (email_data.get('subject') or '').strip(),
+        (email_data.get('date') or '').strip(),
+        body,
+    )
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8', errors='surrogatepass'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def with_message_fields(transaction_data, email_data):
+    """Fill the per-message fields of cached transaction data from the email at hand."""
+    if transaction_data is None:
+        return None
+    return dict(transaction_data, email_id=email_data.get('id'), email_date=email_data.get('date'))
+
+
+class ParseCache:
+    """
+    Parse results stored in the ParseCacheEntry table with LRU eviction.
+
+    ``stats`` counts hits, misses and evictions over the life of the object.
+    """
+
+    def __init__(self, max_entries=None):
+        """
+        Args:
+            max_entries (int): Entries kept before the least recently used are
+                evicted (default: PARSE_CACHE_MAX_ENTRIES).
+        """
+        self.max_entries = max_entries or settings.PARSE_CACHE_MAX_ENTRIES
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def lookup(self, emails, version):
+        """
+        Find the cached results for a batch of emails and mark them used.
+
+        Args:
+            emails (list): Email data dicts.
+            version (str): Parser version.
+
+        Returns:
+            tuple: (list of keys in input order, dict of key to ParseCacheEntry).
+        """
+        keys = [fingerprint(email_data, version) for email_data in emails]
+        entries = ParseCacheEntry.objects.filter(parser_version=version).in_bulk(set(keys))
+
+        hits = sum(1 for key in keys if key in entries)
+        self.stats['hits'] += hits
+        self.stats['misses'] += len(keys) - hits
+        if entries:
+            now = timezone.now()
+            for chunk in _chunked(entries, 500):
+                ParseCacheEntry.objects.filter(pk__in=chunk).update(last_used_at=now, hits=F('hits') + 1)
+        return keys, entries
+
+    @staticmethod
+    def restore(entry, email_data):
+        """
+        Rebuild the transaction data of a hit for a particular email.
+
+        Args:
+            entry (ParseCacheEntry): Cached entry.
+            email_data (dict): Email the entry was looked up for.
+
+        Returns:
+            dict: Transaction data, or None if the email held no transaction.
+        """
+        transaction_data = with_message_fields(entry.result, email_data)
+        if transaction_data is not None:
+            transaction_data['parse_cached'] = True
+        return transaction_data
+
+    def store(self, version, results):
+        """
+        Cache freshly parsed results, then evict down to the size bound.
+
+        Args:
+            version (str): Parser version.
+            results (list): (key, transaction data or None) pairs.
+        """
+        now = timezone.now()
+        entries = [
+            ParseCacheEntry(
+                key=key,
+                parser_version=version,
+                result=None if data is None else {
+                    field: value for field, value in data.items() if field not in PER_MESSAGE_FIELDS
+                },
+                last_used_at=now
+            )
+            for key, data in results
+        ]
+        if entries:
+            ParseCacheEntry.objects.bulk_create(entries, batch_size=500, ignore_conflicts=True)
+            self.evict()
+
+    @staticmethod
+    def link(transaction_ids):
+        """
+        Record the stored transaction of each entry, so later hits skip the duplicate check.
+
+        Args:
+            transaction_ids (dict): Cache key to Transaction primary key.
+        """
+        entries = [ParseCacheEntry(key=key, transaction_id=pk) for key, pk in transaction_ids.items()]
+        if entries:
+            ParseCacheEntry.objects.bulk_update(entries, ['transaction'], batch_size=500)
+
+    def evict(self):
+        """
+        Delete the least recently used entries beyond max_entries.
+
+        Returns:
+            int: Number of entries evicted.
+        """
+        excess = ParseCacheEntry.objects.count() - self.max_entries
+        if excess <= 0:
+            return 0
+        stale = list(ParseCacheEntry.objects.order_by('last_used_at').values_list('pk', flat=True)[:excess])
+        for chunk in _chunked(stale, 500):
+            ParseCacheEntry.objects.filter(pk__in=chunk).delete()
+        self.stats['evictions'] += len(stale)
+        logger.info(f"Evicted {len(stale)} parse cache entries")
+        return len(stale)
+
+
+def get_parse_cache():
+    """
+    Return the process-wide parse cache.
+
+    Returns:
+        ParseCache: The shared cache, or None when PARSE_CACHE_ENABLED is off.
+    """
+    global _default_cache
+    if not settings.PARSE_CACHE_ENABLED:
+        return None
+    if _default_cache is None:
+        _default_cache = ParseCache()
+    return _default_cache
@@ -0,0 +1,19 @@
+"""
+Rule-based parsing of bank alert emails.
+
+Bank formats are registered as rule sets whose regexes are compiled once at
+import. RuleBasedParser picks the rule sets for a message with dictionary
+lookups on the sender address, sender domain and subject prefix, so adding
+banks does not make parsing any message slower. Messages no rule set claims
+go to a generic fallback parser.
+"""
+
+from .registry import BankRuleSet, Rule, RuleRegistry, default_registry
+from .parser import GENERIC_RULE, RuleBasedParser
+from .executor import ParseExecutor, build_default_parser, parse_safely
+from . import banks  # noqa: F401  Registers the built-in rule sets
+
+__all__ = [
+    'BankRuleSet', 'GENERIC_RULE', 'ParseExecutor', 'Rule', 'RuleBasedParser', 'RuleRegistry',
+    'build_default_parser', 'default_registry', 'parse_safely',
+]
@@ -0,0 +1,58 @@
+"""
+Built-in bank rule sets.
+"""
+
+from .registry import BankRuleSet, Rule, default_registry
+
+AMOUNT = r'(?P<currency>[A-Z]{3})\s*(?P<amount>\d[\d,]*(?:\.\d+)?)'
+ACCOUNT = r'(?P<account_number>[X*\d]{4,})'
+DATE = r'(?P<date>\d{1,2}[-/ ](?:\d{1,2}|[A-Za-z]{3})[-/ ]\d{2,4}(?:\s+\d{1,2}:\d{2}(?::\d{2})?)?)'
+DATE_FORMATS = (
+    '%d/%m/%Y %H:%M:%S', '%d/%m/%Y %H:%M', '%d/%m/%Y', '%d/%m/%y %H:%M', '%d/%m/%y',
+    '%d-%b-%Y %H:%M:%S', '%d-%b-%Y %H:%M', '%d-%b-%Y', '%d-%b-%y', '%d %b %Y',
+)
+# Optional fields shared by the account alerts
+ACCOUNT_EXTRAS = {
+    'transaction_id': r'(?:Ref(?:erence)?|Txn)\.?\s*(?:No\.?|ID)?\s*[:#]?\s*((?=[A-Z]*\d)[A-Z0-9]{6,})',
+    'transaction_details': r'Transaction details\s*:\s*([^\n.]+?)(?:\s+(?:from|to)\s|[\n.]|$)',
+    'description': r'(?:Narration|Description|Remarks)\s*:\s*([^\n]+)',
+}
+
+bank_muscat = default_registry.register(BankRuleSet(
+    name='bank_muscat',
+    bank_name='Bank Muscat',
+    senders=('bankmuscat@bankmuscat.com',),
+    domains=('bankmuscat.com',),
+    subject_prefixes=('bank muscat',),
+    currency='OMR',
+    timezone='Asia/Muscat',
+    country='Oman',
+    rules=[
+        Rule(
+            'card_purchase',
+            r'card\s+(?:number\s+)?[X*\d ]+?\s+(?:has been|was)\s+(?:utili[sz]ed|used)\s+from\s+'
+            r'(?:your\s+)?account\s+(?:number\s+)?' + ACCOUNT + r'\s+for\s+' + AMOUNT +
+            r'\s+at\s+(?P<counterparty_name>[^\n]+?)\s+on\s+' + DATE,
+            'expense',
+            extras=ACCOUNT_EXTRAS,
+            date_formats=DATE_FORMATS,
+            defaults={'transaction_details': 'Card Purchase'},
+        ),
+        Rule(
+            'account_credited',
+            r'account\s+(?:number\s+)?' + ACCOUNT + r'\s+(?:has been|was|is)\s+credited\s+(?:with|by)\s+' +
+            AMOUNT + r'(?:\s+on\s+' + DATE + r')?',
+            'income',
+            extras=dict(ACCOUNT_EXTRAS, counterparty_name=r'\bfrom\s+([^\n.]+?)\s*(?:\.|\n|$)'),
+            date_formats=DATE_FORMATS,
+        ),
+        Rule(
+            'account_debited',
+            r'account\s+(?:number\s+)?' + ACCOUNT + r'\s+(?:has been|was|is)\s+debited\s+(?:with|by)\s+' +
+            AMOUNT + r'(?:\s+on\s+' + DATE + r')?',
+            'expense',
+            extras=dict(ACCOUNT_EXTRAS, counterparty_name=r'\bto\s+([^\n.]+?)\s*(?:\.|\n|$)'),
+            date_formats=DATE_FORMATS,
+        ),
+    ],
+))
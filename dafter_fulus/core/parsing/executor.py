@@ -0,0 +1,140 @@
+"""
+Parallel parsing of large email batches on a process pool.
+"""
+
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+from .parser import RuleBasedParser
+
+logger = logging.getLogger(__name__)
+
+# Parser built once per worker process by _init_worker
+_worker_parser = None
+
+
+def build_default_parser():
+    """Build the parser used by the views: bank rules with TransactionParser as fallback."""
+    # Import path_setup to add the parent directory to the Python path
+    from .. import path_setup  # noqa: F401
+    from money_tracker.services.parser_service import TransactionParser
+
+    return RuleBasedParser(fallback=TransactionParser())
+
+
+def _init_worker(parser_factory):
+    """Set up Django if the worker was spawned rather than forked, then warm the parser."""
+    global _worker_parser
+    from django.apps import apps
+    if not apps.ready:
+        import django
+        django.setup()
+    _worker_parser = parser_factory()
+
+
+def parse_safely(parser, email_data):
+    """
+    Parse one email, turning an exception into an error entry.
+
+    Returns:
+        dict: ``{'transaction': dict or None, 'error': str or None}``.
+    """
+    try:
+        return {'transaction': parser.parse_email(email_data), 'error': None}
+    except Exception as e:
+        return {'transaction': None, 'error': f"{e.__class__.__name__}: {str(e)}"}
+
+
+def _parse_chunk(chunk):
+    """Parse a chunk of emails in a worker process."""
+    return [parse_safely(_worker_parser, email_data) for email_data in chunk]
+
+
+class ParseExecutor:
+    """
+    Parse batches of emails in parallel, in input order.
+
+    Emails are sent to the workers in chunks of ``chunk_size``; each worker
+    builds its parser once and keeps it for the life of the pool. Batches
+    smaller than ``min_batch`` are parsed in the calling process, where the
+    cost of pickling emails to the pool would outweigh the gain. The pool is
+    started on first use and reused across calls.
+    """
+
+    def __init__(self, parser_factory=build_default_parser, workers=None, chunk_size=None, min_batch=None):
+        """
+        Args:
+            parser_factory (callable): Picklable, argument-free callable returning
+                a parser; called once in each worker and once in this process.
+            workers (int): Worker processes (default: PARSE_WORKERS).
+            chunk_size (int): Emails sent to a worker at a time (default: PARSE_CHUNK_SIZE).
+            min_batch (int): Smallest batch sent to the pool (default: PARSE_MIN_POOL_BATCH).
+        """
+        self.parser_factory = parser_factory
+        self.workers = workers or settings.PARSE_WORKERS
+        self.chunk_size = chunk_size or settings.PARSE_CHUNK_SIZE
+        self.min_batch = settings.PARSE_MIN_POOL_BATCH if min_batch is None else min_batch
+        self._parser = None
+        self._pool = None
+
+    @property
+    def parser(self):
+        """The in-process parser, built on first use."""
+        if self._parser is None:
+            self._parser = self.parser_factory()
+        return self._parser
+
+    @property
+    def version(self):
+        """Version of the parser, or None if it does not report one."""
+        return getattr(self.parser, 'version', None)
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.parser_factory,)
+            )
+        return self._pool
+
+    def parse_many(self, emails):
+        """
+        Parse a batch of emails.
+
+        Args:
+            emails (list): Email data dicts.
+
+        Returns:
+            list: One ``{'transaction': dict or None, 'error': str or None}``
+            per email, in the same order as ``emails``.
+        """
+        emails = list(emails)
+        if self.workers <= 1 or len(emails) < self.min_batch:
+            return [parse_safely(self.parser, email_data) for email_data in emails]
+
+        chunks = [emails[start:start + self.chunk_size] for start in range(0, len(emails), self.chunk_size)]
+        try:
+            results = []
+            for chunk_results in self._get_pool().map(_parse_chunk, chunks):
+                results.extend(chunk_results)
+            return results
+        except BrokenProcessPool as e:
+            logger.error(f"Parse pool failed, parsing {len(emails)} emails in process: {str(e)}")
+            self.shutdown()
+            return [parse_safely(self.parser, email_data) for email_data in emails]
+
+    def shutdown(self):
+        """Stop the worker processes, if any were started."""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
@@ -0,0 +1,157 @@
+"""
+Parser that dispatches each email to the rule sets registered for it.
+"""
+
+import hashlib
+import inspect
+import logging
+import time
+from email.utils import parsedate_to_datetime
+
+from django.utils import timezone
+
+from .registry import default_registry, parse_amount
+
+logger = logging.getLogger(__name__)
+
+# Rule name reported for emails handled by the fallback parser
+GENERIC_RULE = 'generic'
+
+
+class RuleBasedParser:
+    """
+    Drop-in replacement for TransactionParser backed by a RuleRegistry.
+
+    Every parsed transaction carries ``parse_rule`` (``<rule set>.<rule>`` or
+    ``generic``) and ``parse_ms``. ``stats`` accumulates the count and total
+    parse time per rule, with unparsed emails counted under None.
+    """
+
+    def __init__(self, registry=None, fallback=None):
+        """
+        Args:
+            registry (RuleRegistry): Rule sets to use (default: the built-in ones).
+            fallback: Object with a ``parse_email(email_data)`` method used when
+                no registered rule matches; typically a TransactionParser.
+        """
+        self.registry = registry or default_registry
+        self.fallback = fallback
+        self.stats = {}
+        self._fallback_version = None
+
+    @property
+    def version(self):
+        """
+        Identify the parsing behaviour, for caching parse results.
+
+        Combines the registry version with the fallback's ``version``
+        attribute or, failing that, a hash of its source file, so editing
+        either the rules or the fallback parser changes it.
+        """
+        if self._fallback_version is None:
+            self._fallback_version = ''
+            if self.fallback is not None:
+                self._fallback_version = getattr(self.fallback, 'version', None) or self._source_hash(self.fallback)
+        return hashlib.sha256(f"{self.registry.version}:{self._fallback_version}".encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _source_hash(obj):
+        """Hash the source file defining an object's class, or fall back to its name."""
+        cls = type(obj)
+        try:
+            with open(inspect.getsourcefile(cls), 'rb') as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except (TypeError, OSError):
+            return f"{cls.__module__}.{cls.__qualname__}"
+
+    def parse_email(self, email_data):
+        """
+        Parse an email into transaction data.
+
+        Args:
+            email_data (dict): Email with from, subject, date and body.
+
+        Returns:
+            dict: Transaction data, or None if no rule or fallback could parse it.
+        """
+        start = time.perf_counter()
+        rule_name, transaction_data = self.match(email_data)
+        if transaction_data is None and self.fallback is not None:
+            transaction_data = self.fallback.parse_email(email_data)
+            if transaction_data:
+                rule_name = GENERIC_RULE
+        elapsed = time.perf_counter() - start
+
+        entry = self.stats.setdefault(rule_name, {'count': 0, 'seconds': 0.0})
+        entry['count'] += 1
+        entry['seconds'] += elapsed
+        logger.debug(f"Parsed email {email_data.get('id')} with {rule_name} in {elapsed * 1000:.3f} ms")
+
+        if not transaction_data:
+            return None
+        return dict(transaction_data, parse_rule=rule_name, parse_ms=round(elapsed * 1000, 3))
+
+    def match(self, email_data):
+        """
+        Try the rules of every rule set claiming the email, in order.
+
+        Args:
+            email_data (dict): Email with from, subject, date and body.
+
+        Returns:
+            tuple: (rule name, transaction data), or (None, None) if nothing matched.
+        """
+        body = email_data.get('body') or ''
+        for rule_set in self.registry.lookup(email_data.get('from'), email_data.get('subject')):
+            for rule in rule_set.rules:
+                fields = rule.match(body)
+                if fields is None:
+                    continue
+                transaction_data = self._build(rule_set, rule, fields, email_data)
+                if transaction_data is not None:
+                    return f'{rule_set.name}.{rule.name}', transaction_data
+        return None, None
+
+    @staticmethod
+    def _build(rule_set, rule, fields, email_data):
+        """Turn the groups matched by a rule into transaction data."""
+        if 'account_number' not in fields or 'amount' not in fields:
+            return None
+        try:
+            amount = parse_amount(fields['amount'])
+        except ValueError:
+            return None
+
+        date_time = rule.parse_date(fields['date'], rule_set.timezone) if 'date' in fields else None
+        if date_time is None and email_data.get('date'):
+            try:
+                date_time = parsedate_to_datetime(email_data['date'])
+            except (TypeError, ValueError):
+                date_time = None
+        if date_time is None or timezone.is_naive(date_time):
+            date_time = timezone.now()
+
+        counterparty = fields.get('counterparty_name')
+        incoming = rule.transaction_type == 'income'
+        transaction_data = dict(rule.defaults)
+        transaction_data.update({
+            'account_number': fields['account_number'],
+            'bank_name': rule_set.bank_name,
+            'transaction_type': rule.transaction_type,
+            'amount': amount,
+            'currency': (fields.get('currency') or rule_set.currency).upper(),
+            'date_time': date_time.isoformat(),
+            'description': fields.get('description'),
+            'transaction_id': fields.get('transaction_id'),
+            'branch': fields.get('branch'),
+            'counterparty_name': counterparty,
+            'transaction_sender': counterparty if incoming else None,
+            'transaction_receiver': None if incoming else counterparty,
+            'from_party': counterparty if incoming else 'me',
+            'to_party': 'me' if incoming else counterparty,
+            'transaction_details': fields.get('transaction_details', rule.defaults.get('transaction_details')),
+            'country': fields.get('country') or rule_set.country,
+            'email_id': email_data.get('id'),
+            'email_date': email_data.get('date'),
+        })
+        return transaction_data
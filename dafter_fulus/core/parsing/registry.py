@@ -0,0 +1,209 @@
+"""
+Registry of per-bank rule sets, indexed for constant-time dispatch.
+"""
+
+import hashlib
+import re
+from datetime import datetime
+from email.utils import parseaddr
+from zoneinfo import ZoneInfo
+
+AMOUNT_RE = re.compile(r'[^\d.\-]')
+
+
+class Rule:
+    """
+    One email format of a bank.
+
+    The pattern is compiled when the rule is defined and uses named groups
+    for the fields it extracts (account_number, amount, currency, date,
+    description, transaction_id, counterparty_name, transaction_details, ...).
+    """
+
+    def __init__(self, name, pattern, transaction_type, extras=None, date_formats=(), defaults=None,
+                 flags=re.IGNORECASE):
+        """
+        Args:
+            name (str): Rule name, unique within its rule set.
+            pattern (str): Regex with named groups, searched in the email body.
+            transaction_type (str): income, expense or transfer.
+            extras (dict): Field name to regex with one group, searched only
+                once the main pattern matched, for optional fields.
+            date_formats (tuple): strptime formats tried on the ``date`` group.
+            defaults (dict): Values merged under the extracted fields.
+            flags (int): Regex flags.
+        """
+        self.name = name
+        self.regex = re.compile(pattern, flags)
+        self.transaction_type = transaction_type
+        self.extras = {field: re.compile(extra, flags) for field, extra in (extras or {}).items()}
+        self.date_formats = tuple(date_formats)
+        self.defaults = defaults or {}
+
+    def match(self, body):
+        """
+        Search the body for this format.
+
+        Returns:
+            dict: Extracted groups that matched, or None.
+        """
+        match = self.regex.search(body)
+        if not match:
+            return None
+        fields = {key: value.strip() for key, value in match.groupdict().items() if value is not None}
+        for field, regex in self.extras.items():
+            if field not in fields:
+                extra = regex.search(body)
+                if extra:
+                    fields[field] = extra.group(1).strip()
+        return fields
+
+    def parse_date(self, value, tz):
+        """Parse the ``date`` group into an aware datetime, or None."""
+        for date_format in self.date_formats:
+            try:
+                return datetime.strptime(value, date_format).replace(tzinfo=tz)
+            except ValueError:
+                continue
+        return None
+
+
+class BankRuleSet:
+    """The rules of one bank plus the sender and subject keys that select them."""
+
+    def __init__(self, name, bank_name, rules, senders=(), domains=(), subject_prefixes=(),
+                 currency='OMR', timezone='UTC', country=None):
+        """
+        Args:
+            name (str): Rule set name, e.g. ``bank_muscat``.
+            bank_name (str): Value stored in Transaction.bank_name.
+            rules (list): Rules, tried in order.
+            senders (tuple): Sender addresses that select this rule set.
+            domains (tuple): Sender domains (subdomains included) that select it.
+            subject_prefixes (tuple): Subject prefixes that select it.
+            currency (str): Currency when a rule extracts none.
+            timezone (str): Zone of the dates written in the emails.
+            country (str): Country stored on the transactions.
+        """
+        self.name = name
+        self.bank_name = bank_name
+        self.rules = list(rules)
+        self.senders = tuple(sender.lower() for sender in senders)
+        self.domains = tuple(domain.lower() for domain in domains)
+        self.subject_prefixes = tuple(prefix.lower() for prefix in subject_prefixes)
+        self.currency = currency
+        self.timezone = ZoneInfo(timezone)
+        self.country = country
+
+    def __repr__(self):
+        return f"BankRuleSet({self.name!r})"
+
+
+class RuleRegistry:
+    """
+    Rule sets indexed by sender address, sender domain and subject prefix.
+
+    Lookups are dictionary hits: one for the address, one per label of the
+    sender domain and one per distinct registered prefix length, so the cost
+    does not grow with the number of banks or rules.
+    """
+
+    def __init__(self):
+        self.rule_sets = {}
+        self.by_sender = {}
+        self.by_domain = {}
+        self.by_subject_prefix = {}
+        self.prefix_lengths = ()
+        self._version = None
+
+    @property
+    def version(self):
+        """Hash of every registered rule set; changes whenever a rule does."""
+        if self._version is None:
+            digest = hashlib.sha256()
+            for name in sorted(self.rule_sets):
+                rule_set = self.rule_sets[name]
+                digest.update(repr((
+                    name, rule_set.bank_name, rule_set.currency, str(rule_set.timezone), rule_set.country,
+                    [
+                        (
+                            rule.name, rule.regex.pattern, rule.regex.flags, rule.transaction_type,
+                            sorted((field, regex.pattern) for field, regex in rule.extras.items()),
+                            rule.date_formats, sorted(rule.defaults.items())
+                        )
+                        for rule in rule_set.rules
+                    ]
+                )).encode('utf-8'))
+            self._version = digest.hexdigest()
+        return self._version
+
+    def register(self, rule_set):
+        """
+        Add a rule set, replacing any registered under the same name.
+
+        Args:
+            rule_set (BankRuleSet): Rule set to add.
+
+        Returns:
+            BankRuleSet: The rule set, so this can be used at module level.
+        """
+        if rule_set.name in self.rule_sets:
+            self.unregister(rule_set.name)
+        self.rule_sets[rule_set.name] = rule_set
+        for sender in rule_set.senders:
+            self.by_sender.setdefault(sender, []).append(rule_set)
+        for domain in rule_set.domains:
+            self.by_domain.setdefault(domain, []).append(rule_set)
+        for prefix in rule_set.subject_prefixes:
+            self.by_subject_prefix.setdefault(prefix, []).append(rule_set)
+        self._index_prefix_lengths()
+        return rule_set
+
+    def unregister(self, name):
+        """Remove a rule set by name."""
+        rule_set = self.rule_sets.pop(name)
+        for index in (self.by_sender, self.by_domain, self.by_subject_prefix):
+            for key in list(index):
+                index[key] = [candidate for candidate in index[key] if candidate is not rule_set]
+                if not index[key]:
+                    del index[key]
+        self._index_prefix_lengths()
+
+    def _index_prefix_lengths(self):
+        self._version = None
+        self.prefix_lengths = tuple(sorted({len(prefix) for prefix in self.by_subject_prefix}, reverse=True))
+
+    def lookup(self, sender, subject):
+        """
+        Find the rule sets that claim a message.
+
+        Args:
+            sender (str): From header, with or without a display name.
+            subject (str): Subject header.
+
+        Returns:
+            list: Matching rule sets, most specific key first, without duplicates.
+        """
+        address = parseaddr(sender or '')[1].lower()
+        candidates = list(self.by_sender.get(address, ()))
+
+        domain = address.rpartition('@')[2]
+        while domain:
+            candidates.extend(self.by_domain.get(domain, ()))
+            domain = domain.partition('.')[2]
+
+        subject = (subject or '').strip().lower()
+        for length in self.prefix_lengths:
+            if length <= len(subject):
+                candidates.extend(self.by_subject_prefix.get(subject[:length], ()))
+
+        return list(dict.fromkeys(candidates))
+
+
+def parse_amount(value):
+    """Parse an amount such as ``1,234.500`` into a float."""
+    return abs(float(AMOUNT_RE.sub('', value)))
+
+
+# Rule sets shipped with the app register themselves here
+default_registry = RuleRegistry()
@@ -0,0 +1,141 @@
+"""
+Per-process registry of long-lived services, each built on first use.
+
+Building the parser and the email client when views.py was imported made
+every worker and every management command that runs the system checks pay
+for them, even when only rendering /accounts/. Services are registered here
+by name with a factory and built the first time something asks for them.
+SERVICE_WARMUP names the services apps.ready() builds at startup instead,
+moving their cost from the first request to worker boot.
+
+A forked child does not reuse its parent's services: a process pool or an
+open connection cannot be shared across processes.
+"""
+
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+from .metrics import SERVICE_BUILD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceRegistry:
+    """Named service factories and the services built from them in this process."""
+
+    def __init__(self):
+        self._factories = {}
+        self._services = {}
+        self._pid = os.getpid()
+        self._lock = threading.RLock()
+
+    def register(self, name, factory):
+        """
+        Register, or replace, the factory of a service.
+
+        Args:
+            name (str): Service name.
+            factory (callable): Argument-free callable returning the service.
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._services.pop(name, None)
+
+    def get(self, name):
+        """
+        Return a service, building it on first use.
+
+        Args:
+            name (str): Registered service name.
+
+        Returns:
+            object: The service instance shared by this process.
+        """
+        if self._pid != os.getpid():
+            self._forget_parent()
+        try:
+            return self._services[name]
+        except KeyError:
+            pass
+        with self._lock:
+            if name not in self._services:
+                if name not in self._factories:
+                    raise KeyError(f"Unknown service: {name}")
+                began = time.perf_counter()
+                self._services[name] = self._factories[name]()
+                seconds = time.perf_counter() - began
+                SERVICE_BUILD_SECONDS.observe(seconds, service=name)
+                logger.info(f"Built service {name} in {seconds * 1000:.1f} ms")
+            return self._services[name]
+
+    @property
+    def names(self):
+        """Registered service names."""
+        return list(self._factories)
+
+    def is_built(self, name):
+        """Whether a service has been built in this process."""
+        return self._pid == os.getpid() and name in self._services
+
+    def warm(self, names=None):
+        """
+        Build services ahead of their first use.
+
+        A service that fails to build is logged and left to be built, and
+        fail, on first use.
+
+        Args:
+            names (iterable): Service names (default: every registered service).
+        """
+        for name in self.names if names is None else list(names):
+            try:
+                self.get(name)
+            except Exception as e:
+                logger.error(f"Error warming service {name}: {str(e)}")
+
+    def reset(self):
+        """Shut down and forget every built service; they are rebuilt on next use."""
+        with self._lock:
+            services, self._services = self._services, {}
+        for name, service in services.items():
+            shutdown = getattr(service, 'shutdown', None)
+            if callable(shutdown):
+                try:
+                    shutdown()
+                except Exception as e:
+                    logger.error(f"Error shutting down service {name}: {str(e)}")
+
+    def _forget_parent(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._services = {}
+                self._pid = os.getpid()
+                self._lock = threading.RLock()
+
+
+def _build_parse_executor():
+    from .parsing import ParseExecutor
+
+    parse_executor = ParseExecutor()
+    # Build the in-process parser now, so warming the executor warms the parser too
+    parse_executor.parser
+    return parse_executor
+
+
+registry = ServiceRegistry()
+registry.register('parse_executor', _build_parse_executor)
+
+
+def get_parse_executor():
+    """The process-wide ParseExecutor."""
+    return registry.get('parse_executor')
+
+
+def warm_services():
+    """Build the services named in SERVICE_WARMUP. Called from the app config's ready()."""
+    if settings.SERVICE_WARMUP:
+        registry.warm(settings.SERVICE_WARMUP)
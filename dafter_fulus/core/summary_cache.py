@@ -0,0 +1,168 @@
+"""
+Cache of account summaries, invalidated by per-account version counters.
+
+Every TransactionRepository write bumps Account.summary_version and
+updated_at in the database transaction that changes the rollups. Cache keys
+include the version, so an entry goes stale the moment its account changes,
+in every process, without anything being deleted: superseded entries age out
+through the TTL and MAX_ENTRIES eviction of the SUMMARY_CACHE_ALIAS backend.
+
+The same version gives the ETag and Last-Modified of the account pages, so
+clients revalidating an unchanged account get a 304 for one indexed lookup.
+"""
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import caches
+from django.db.models import Count, Max, Sum
+
+from .metrics import SUMMARY_CACHE_LOOKUPS
+from .models import Account, TransactionRepository
+
+# Key of the accounts list state in request_state
+ALL_ACCOUNTS = None
+
+
+def _cache():
+    return caches[settings.SUMMARY_CACHE_ALIAS]
+
+
+def _token(state):
+    """Version string of an account or accounts-list state."""
+    return '-'.join(
+        str(int(part.timestamp() * 1_000_000)) if hasattr(part, 'timestamp') else str(part)
+        for part in state
+    )
+
+
+def account_state(account_number):
+    """
+    Read the cache version of one account.
+
+    Args:
+        account_number (str): Account number.
+
+    Returns:
+        tuple: (pk, summary_version, updated_at), or None if the account does not exist.
+    """
+    return Account.objects.filter(account_number=account_number).values_list(
+        'pk', 'summary_version', 'updated_at'
+    ).first()
+
+
+def accounts_state():
+    """
+    Read the cache version of the accounts list.
+
+    Returns:
+        tuple: (account count, sum of summary versions, latest updated_at).
+    """
+    state = Account.objects.aggregate(
+        count=Count('pk'), versions=Sum('summary_version'), updated_at=Max('updated_at')
+    )
+    return state['count'], state['versions'] or 0, state['updated_at']
+
+
+def request_state(request, account_number=ALL_ACCOUNTS):
+    """
+    State of an account, or of the accounts list, read once per request.
+
+    Args:
+        request (HttpRequest): Current request.
+        account_number (str): Account number, or ALL_ACCOUNTS for the list.
+
+    Returns:
+        tuple: As returned by account_state or accounts_state.
+    """
+    states = request.__dict__.setdefault('_summary_states', {})
+    if account_number not in states:
+        states[account_number] = accounts_state() if account_number is ALL_ACCOUNTS else account_state(account_number)
+    return states[account_number]
+
+
+def _cached(key, compute):
+    cache = _cache()
+    value = cache.get(key)
+    if value is not None:
+        SUMMARY_CACHE_LOOKUPS.inc(result='hit')
+        return value
+    SUMMARY_CACHE_LOOKUPS.inc(result='miss')
+    value = compute()
+    if value is not None:
+        cache.set(key, value)
+    return value
+
+
+def get_account_summary(account_number, state=None):
+    """
+    Cached TransactionRepository.get_account_summary.
+
+    Args:
+        account_number (str): Account number.
+        state (tuple): Account state, if already read.
+
+    Returns:
+        dict: Account summary or None if not found.
+    """
+    state = state or account_state(account_number)
+    if state is None:
+        return None
+    return _cached(
+        f'account_summary:{_token(state)}',
+        lambda: TransactionRepository.get_account_summary(account_number)
+    )
+
+
+def get_account_summaries(state=None):
+    """
+    Cached TransactionRepository.get_account_summaries.
+
+    Args:
+        state (tuple): Accounts list state, if already read.
+
+    Returns:
+        list: Account summaries ordered by account number.
+    """
+    state = state or accounts_state()
+
+    def compute():
+        summaries = TransactionRepository.get_account_summaries()
+        # An empty list for existing accounts is the error fallback, not worth keeping
+        return summaries if summaries or not state[0] else None
+
+    return _cached(f'account_summaries:{_token(state)}', compute) or []
+
+
+def _revalidatable(request):
+    # Pending flash messages are part of the page, so it must be rendered
+    return not len(messages.get_messages(request))
+
+
+def account_etag(request, account_number):
+    """ETag of the account_details page, for django.views.decorators.http.condition."""
+    state = request_state(request, account_number)
+    if state is None or not _revalidatable(request):
+        return None
+    return f'account-{_token(state)}'
+
+
+def account_last_modified(request, account_number):
+    """Last-Modified of the account_details page."""
+    state = request_state(request, account_number)
+    if state is None or not _revalidatable(request):
+        return None
+    return state[2]
+
+
+def accounts_etag(request):
+    """ETag of the accounts page."""
+    if not _revalidatable(request):
+        return None
+    return f'accounts-{_token(request_state(request))}'
+
+
+def accounts_last_modified(request):
+    """Last-Modified of the accounts page."""
+    if not _revalidatable(request):
+        return None
+    return request_state(request)[2]
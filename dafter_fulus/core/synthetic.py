@@ -0,0 +1,230 @@
+"""
+Synthetic bank alert emails and transactions for benchmarks and tests.
+
+Emails follow the Bank Muscat alert formats handled by parsing/banks.py:
+credits, debits, transfers in and out, salaries, cash deposits and card
+purchases, each with a few wordings and date formats. Output is
+deterministic for a given seed.
+"""
+
+import random
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import format_datetime
+
+from django.utils import timezone
+
+from .dimensions import get_resolver, normalize_name
+from .models import Bank, Counterparty, Transaction, TransactionType
+
+SENDER = 'Bank Muscat <bankmuscat@bankmuscat.com>'
+SUBJECTS = ('Bank Muscat Transaction Alert', 'Transaction alert', 'Account notification', 'Bank Muscat: Card alert')
+
+MERCHANTS = (
+    'LULU HYPERMARKET', 'CARREFOUR CITY CENTRE', 'SHELL OMAN', 'OMANTEL', 'TALABAT', 'MUSCAT PHARMACY',
+    'NESTO MABELA', 'STARBUCKS AL MOUJ', 'OMAN AIR', 'AL FAIRUZ RESTAURANT'
+)
+NAMES = ('AHMED AL BALUSHI', 'FATMA AL HINAI', 'SALIM AL RAWAHI', 'MARYAM AL LAWATI', 'KHALID AL HARTHY')
+EMPLOYERS = ('ACME LLC', 'OMAN LNG', 'MINISTRY OF EDUCATION', 'PETROLEUM DEVELOPMENT OMAN')
+BRANCHES = ('RUWI', 'SEEB', 'SOHAR', 'NIZWA', 'SALALAH')
+BILLERS = ('NAMA ELECTRICITY', 'OOREDOO', 'MUSCAT MUNICIPALITY')
+
+DATE_FORMATS = ('%d/%m/%Y %H:%M', '%d-%b-%Y %H:%M', '%d/%m/%Y %H:%M:%S', '%d/%m/%y')
+
+# Alert kind to (weight, wordings); wordings are filled with str.format
+TEMPLATES = {
+    'card_purchase': (40, (
+        'Dear Customer, your Debit card number 4837****{last4} has been utilised from your account number '
+        '{account} for OMR {amount} at {merchant} on {date}. Available balance is OMR {balance}. '
+        'Txn ID: {reference}',
+        'Your card {last4_masked} was used from account {account} for OMR {amount} at {merchant} on {date}. '
+        'Ref No: {reference}',
+    )),
+    'debit': (15, (
+        'Your account {account} has been debited with OMR {amount} on {date}. '
+        'Transaction details: Bill Payment to {biller}. Ref No: {reference}',
+        'Dear Customer,\nYour account number {account} is debited by OMR {amount} on {date}.\n'
+        'Narration: {biller} BILL\nTxn ID: {reference}',
+    )),
+    'transfer': (15, (
+        'Your account {account} has been debited with OMR {amount} on {date}. '
+        'Transaction details: TRANSFER to {name}. Reference: {reference}',
+        'Your account number {account} was debited by OMR {amount} on {date}. '
+        'Transaction details: Mobile Transfer to {name}. Ref: {reference}',
+    )),
+    'credit': (12, (
+        'Your account {account} has been credited with OMR {amount} on {date}. '
+        'Transaction details: TRANSFER from {name}. Ref No: {reference}',
+        'Dear Customer, your account number {account} was credited by OMR {amount} on {date}. '
+        'Transaction details: Refund from {merchant}. Reference: {reference}',
+    )),
+    'salary': (8, (
+        'Your account {account} has been credited with OMR {amount} on {date}. '
+        'Transaction details: SALARY from {employer}. Ref No: {reference}',
+    )),
+    'cash_deposit': (10, (
+        'Your account number {account} is credited with OMR {amount} on {date}. '
+        'Transaction details: Cash Dep from {branch} BRANCH CDM. Txn ID: {reference}',
+    )),
+}
+
+# Amount ranges in OMR per kind
+AMOUNT_RANGES = {
+    'card_purchase': (0.5, 120), 'debit': (5, 300), 'transfer': (10, 2000),
+    'credit': (5, 1500), 'salary': (800, 4500), 'cash_deposit': (20, 1000),
+}
+
+TRANSACTION_TYPES = {
+    'card_purchase': TransactionType.EXPENSE, 'debit': TransactionType.EXPENSE,
+    'transfer': TransactionType.TRANSFER, 'credit': TransactionType.INCOME,
+    'salary': TransactionType.INCOME, 'cash_deposit': TransactionType.INCOME,
+}
+
+NOISE_BODIES = (
+    'Your e-statement for the month is now available in Mobile Banking.',
+    'Dear Customer, never share your OTP or card PIN with anyone. Bank Muscat will never ask for them.',
+)
+
+
+def account_numbers(accounts):
+    """Masked account numbers used by the generators, one per account."""
+    return [f'xxxx{index:04d}' for index in range(1, accounts + 1)]
+
+
+def generate_emails(count, seed=0, accounts=5, start=None, kinds=None, noise=0.0):
+    """
+    Yield synthetic bank alert emails.
+
+    Args:
+        count (int): Number of emails.
+        seed (int): Random seed; the same seed yields the same corpus.
+        accounts (int): Number of distinct accounts.
+        start (datetime): Time of the first alert (default: 2024-01-01).
+        kinds (list): Alert kinds to draw from (default: all of TEMPLATES).
+        noise (float): Share of non-transaction emails (statements, warnings).
+
+    Yields:
+        dict: Email data with id, from, subject, date and body, plus ``kind``
+        (the alert kind, or 'noise').
+    """
+    rng = random.Random(seed)
+    kinds = list(kinds or TEMPLATES)
+    weights = [TEMPLATES[kind][0] for kind in kinds]
+    numbers = account_numbers(accounts)
+    sent_at = timezone.make_aware(start or datetime(2024, 1, 1, 8))
+
+    for index in range(count):
+        sent_at += timedelta(seconds=rng.randrange(60, 4 * 3600))
+        email_data = {
+            'id': f'<synthetic-{seed}-{index}@bankmuscat.com>',
+            'from': SENDER,
+            'subject': rng.choice(SUBJECTS),
+            'date': format_datetime(sent_at),
+        }
+        if rng.random() < noise:
+            yield dict(email_data, body=rng.choice(NOISE_BODIES), kind='noise')
+            continue
+
+        kind = rng.choices(kinds, weights)[0]
+        low, high = AMOUNT_RANGES[kind]
+        last4 = f'{rng.randrange(10000):04d}'
+        body = rng.choice(TEMPLATES[kind][1]).format(
+            account=rng.choice(numbers),
+            amount=f'{rng.uniform(low, high):,.3f}',
+            balance=f'{rng.uniform(10, 5000):.3f}',
+            date=timezone.localtime(sent_at).strftime(rng.choice(DATE_FORMATS)),
+            reference=f'TX{seed:02d}{index:010d}',
+            last4=last4,
+            last4_masked=f'4837XXXXXXXX{last4}',
+            merchant=rng.choice(MERCHANTS),
+            name=rng.choice(NAMES),
+            employer=rng.choice(EMPLOYERS),
+            branch=rng.choice(BRANCHES),
+            biller=rng.choice(BILLERS),
+        )
+        yield dict(email_data, body=body, kind=kind)
+
+
+def to_message(email_data):
+    """
+    Build a MIME message from synthetic email data.
+
+    Args:
+        email_data (dict): Output of generate_emails.
+
+    Returns:
+        EmailMessage: Message with the same headers and body.
+    """
+    message = EmailMessage()
+    message['From'] = email_data['from']
+    message['To'] = 'customer@example.com'
+    message['Subject'] = email_data['subject']
+    message['Date'] = email_data['date']
+    message['Message-ID'] = email_data['id']
+    message.set_content(email_data['body'])
+    return message
+
+
+def write_mbox(fileobj, emails):
+    """
+    Write emails to a binary file in mboxrd format.
+
+    Args:
+        fileobj: Binary file open for writing.
+        emails (iterable): Email data dicts.
+
+    Returns:
+        int: Number of messages written.
+    """
+    written = 0
+    for email_data in emails:
+        fileobj.write(b'From MAILER-DAEMON Mon Jan  1 00:00:00 2024\n')
+        for line in to_message(email_data).as_bytes().splitlines(keepends=True):
+            if line.lstrip(b'>').startswith(b'From '):
+                line = b'>' + line
+            fileobj.write(line)
+        fileobj.write(b'\n')
+        written += 1
+    return written
+
+
+def generate_transactions(accounts, count, seed=0, start=None, offset=0):
+    """
+    Yield unsaved transactions shaped like parsed alerts, for filling a database quickly.
+
+    Args:
+        accounts (list): Saved Account instances to spread the rows over.
+        count (int): Number of transactions.
+        seed (int): Random seed.
+        start (datetime): Time of the first transaction (default: 2015-01-01).
+        offset (int): Index of the first transaction, to extend an existing
+            series with new transaction IDs.
+
+    Yields:
+        Transaction: Unsaved transactions in time order.
+    """
+    rng = random.Random(seed * 1_000_003 + offset)
+    kinds = list(TEMPLATES)
+    weights = [TEMPLATES[kind][0] for kind in kinds]
+    start = timezone.make_aware(start or datetime(2015, 1, 1))
+    bank_id = get_resolver(Bank).resolve('Bank Muscat')
+    counterparty_ids = get_resolver(Counterparty).resolve_many(MERCHANTS + NAMES)
+
+    for index in range(offset, offset + count):
+        kind = rng.choices(kinds, weights)[0]
+        low, high = AMOUNT_RANGES[kind]
+        account = accounts[index % len(accounts)]
+        counterparty = rng.choice(MERCHANTS if kind == 'card_purchase' else NAMES)
+        yield Transaction(
+            account=account,
+            transaction_type=TRANSACTION_TYPES[kind],
+            amount_minor=rng.randrange(int(low * 1000), int(high * 1000)),
+            currency=account.currency,
+            date_time=start + timedelta(minutes=5 * index),
+            description=f'Synthetic {kind.replace("_", " ")}',
+            transaction_id=f'SYN{index:010d}',
+            bank_id=bank_id,
+            counterparty_id=counterparty_ids[normalize_name(counterparty)],
+            transaction_details=kind.upper(),
+            email_id=f'<synthetic-tx-{index}@bankmuscat.com>',
+        )
@@ -1,3 +1,1188 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.db.models import Count, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from django.db import IntegrityError, connection, transaction as db_transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.contrib.admin import helpers
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .benchmarks import compare_results, populate, run_benchmarks
+from .currency import from_minor_units, to_minor_units
+from .database import configure_sqlite
+from .export import export_transactions
+from .ingest import ingest_emails
+from .metrics import REGISTRY, REQUEST_QUERIES, STAGE_SECONDS, MetricsRegistry
+from .middleware import MetricsMiddleware
+from .dimensions import DimensionResolver, normalize_name
+from .models import (
+    AccountRollup, Counterparty, DailyAggregate, IngestOutcome, MonthlyAggregate, ParseBatch, ParseBatchRepository,
+    ParseCacheEntry, ParseItemStatus, Transaction, TransactionRepository
+)
+from .management.commands.profile_startup import parse_importtime, summarize_imports
+from .pagination import decode_cursor, encode_cursor, paginate
+from .parse_cache import ParseCache
+from .services import ServiceRegistry
+from .summary_cache import get_account_summary
+from .synthetic import generate_emails, write_mbox
+from .write_queue import WriteQueue, get_write_queue
+
+from .parsing import (
+    GENERIC_RULE, BankRuleSet, ParseExecutor, Rule, RuleBasedParser, RuleRegistry, default_registry
+)
+
+BANK_MUSCAT = 'Bank Muscat <bankmuscat@bankmuscat.com>'
+
+
+def email(body, sender=BANK_MUSCAT, subject='Transaction alert'):
+    return {'id': 'm1', 'from': sender, 'subject': subject, 'date': 'Mon, 01 Jan 2024 10:00:00 +0400', 'body': body}
+
+
+class FallbackParser:
+    def __init__(self):
+        self.calls = 0
+
+    def parse_email(self, email_data):
+        self.calls += 1
+        return {'account_number': '0001', 'amount': 1.0, 'transaction_type': 'unknown'}
+
+
+class EchoParser:
+    def parse_email(self, email_data):
+        if email_data['body'] == 'boom':
+            raise ValueError('bad email')
+        return {'email_id': email_data['id']} if email_data['body'] else None
+
+
+def echo_parser():
+    return EchoParser()
+
+
+class RuleRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.registry = RuleRegistry()
+        self.bank = self.registry.register(BankRuleSet(
+            'bank', 'Bank', [], senders=('alerts@bank.test',), domains=('bank.test',), subject_prefixes=('bank:',)
+        ))
+        self.other = self.registry.register(BankRuleSet('other', 'Other', [], subject_prefixes=('other alert',)))
+
+    def test_lookup_by_sender_domain_and_subject_prefix(self):
+        self.assertEqual(self.registry.lookup('Bank <alerts@bank.test>', ''), [self.bank])
+        self.assertEqual(self.registry.lookup('noreply@mail.bank.test', ''), [self.bank])
+        self.assertEqual(self.registry.lookup('someone@else.test', 'Other Alert: debit'), [self.other])
+        self.assertEqual(self.registry.lookup('someone@else.test', 'Statement'), [])
+        self.assertEqual(self.registry.lookup('someone@evilbank.test', ''), [])
+
+    def test_register_replaces_rule_set_of_same_name(self):
+        replacement = self.registry.register(BankRuleSet('bank', 'Bank', [], senders=('new@bank.test',)))
+
+        self.assertEqual(self.registry.lookup('alerts@bank.test', ''), [])
+        self.assertEqual(self.registry.lookup('new@bank.test', ''), [replacement])
+
+
+class RuleBasedParserTests(SimpleTestCase):
+    def setUp(self):
+        self.fallback = FallbackParser()
+        self.parser = RuleBasedParser(fallback=self.fallback)
+
+    def test_bank_muscat_credit(self):
+        data = self.parser.parse_email(email(
+            'Your account xxxx0123 has been credited with OMR 1,250.500 on 05/03/2024 14:20. '
+            'Transaction details: SALARY from ACME LLC. Ref No: TRX123456'
+        ))
+
+        self.assertEqual(data['parse_rule'], 'bank_muscat.account_credited')
+        self.assertEqual(data['account_number'], 'xxxx0123')
+        self.assertEqual(data['amount'], 1250.5)
+        self.assertEqual(data['transaction_type'], 'income')
+        self.assertEqual(data['date_time'], '2024-03-05T14:20:00+04:00')
+        self.assertEqual(data['transaction_id'], 'TRX123456')
+        self.assertEqual(data['transaction_details'], 'SALARY')
+        self.assertEqual(data['counterparty_name'], 'ACME LLC')
+        self.assertEqual(data['to_party'], 'me')
+        self.assertGreaterEqual(data['parse_ms'], 0)
+        self.assertEqual(self.fallback.calls, 0)
+
+    def test_bank_muscat_card_purchase(self):
+        data = self.parser.parse_email(email(
+            'Your Debit card number 4837****1234 has been utilised from your account number xxxx0123 '
+            'for OMR 5.500 at LULU HYPERMARKET on 01-Jan-2024 10:15. Available balance is OMR 10.000'
+        ))
+
+        self.assertEqual(data['parse_rule'], 'bank_muscat.card_purchase')
+        self.assertEqual(data['amount'], 5.5)
+        self.assertEqual(data['transaction_type'], 'expense')
+        self.assertEqual(data['to_party'], 'LULU HYPERMARKET')
+
+    def test_unclaimed_email_uses_fallback(self):
+        data = self.parser.parse_email(email('Hello', sender='friend@example.com', subject='Lunch'))
+
+        self.assertEqual(data['parse_rule'], GENERIC_RULE)
+        self.assertEqual(self.fallback.calls, 1)
+
+    def test_claimed_email_without_matching_rule_uses_fallback(self):
+        data = self.parser.parse_email(email('Your statement is ready'))
+
+        self.assertEqual(data['parse_rule'], GENERIC_RULE)
+
+    def test_stats_count_rules_and_failures(self):
+        parser = RuleBasedParser()
+        parser.parse_email(email('Your account xxxx0123 has been debited with OMR 20.000 on 02/01/2024.'))
+        parser.parse_email(email('Your statement is ready'))
+
+        self.assertEqual(parser.stats['bank_muscat.account_debited']['count'], 1)
+        self.assertEqual(parser.stats[None]['count'], 1)
+
+    def test_custom_registry(self):
+        registry = RuleRegistry()
+        registry.register(BankRuleSet(
+            'test_bank', 'Test Bank', [Rule('paid', r'Paid (?P<amount>\d+) from (?P<account_number>\d+)', 'expense')],
+            subject_prefixes=('test bank',), currency='USD'
+        ))
+
+        data = RuleBasedParser(registry).parse_email(email('Paid 12 from 9999', sender='x@y.test', subject='Test Bank'))
+
+        self.assertEqual(data['parse_rule'], 'test_bank.paid')
+        self.assertEqual(data['currency'], 'USD')
+        self.assertIn('bank_muscat', default_registry.rule_sets)
+
+
+class ParseExecutorTests(SimpleTestCase):
+    def emails(self):
+        bodies = ['ok'] * 20 + ['boom', '', 'ok']
+        return [{'id': str(index), 'body': body} for index, body in enumerate(bodies)]
+
+    def check(self, results):
+        self.assertEqual(len(results), 23)
+        self.assertEqual([r['transaction']['email_id'] for r in results[:20]], [str(i) for i in range(20)])
+        self.assertEqual(results[20], {'transaction': None, 'error': 'ValueError: bad email'})
+        self.assertEqual(results[21], {'transaction': None, 'error': None})
+        self.assertEqual(results[22]['transaction'], {'email_id': '22'})
+
+    def test_pool_keeps_input_order_and_isolates_errors(self):
+        with ParseExecutor(echo_parser, workers=2, chunk_size=3, min_batch=0) as executor:
+            self.check(executor.parse_many(self.emails()))
+            self.assertIsNotNone(executor._pool)
+
+    def test_small_batches_are_parsed_in_process(self):
+        with ParseExecutor(echo_parser, workers=2, chunk_size=3, min_batch=100) as executor:
+            self.check(executor.parse_many(self.emails()))
+            self.assertIsNone(executor._pool)
+
+
+class ParseCacheTests(TestCase):
+    def setUp(self):
+        self.registry = RuleRegistry()
+        self.registry.register(BankRuleSet(
+            'test_bank', 'Test Bank',
+            [Rule('paid', r'Paid (?P<amount>\d+) from (?P<account_number>\d+) ref (?P<transaction_id>\w+)', 'expense')],
+            senders=('alerts@bank.test',)
+        ))
+        self.parser = RuleBasedParser(self.registry)
+        self.cache = ParseCache(max_entries=100)
+
+    def emails(self, count, prefix='m'):
+        return [
+            email(f'Paid {index} from 0001 ref T{index}', sender='alerts@bank.test') | {'id': f'{prefix}{index}'}
+            for index in range(count)
+        ]
+
+    def test_repeat_ingest_is_answered_from_cache(self):
+        first = ingest_emails(self.emails(3), self.parser, self.cache)
+        self.assertEqual((first['created'], first['hits'], first['misses']), (3, 0, 3))
+        self.assertEqual(ParseCacheEntry.objects.filter(transaction__isnull=False).count(), 3)
+
+        # Lookup and hit bookkeeping only: no parsing, no duplicate check
+        with self.assertNumQueries(2):
+            second = ingest_emails(self.emails(3, prefix='again'), self.parser, self.cache)
+
+        self.assertEqual((second['created'], second['duplicates'], second['hits']), (0, 3, 3))
+        self.assertEqual(second['results'][0]['transaction']['email_id'], 'again0')
+        self.assertEqual(self.parser.stats['test_bank.paid']['count'], 3)
+        self.assertEqual(self.cache.stats, {'hits': 3, 'misses': 3, 'evictions': 0})
+
+    def test_rule_change_invalidates_entries(self):
+        ingest_emails(self.emails(2), self.parser, self.cache)
+        self.registry.register(BankRuleSet(
+            'test_bank', 'Test Bank',
+            [Rule('paid', r'Paid (?P<amount>\d+) from (?P<account_number>\d+)', 'expense')],
+            senders=('alerts@bank.test',)
+        ))
+
+        stats = ingest_emails(self.emails(2), self.parser, self.cache, save=False)
+
+        self.assertEqual((stats['hits'], stats['misses']), (0, 2))
+        self.assertIsNone(stats['results'][0]['transaction'].get('transaction_id'))
+
+    def test_deleted_transaction_is_stored_again(self):
+        ingest_emails(self.emails(1), self.parser, self.cache)
+        Transaction.objects.all().delete()
+
+        stats = ingest_emails(self.emails(1), self.parser, self.cache)
+
+        self.assertEqual((stats['hits'], stats['created']), (1, 1))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ParseCache(max_entries=3)
+        emails = self.emails(5)
+        ingest_emails(emails[:2], self.parser, cache, save=False)
+        ingest_emails(emails[2:3], self.parser, cache, save=False)
+        ingest_emails(emails[:1], self.parser, cache, save=False)
+        ingest_emails(emails[3:], self.parser, cache, save=False)
+
+        self.assertEqual(ParseCacheEntry.objects.count(), 3)
+        self.assertEqual(cache.stats['evictions'], 2)
+        self.assertEqual(ingest_emails(emails[:1], self.parser, cache, save=False)['hits'], 1)
+        self.assertEqual(ingest_emails(emails[1:3], self.parser, cache, save=False)['hits'], 0)
+
+
+class BulkIngestionTests(TestCase):
+    def row(self, transaction_id, **kwargs):
+        return dict({
+            'account_number': '0001', 'amount': 1, 'transaction_type': 'expense',
+            'date_time': '2024-01-05T10:00:00+00:00', 'transaction_id': transaction_id
+        }, **kwargs)
+
+    def statuses(self, results):
+        return [result['status'] for result in results]
+
+    def test_query_count_is_fixed_per_batch(self):
+        rows = [self.row(f'Q{index}') for index in range(30)]
+
+        # 3 to create the account, then 14 per batch of 10 whatever its contents
+        with self.assertNumQueries(3 + 3 * 14):
+            results = TransactionRepository.bulk_create_transactions(rows, batch_size=10)
+
+        self.assertEqual(self.statuses(results), [IngestOutcome.CREATED] * 30)
+        self.assertEqual(AccountRollup.objects.get().transaction_count, 30)
+
+        # Resending them costs the account lookup and the duplicate check per batch
+        with self.assertNumQueries(1 + 3 * 3):
+            results = TransactionRepository.bulk_create_transactions(rows, batch_size=10)
+        self.assertEqual(self.statuses(results), [IngestOutcome.DUPLICATE] * 30)
+
+    def test_outcomes_are_reported_in_input_order(self):
+        TransactionRepository.bulk_create_transactions([self.row('OLD')])
+
+        results = TransactionRepository.bulk_create_transactions([
+            self.row('A'),
+            self.row('B', amount='12,3x'),
+            self.row('C', account_number=''),
+            self.row('A', amount=5),
+            self.row('OLD'),
+            None,
+            self.row(None),
+            self.row(None),
+        ], batch_size=4)
+
+        self.assertEqual(self.statuses(results), [
+            IngestOutcome.CREATED, IngestOutcome.REJECTED, IngestOutcome.REJECTED, IngestOutcome.DUPLICATE,
+            IngestOutcome.DUPLICATE, IngestOutcome.REJECTED, IngestOutcome.CREATED, IngestOutcome.CREATED,
+        ])
+        self.assertIn('Invalid amount', results[1]['reason'])
+        self.assertEqual(results[2]['reason'], 'No account number provided for transaction')
+        self.assertEqual(results[3]['transaction'].pk, results[0]['transaction'].pk)
+        self.assertEqual(Transaction.objects.count(), 4)
+        self.assertEqual(AccountRollup.objects.get().transaction_count, 4)
+
+    def test_batch_is_retried_once_after_an_integrity_error(self):
+        write_batch = TransactionRepository._write_batch
+        calls = []
+
+        def racing_write_batch(pending, resolved, results):
+            calls.append(len(pending))
+            if len(calls) == 1:
+                # Another writer commits R2 between the duplicate check and the insert
+                write_batch([(0, self.row('R2'))], {}, [None])
+                raise IntegrityError('UNIQUE constraint failed')
+            return write_batch(pending, resolved, results)
+
+        with mock.patch.object(TransactionRepository, '_write_batch', side_effect=racing_write_batch):
+            results = TransactionRepository.bulk_create_transactions([self.row('R1'), self.row('R2')])
+
+        self.assertEqual(calls, [2, 2])
+        self.assertEqual(self.statuses(results), [IngestOutcome.CREATED, IngestOutcome.DUPLICATE])
+        self.assertEqual(AccountRollup.objects.get().transaction_count, 2)
+
+    def test_batch_is_rejected_when_the_retry_fails_too(self):
+        with mock.patch.object(
+            TransactionRepository, '_write_batch', side_effect=IntegrityError('UNIQUE constraint failed')
+        ) as write_batch:
+            results = TransactionRepository.bulk_create_transactions([self.row('R1'), self.row('R2', account_number='')])
+
+        self.assertEqual(write_batch.call_count, 2)
+        self.assertEqual(self.statuses(results), [IngestOutcome.REJECTED, IngestOutcome.REJECTED])
+        self.assertEqual(results[0]['reason'], 'UNIQUE constraint failed')
+        self.assertFalse(Transaction.objects.exists())
+
+
+class TransactionIdConstraintTests(TestCase):
+    def test_duplicate_ids_are_rejected_per_account(self):
+        first = TransactionRepository.create_transaction({'account_number': '0001', 'amount': 1, 'transaction_id': 'T1'})
+        other = TransactionRepository.create_transaction({'account_number': '0002', 'amount': 1, 'transaction_id': 'T1'})
+        blank = [
+            TransactionRepository.create_transaction({'account_number': '0001', 'amount': 1, 'transaction_id': ''})
+            for _ in range(2)
+        ]
+
+        self.assertNotEqual(first.pk, other.pk)
+        self.assertEqual([transaction.transaction_id for transaction in blank], [None, None])
+        with self.assertRaises(IntegrityError), db_transaction.atomic():
+            Transaction.objects.create(account=first.account, amount_minor=1, transaction_id='T1')
+
+    def test_create_transaction_returns_the_existing_duplicate(self):
+        first = TransactionRepository.create_transaction({'account_number': '0001', 'amount': 1, 'transaction_id': 'T1'})
+
+        again = TransactionRepository.create_transaction({'account_number': '0001', 'amount': 9, 'transaction_id': 'T1'})
+
+        self.assertEqual(again.pk, first.pk)
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertEqual(AccountRollup.objects.get().transaction_count, 1)
+
+
+class TransactionIdMigrationTests(TransactionTestCase):
+    before = [('money_tracker_app', '0002_account_rollup')]
+    after = [('money_tracker_app', '0003_transaction_indexes')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_blank_ids_become_null_and_duplicates_are_dropped(self):
+        apps = self.migrate(self.before)
+        Account = apps.get_model('money_tracker_app', 'Account')
+        AccountRollup = apps.get_model('money_tracker_app', 'AccountRollup')
+        Transaction = apps.get_model('money_tracker_app', 'Transaction')
+        account = Account.objects.create(account_number='0001', bank_name='Bank Muscat', balance=130.0)
+        untouched = Account.objects.create(account_number='0002', bank_name='Bank Muscat', balance=5.0)
+        when = timezone.make_aware(datetime(2024, 1, 5))
+        for transaction_id, amount in (('T1', 100.0), ('T1', 100.0), ('T2', 30.0), ('', 7.0), ('', 7.0)):
+            Transaction.objects.create(
+                account=account, transaction_type='income', amount=amount, date_time=when,
+                transaction_id=transaction_id
+            )
+        Transaction.objects.create(
+            account=untouched, transaction_type='income', amount=5.0, date_time=when, transaction_id='T1'
+        )
+        # Rollups as maintained before the migration, counting the duplicate
+        for owner, count, total in ((account, 5, 244.0), (untouched, 1, 5.0)):
+            AccountRollup.objects.create(
+                account=owner, transaction_count=count, income_count=count, total_income=total, net_balance=total
+            )
+
+        apps = self.migrate(self.after)
+        Account = apps.get_model('money_tracker_app', 'Account')
+        AccountRollup = apps.get_model('money_tracker_app', 'AccountRollup')
+        Transaction = apps.get_model('money_tracker_app', 'Transaction')
+
+        self.assertEqual(
+            sorted(Transaction.objects.filter(account__account_number='0001').values_list('transaction_id', flat=True),
+                   key=str),
+            [None, None, 'T1', 'T2']
+        )
+        rollup = AccountRollup.objects.get(account__account_number='0001')
+        self.assertEqual((rollup.transaction_count, rollup.total_income, rollup.net_balance), (4, 144.0, 144.0))
+        self.assertEqual(Account.objects.get(account_number='0001').balance, 144.0)
+        self.assertEqual(AccountRollup.objects.get(account__account_number='0002').transaction_count, 1)
+        with self.assertRaises(IntegrityError), db_transaction.atomic():
+            Transaction.objects.create(
+                account_id=Account.objects.get(account_number='0001').pk, amount=1.0, date_time=when,
+                transaction_id='T2'
+            )
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.start = timezone.make_aware(datetime(2024, 1, 1))
+        self.end = timezone.make_aware(datetime(2024, 1, 31))
+        tie = timezone.make_aware(datetime(2024, 1, 10, 12))
+        rows = [
+            # Seven rows share one timestamp, so pages must break ties on id
+            {'account_number': '0001', 'amount': 1, 'date_time': tie, 'transaction_id': f'TIE{index}'}
+            for index in range(7)
+        ] + [
+            {'account_number': '0001', 'amount': 1, 'date_time': self.start + timedelta(days=day),
+             'transaction_id': f'D{day}'}
+            for day in (1, 5, 20)
+        ] + [
+            {'account_number': '0001', 'amount': 1, 'date_time': self.end, 'transaction_id': 'END'},
+            {'account_number': '0001', 'amount': 1, 'date_time': self.end + timedelta(seconds=1),
+             'transaction_id': 'AFTER'},
+            {'account_number': '0001', 'amount': 1, 'date_time': self.start - timedelta(seconds=1),
+             'transaction_id': 'BEFORE'},
+        ]
+        TransactionRepository.bulk_create_transactions(rows)
+        self.transactions = Transaction.objects.filter(account__account_number='0001')
+        self.ordered = list(self.transactions.order_by('-date_time', '-id').values_list('transaction_id', flat=True))
+
+    def page(self, **kwargs):
+        return TransactionRepository.get_transactions_by_date_range('0001', self.start, self.end, **kwargs)
+
+    def ids(self, page):
+        return [transaction.transaction_id for transaction in page['transactions']]
+
+    def test_cursor_round_trip(self):
+        transaction = self.transactions.get(transaction_id='TIE3')
+
+        self.assertEqual(decode_cursor(encode_cursor(transaction)), (transaction.date_time, transaction.pk))
+
+    def test_invalid_cursors_fall_back_to_first_page(self):
+        first = self.ids(paginate(self.transactions, page_size=3))
+        tampered = encode_cursor(self.transactions.first()).rstrip('=')[:-2] + 'x'
+
+        for cursor in ('not base64!', 'bm90IGEgY3Vyc29y', tampered, '\u00e9t\u00e9'):
+            self.assertIsNone(decode_cursor(cursor))
+            self.assertEqual(self.ids(paginate(self.transactions, before=cursor, page_size=3)), first)
+            self.assertEqual(self.ids(paginate(self.transactions, after=cursor, page_size=3)), first)
+
+    def test_paging_across_equal_timestamps_skips_and_repeats_nothing(self):
+        pages = [paginate(self.transactions, page_size=2)]
+        while pages[-1]['next_cursor']:
+            pages.append(paginate(self.transactions, before=pages[-1]['next_cursor'], page_size=2))
+
+        self.assertEqual([tid for page in pages for tid in self.ids(page)], self.ordered)
+        self.assertIsNone(pages[0]['previous_cursor'])
+
+        # Walking back from the last page returns the same pages
+        back = [pages[-1]]
+        while back[-1]['previous_cursor']:
+            back.append(paginate(self.transactions, after=back[-1]['previous_cursor'], page_size=2))
+        self.assertEqual([self.ids(page) for page in reversed(back)], [self.ids(page) for page in pages])
+
+    def test_end_date_is_inclusive_with_a_cursor(self):
+        in_range = [tid for tid in self.ordered if tid not in ('AFTER', 'BEFORE')]
+        first = self.page(page_size=4)
+        seen = self.ids(first)
+        cursor = first['next_cursor']
+        while cursor:
+            page = self.page(before=cursor, page_size=4)
+            seen += self.ids(page)
+            cursor = page['next_cursor']
+
+        self.assertEqual(seen[0], 'END')
+        self.assertEqual(seen, in_range)
+
+        # Paging back towards the end date stops at it
+        newest = self.page(after=encode_cursor(self.transactions.get(transaction_id='D20')), page_size=4)
+        self.assertEqual(self.ids(newest), ['END'])
+        self.assertIsNone(newest['previous_cursor'])
+
+
+class PeriodAggregateTests(TestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        start = timezone.make_aware(datetime(2024, 1, 1))
+        self.rows = [
+            {
+                'account_number': rng.choice(['0001', '0002']),
+                'amount': round(rng.uniform(1, 500), 3),
+                'transaction_type': rng.choice(['income', 'expense', 'transfer']),
+                'transaction_details': rng.choice(['SALARY', 'TRANSFER', None]),
+                'date_time': start + timedelta(minutes=rng.randrange(0, 200 * 24 * 60)),
+                'transaction_id': f'T{index}'
+            }
+            for index in range(400)
+        ]
+        TransactionRepository.bulk_create_transactions(self.rows)
+
+    def expected(self, start, end):
+        rows = Transaction.objects.filter(date_time__gte=start, date_time__lt=end).order_by().values(
+            'account_id', 'currency', 'transaction_type', period=TruncMonth('date_time'),
+            category=Coalesce('transaction_details', Value(''))
+        ).annotate(transaction_count=Count('id'), total_amount=Sum('amount_minor'))
+        return {
+            (row['period'].date(), row['account_id'], row['transaction_type'], row['category']):
+                (row['transaction_count'], row['total_amount'])
+            for row in rows
+        }
+
+    def totals(self, start, end, **kwargs):
+        return {
+            (row['period'], row['account_id'], row['transaction_type'], row['category']):
+                (row['transaction_count'], row['total_minor'])
+            for row in TransactionRepository.get_period_totals(start, end, **kwargs)
+        }
+
+    def assertAggregatesMatchRebuild(self):
+        stored = {
+            model: sorted(model.objects.values_list(
+                period, 'account_id', 'transaction_type', 'category', 'transaction_count', 'total_amount'
+            ))
+            for model, period in ((DailyAggregate, 'day'), (MonthlyAggregate, 'month'))
+        }
+        TransactionRepository.rebuild_period_aggregates()
+        for model, period in ((DailyAggregate, 'day'), (MonthlyAggregate, 'month')):
+            self.assertEqual(stored[model], sorted(model.objects.values_list(
+                period, 'account_id', 'transaction_type', 'category', 'transaction_count', 'total_amount'
+            )))
+
+    def test_recategorize_moves_aggregates(self):
+        salary = Transaction.objects.filter(transaction_details='SALARY')
+        count = salary.count()
+
+        self.assertEqual(TransactionRepository.recategorize_transactions(salary, 'PAYROLL', batch_size=7), count)
+
+        self.assertEqual(Transaction.objects.filter(transaction_details='PAYROLL').count(), count)
+        self.assertFalse(Transaction.objects.filter(transaction_details='SALARY').exists())
+        self.assertAggregatesMatchRebuild()
+
+    def test_range_with_partial_edge_days_matches_raw_rows(self):
+        start = timezone.make_aware(datetime(2024, 1, 17, 13, 30))
+        end = timezone.make_aware(datetime(2024, 6, 3, 8, 15))
+
+        with self.assertNumQueries(5):
+            totals = self.totals(start, end)
+
+        self.assertEqual(totals, self.expected(start, end))
+
+    def test_daily_periods_and_single_partial_day(self):
+        start = timezone.make_aware(datetime(2024, 2, 10, 6))
+        end = timezone.make_aware(datetime(2024, 2, 10, 18))
+        daily = TransactionRepository.get_period_totals(date(2024, 2, 1), date(2024, 3, 1), period='day')
+        partial = TransactionRepository.get_period_totals(start, end, account_number='0001')
+
+        self.assertEqual(
+            sum(row['transaction_count'] for row in daily),
+            Transaction.objects.filter(date_time__month=2).count()
+        )
+        self.assertEqual(
+            sum(row['transaction_count'] for row in partial),
+            Transaction.objects.filter(account__account_number='0001', date_time__gte=start, date_time__lt=end).count()
+        )
+
+    def test_writes_keep_aggregates_current(self):
+        TransactionRepository.delete_transactions(Transaction.objects.filter(transaction_type='transfer'))
+        self.assertAggregatesMatchRebuild()
+
+        moved = list(Transaction.objects.filter(account__account_number='0001')[:20])
+        TransactionRepository.upsert_transactions(
+            [dict(self.rows[0], transaction_id=row.transaction_id, amount=1.0,
+                  date_time=row.date_time + timedelta(days=40), transaction_details='MOVED') for row in moved],
+            [row.pk for row in moved]
+        )
+        self.assertAggregatesMatchRebuild()
+        self.assertEqual(
+            sum(MonthlyAggregate.objects.filter(category='MOVED').values_list('transaction_count', flat=True)), 20
+        )
+
+
+class MinorUnitTests(TestCase):
+    def test_conversion_uses_currency_exponent(self):
+        self.assertEqual(to_minor_units(12.345, 'OMR'), 12345)
+        self.assertEqual(to_minor_units(0.1 + 0.2, 'OMR'), 300)
+        self.assertEqual(to_minor_units('1,234.5', 'USD'), 123450)
+        self.assertEqual(to_minor_units(Decimal('2.5'), 'JPY'), 3)
+        self.assertEqual(from_minor_units(5, 'OMR'), Decimal('0.005'))
+        self.assertEqual(str(from_minor_units(123450, 'USD')), '1234.50')
+        with self.assertRaises(ValueError):
+            to_minor_units('n/a', 'OMR')
+
+    def test_large_ledger_totals_are_exact(self):
+        rng = random.Random(11)
+        start = timezone.make_aware(datetime(2023, 1, 1))
+        rows = [
+            {
+                'account_number': account_number,
+                'currency': currency,
+                'amount': rng.randrange(1, 1_000_000) / 1000 if currency == 'OMR' else rng.randrange(1, 100_000) / 100,
+                'transaction_type': rng.choice(['income', 'expense']),
+                'date_time': start + timedelta(minutes=index * 37),
+                'transaction_id': f'L{index}'
+            }
+            for index, (account_number, currency) in enumerate(
+                rng.choice([('0001', 'OMR'), ('0002', 'OMR'), ('0003', 'USD')]) for _ in range(20_000)
+            )
+        ]
+        TransactionRepository.bulk_create_transactions(rows)
+
+        for account_number in ('0001', '0002', '0003'):
+            ledger = [row for row in rows if row['account_number'] == account_number]
+            expected = sum(
+                Decimal(str(row['amount'])) * (1 if row['transaction_type'] == 'income' else -1) for row in ledger
+            )
+            summary = TransactionRepository.get_account_summary(account_number)
+            self.assertEqual(summary['net_balance'], expected)
+            self.assertEqual(summary['account'].balance, expected)
+            self.assertEqual(summary['transaction_count'], len(ledger))
+
+        end = start + timedelta(minutes=20_000 * 37)
+        totals = TransactionRepository.get_period_totals(start, end, account_number='0001')
+        self.assertEqual(
+            sum(row['total_amount'] for row in totals),
+            sum(Decimal(str(row['amount'])) for row in rows if row['account_number'] == '0001')
+        )
+        self.assertEqual(TransactionRepository.rebuild_rollups(dry_run=True), [])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        start = timezone.make_aware(datetime(2024, 3, 1))
+        TransactionRepository.bulk_create_transactions([
+            {
+                'account_number': '0001',
+                'amount': index + 0.125,
+                'transaction_type': 'expense',
+                'description': f'Purchase, "{index}"',
+                'date_time': start + timedelta(hours=index),
+                'transaction_id': f'E{index}'
+            }
+            for index in range(120)
+        ])
+
+    def download(self, **params):
+        response = self.client.get(reverse('export_transactions', args=['0001']), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv_export_of_date_range(self):
+        response, body = self.download(start_date='2024-03-02', end_date='2024-03-03')
+        rows = list(csv.DictReader(io.StringIO(body.decode('utf-8'))))
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertEqual(len(rows), 48)
+        self.assertEqual(rows[0]['transaction_id'], 'E71')
+        self.assertEqual(rows[0]['amount'], '71.125')
+        self.assertEqual(rows[0]['description'], 'Purchase, "71"')
+
+    def test_gzipped_json_lines_export(self):
+        response, body = self.download(format='jsonl', gzip='on')
+        rows = [json.loads(line) for line in gzip.decompress(body).decode('utf-8').splitlines()]
+
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="transactions-0001.jsonl.gz"')
+        self.assertEqual(len(rows), 120)
+        self.assertEqual(rows[-1]['amount'], '0.125')
+
+    @override_settings(TIME_ZONE='Asia/Muscat')
+    def test_export_without_dates_has_no_bounds(self):
+        TransactionRepository.bulk_create_transactions([{
+            'account_number': '0001', 'amount': 1, 'transaction_type': 'expense',
+            'date_time': timezone.now() + timedelta(days=2), 'transaction_id': 'FUTURE'
+        }])
+
+        _, body = self.download()
+        rows = list(csv.DictReader(io.StringIO(body.decode('utf-8'))))
+
+        self.assertEqual(len(rows), 121)
+        self.assertEqual(rows[0]['transaction_id'], 'FUTURE')
+
+    def test_rows_are_read_in_chunks(self):
+        blocks = export_transactions('0001', timezone.make_aware(datetime(2024, 1, 1)), timezone.now(),
+                                     chunk_size=50)
+        with self.assertNumQueries(1):
+            first = next(blocks)
+        self.assertEqual(first.count(b'\n'), 51)
+        self.assertEqual(sum(block.count(b'\n') for block in blocks), 70)
+
+
+class SyntheticCorpusTests(SimpleTestCase):
+    def test_every_alert_kind_parses_with_bank_rules(self):
+        parser = RuleBasedParser()
+        emails = list(generate_emails(600, seed=5, noise=0.1))
+
+        self.assertEqual(emails, list(generate_emails(600, seed=5, noise=0.1)))
+        for email_data in emails:
+            data = parser.parse_email(email_data)
+            if email_data['kind'] == 'noise':
+                self.assertIsNone(data)
+                continue
+            self.assertTrue(data['parse_rule'].startswith('bank_muscat.'), email_data['body'])
+            self.assertTrue(data['transaction_id'], email_data['body'])
+            self.assertGreater(data['amount'], 0)
+        self.assertEqual(
+            {email_data['kind'] for email_data in emails},
+            {'card_purchase', 'debit', 'transfer', 'credit', 'salary', 'cash_deposit', 'noise'}
+        )
+
+    def test_mbox_round_trip(self):
+        from email_tracker.archive import iter_mbox
+
+        buffer = io.BytesIO()
+        write_mbox(buffer, generate_emails(20, seed=6))
+        buffer.seek(0)
+
+        self.assertEqual(len(list(iter_mbox(buffer))), 20)
+
+
+class BenchmarkTests(TestCase):
+    def test_suite_runs_and_compares_with_baseline(self):
+        results = run_benchmarks(sizes=[50, 120], parse_count=20, create_count=5, ingest_count=20, repeat=1)
+
+        self.assertIn('parse.rule_based', results)
+        self.assertIn('write.ingest_emails', results)
+        self.assertIn('read.account_details_view@120', results)
+        self.assertEqual(Transaction.objects.count(), 120)
+        self.assertEqual(TransactionRepository.rebuild_rollups(dry_run=True), [])
+
+        slower = {name: dict(timing, ms_per_op=timing['ms_per_op'] / 2) for name, timing in results.items()}
+        rows = compare_results(results, slower, threshold=0.5)
+        self.assertEqual(len(rows), len(results))
+        self.assertTrue(all(row['regressed'] for row in rows if row['baseline_ms']))
+
+    def test_populate_extends_existing_rows(self):
+        populate(30, accounts=3)
+        populate(75, accounts=3)
+
+        self.assertEqual(Transaction.objects.count(), 75)
+        self.assertEqual(Transaction.objects.values('transaction_id').distinct().count(), 75)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        REGISTRY.reset()
+
+    def test_histogram_renders_prometheus_text(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram('test_seconds', 'Test timings.', ('stage',), buckets=(0.1, 1))
+        histogram.observe(0.05, stage='parse')
+        histogram.observe(0.5, stage='parse')
+        histogram.observe(5, stage='parse')
+
+        self.assertEqual(registry.render().splitlines(), [
+            '# HELP test_seconds Test timings.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{stage="parse",le="0.1"} 1',
+            'test_seconds_bucket{stage="parse",le="1"} 2',
+            'test_seconds_bucket{stage="parse",le="+Inf"} 3',
+            'test_seconds_sum{stage="parse"} 5.55',
+            'test_seconds_count{stage="parse"} 3',
+        ])
+
+    def test_requests_and_stages_are_recorded(self):
+        self.client.get(reverse('accounts'))
+        ingest_emails(list(generate_emails(5, seed=8)), RuleBasedParser())
+
+        body = self.client.get(reverse('metrics')).content.decode()
+
+        self.assertIn('money_tracker_request_seconds_count{view="accounts",method="GET",status="200"} 1', body)
+        self.assertIn('money_tracker_request_db_queries_count{view="accounts"} 1', body)
+        self.assertEqual(STAGE_SECONDS.collect()[('parse',)]['count'], 1)
+        self.assertEqual(STAGE_SECONDS.collect()[('db_persist',)]['count'], 1)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_metrics_are_local_only(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+
+    @override_settings(METRICS_TOKEN='s3cret', METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_metrics_token_is_required_when_set(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(
+            self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret', REMOTE_ADDR='10.9.8.7').status_code,
+            200
+        )
+
+    def test_middleware_queries_count_towards_the_request(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('parse_email'), {
+                'source': 'paste',
+                'email_content': next(generate_emails(1, seed=13, kinds=['salary']))['body'],
+                'from_email': 'bankmuscat@bankmuscat.com',
+            })
+
+        # Including the session saved by SessionMiddleware on the way out
+        self.assertTrue(any('django_session' in query['sql'] for query in queries.captured_queries))
+        self.assertEqual(REQUEST_QUERIES.collect()[('parse_email',)]['sum'], len(queries))
+
+    @override_settings(SLOW_REQUEST_MS=1)
+    def test_slow_request_log_lists_top_sql(self):
+        TransactionRepository.bulk_create_transactions(
+            [{'account_number': '0001', 'amount': 1, 'transaction_id': f'S{index}'} for index in range(3)]
+        )
+        with self.assertLogs('money_tracker_app.middleware', 'WARNING') as logs:
+            self.client.get(reverse('account_details', args=['0001']), {'page_size': 1000})
+
+        self.assertIn('Slow request GET /account/0001/', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+@override_settings(PARSE_BATCH_PAGE_SIZE=10)
+class ParseBatchTests(TestCase):
+    def fetch_batch(self, count):
+        emails = list(generate_emails(count, seed=11, noise=0.1))
+        stats = ingest_emails(emails, RuleBasedParser(), save=False)
+        return ParseBatchRepository.create_batch('fetch', emails, stats['results'])
+
+    def test_batch_is_paginated_and_saved_in_bulk(self):
+        batch = self.fetch_batch(25)
+        self.assertEqual(batch.items.count(), 25)
+        self.assertEqual(batch.parsed_count, batch.items.filter(status=ParseItemStatus.PARSED).count())
+
+        response = self.client.get(reverse('batch_results', args=[batch.pk]), {'page': 3})
+        self.assertEqual(len(response.context['page'].object_list), 5)
+        self.assertContains(response, 'Page 3 of 3')
+
+        response = self.client.post(reverse('save_parse_batch', args=[batch.pk]))
+        self.assertRedirects(response, reverse('batch_results', args=[batch.pk]))
+        self.assertEqual(Transaction.objects.count(), batch.parsed_count)
+        batch.refresh_from_db()
+        self.assertEqual(batch.saved_count, batch.parsed_count)
+        self.assertFalse(batch.items.filter(status=ParseItemStatus.PARSED).exists())
+        self.assertEqual(batch.items.filter(transaction__isnull=False).count(), batch.parsed_count)
+
+        # Saving again finds nothing left to store
+        self.assertEqual(
+            ParseBatchRepository.save_batch(batch), {'created': 0, 'duplicates': 0, 'rejected': 0}
+        )
+
+    def test_saved_ingest_records_outcomes(self):
+        emails = list(generate_emails(4, seed=12))
+        ingest_emails(emails[:2], RuleBasedParser())
+        stats = ingest_emails(emails, RuleBasedParser())
+
+        batch = ParseBatchRepository.create_batch('fetch', emails, stats['results'])
+
+        self.assertEqual(
+            list(batch.items.order_by('position').values_list('status', flat=True)),
+            [ParseItemStatus.DUPLICATE] * 2 + [ParseItemStatus.SAVED] * 2
+        )
+        self.assertEqual(batch.saved_count, 4)
+
+    def test_session_holds_only_the_batch_id(self):
+        response = self.client.post(reverse('parse_email'), {
+            'source': 'paste',
+            'email_content': next(generate_emails(1, seed=13, kinds=['salary']))['body'],
+            'from_email': 'bankmuscat@bankmuscat.com',
+        })
+        batch = ParseBatch.objects.get()
+
+        self.assertRedirects(response, reverse('batch_results', args=[batch.pk]))
+        self.assertEqual(dict(self.client.session), {'parse_batch_id': batch.pk})
+        self.assertContains(self.client.get(reverse('results')), 'Save to Database')
+
+    def test_pasting_an_email_again_is_answered_from_the_cache(self):
+        form = {
+            'source': 'paste',
+            'email_content': next(generate_emails(1, seed=13, kinds=['salary']))['body'],
+            'from_email': 'bankmuscat@bankmuscat.com',
+            'save_to_db': 'on',
+        }
+        self.client.post(reverse('parse_email'), form)
+        response = self.client.post(reverse('parse_email'), form, follow=True)
+
+        self.assertContains(response, 'Reused the cached parse result')
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertEqual(ParseCacheEntry.objects.get().transaction, Transaction.objects.get())
+        self.assertEqual(ParseBatch.objects.latest('pk').items.get().status, ParseItemStatus.DUPLICATE)
+
+    @override_settings(PARSE_BATCH_RETENTION_DAYS=1)
+    def test_expired_batches_are_pruned(self):
+        old = self.fetch_batch(2)
+        ParseBatch.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=2))
+
+        self.fetch_batch(2)
+
+        self.assertFalse(ParseBatch.objects.filter(pk=old.pk).exists())
+        self.assertEqual(ParseBatch.objects.count(), 1)
+
+
+class SummaryCacheTests(TestCase):
+    def add(self, *references):
+        TransactionRepository.bulk_create_transactions(
+            [{'account_number': '0001', 'amount': 10, 'transaction_id': reference} for reference in references]
+        )
+
+    def test_writes_invalidate_cached_summaries(self):
+        self.add('C1')
+        self.assertEqual(get_account_summary('0001')['transaction_count'], 1)
+
+        # Version lookup only
+        with self.assertNumQueries(1):
+            self.assertEqual(get_account_summary('0001')['transaction_count'], 1)
+
+        self.add('C2')
+        self.assertEqual(get_account_summary('0001')['transaction_count'], 2)
+        TransactionRepository.delete_transactions(Transaction.objects.filter(transaction_id='C1'))
+        self.assertEqual(get_account_summary('0001')['transaction_count'], 1)
+
+    def test_deleting_the_last_transaction_drops_its_rollup(self):
+        self.add('C1')
+        TransactionRepository.delete_transactions(Transaction.objects.filter(transaction_id='C1'))
+
+        self.assertFalse(AccountRollup.objects.exists())
+        self.assertEqual(TransactionRepository.rebuild_rollups(dry_run=True), [])
+        self.assertEqual(get_account_summary('0001')['transaction_count'], 0)
+
+    def test_unchanged_pages_are_not_modified(self):
+        self.add('C1')
+        for url in (reverse('accounts'), reverse('account_details', args=['0001'])):
+            response = self.client.get(url)
+            self.assertTrue(response.has_header('Last-Modified'))
+
+            revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(revalidated.status_code, 304)
+
+        etag = self.client.get(reverse('accounts'))['ETag']
+        self.add('C2')
+        response = self.client.get(reverse('accounts'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class WriteQueueTests(TransactionTestCase):
+    def test_concurrent_writes_are_group_committed(self):
+        write_queue = WriteQueue(max_batch=10, max_delay_ms=50)
+        self.addCleanup(write_queue.stop)
+
+        def create(reference):
+            return TransactionRepository.create_transaction(
+                {'account_number': '0001', 'amount': 1, 'transaction_id': reference}
+            )
+
+        def fail():
+            create('LOST')
+            raise ValueError('bad write')
+
+        futures = [write_queue.submit(create, f'Q{index}') for index in range(5)]
+        failed = write_queue.submit(fail)
+
+        self.assertEqual([future.result().transaction_id for future in futures], [f'Q{index}' for index in range(5)])
+        with self.assertRaisesMessage(ValueError, 'bad write'):
+            failed.result()
+        self.assertLess(write_queue.stats['commits'], write_queue.stats['writes'])
+        self.assertEqual(
+            sorted(Transaction.objects.values_list('transaction_id', flat=True)), [f'Q{index}' for index in range(5)]
+        )
+        self.assertEqual(TransactionRepository.rebuild_rollups(dry_run=True), [])
+
+    @override_settings(WRITE_QUEUE_ENABLED=True)
+    def test_queued_writes_count_towards_the_request(self):
+        REGISTRY.reset()
+        self.addCleanup(get_write_queue().stop)
+
+        def view(request):
+            TransactionRepository.create_account({'account_number': '0001'})
+            return HttpResponse()
+
+        MetricsMiddleware(view)(RequestFactory().get('/'))
+
+        # Looked up and inserted on the writer thread
+        self.assertGreaterEqual(REQUEST_QUERIES.collect()[('unresolved',)]['sum'], 2)
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1234, 'busy_timeout': 2500})
+    def test_connections_get_the_configured_pragmas(self):
+        configure_sqlite(None, connection)
+
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -1234)
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 2500)
+
+
+class SearchTests(TestCase):
+    def setUp(self):
+        TransactionRepository.bulk_create_transactions([
+            {'account_number': '0001', 'amount': 5, 'description': 'Card purchase at LULU HYPERMARKET',
+             'transaction_id': 'S1', 'date_time': '2024-01-05T10:00:00+00:00'},
+            {'account_number': '0001', 'amount': 7, 'description': 'Card purchase at Lulu Express',
+             'counterparty_name': 'LULU', 'transaction_id': 'S2', 'date_time': '2024-02-05T10:00:00+00:00'},
+            {'account_number': '0002', 'amount': 9, 'description': 'Refund', 'counterparty_name': 'Lulu Hypermarket',
+             'transaction_id': 'S3', 'date_time': '2024-03-05T10:00:00+00:00'},
+            {'account_number': '0002', 'amount': 2, 'description': 'Transfer to Ahmed', 'branch': 'RUWI',
+             'transaction_id': 'S4', 'date_time': '2024-03-06T10:00:00+00:00'},
+        ])
+
+    def ids(self, *args, **kwargs):
+        return [transaction.transaction_id for transaction in TransactionRepository.search(*args, **kwargs)['transactions']]
+
+    def test_search_ranks_and_filters(self):
+        # S2 mentions lulu twice
+        self.assertEqual(self.ids('lulu')[0], 'S2')
+        self.assertEqual(sorted(self.ids('lulu')), ['S1', 'S2', 'S3'])
+        self.assertEqual(sorted(self.ids('lulu hyper')), ['S1', 'S3'])
+        self.assertEqual(self.ids('lulu', account='0002'), ['S3'])
+        self.assertEqual(self.ids('ruw'), ['S4'])
+        self.assertEqual(self.ids('s4'), ['S4'])
+        self.assertEqual(self.ids('"); DROP TABLE --'), [])
+        self.assertEqual(self.ids('lulu', date_range=(
+            timezone.make_aware(datetime(2024, 2, 1)), timezone.make_aware(datetime(2024, 3, 1))
+        )), ['S2'])
+
+        page = TransactionRepository.search('lulu', page=2, page_size=2)
+        self.assertEqual((len(page['transactions']), page['has_next']), (1, False))
+
+    def test_index_follows_updates_and_deletes(self):
+        TransactionRepository.upsert_transactions([
+            {'account_number': '0002', 'amount': 2, 'description': 'Transfer to Salim', 'transaction_id': 'S4'}
+        ])
+        TransactionRepository.delete_transactions(Transaction.objects.filter(transaction_id='S1'))
+
+        self.assertEqual(self.ids('ahmed'), [])
+        self.assertEqual(self.ids('salim'), ['S4'])
+        self.assertEqual(sorted(self.ids('lulu')), ['S2', 'S3'])
+
+    @override_settings(SEARCH_RANK_WINDOW=3)
+    def test_pages_past_the_rank_window_list_the_older_matches(self):
+        TransactionRepository.bulk_create_transactions([
+            {'account_number': '0003', 'amount': 1, 'description': f'Lulu purchase {index}',
+             'transaction_id': f'W{index}', 'date_time': '2024-04-01T10:00:00+00:00'}
+            for index in range(5)
+        ])
+        # 8 matches: the 3 stored last are ranked, the other 5 follow by descending id
+        newest_first = list(
+            Transaction.objects.filter(pk__in=[
+                transaction.pk for transaction in TransactionRepository.search('lulu', page_size=100)['transactions']
+            ]).order_by('-id').values_list('transaction_id', flat=True)
+        )
+
+        pages = [TransactionRepository.search('lulu', page=page, page_size=2) for page in (1, 2, 3, 4, 5)]
+
+        found = [transaction.transaction_id for page in pages for transaction in page['transactions']]
+        self.assertEqual(len(found), 8)
+        self.assertEqual(sorted(found), sorted(newest_first))
+        self.assertEqual(sorted(found[:3]), sorted(newest_first[:3]))
+        self.assertEqual(found[3:], newest_first[3:])
+        self.assertEqual([page['has_next'] for page in pages], [True, True, True, False, False])
+        self.assertEqual((pages[0]['ranked_count'], pages[0]['ranking_truncated']), (3, True))
+        self.assertContains(
+            self.client.get(reverse('search_transactions'), {'q': 'lulu', 'page': 3, 'page_size': 2}),
+            'Only the 3 most recently recorded matches are ranked'
+        )
+
+    def test_search_view_paginates(self):
+        response = self.client.get(reverse('search_transactions'), {'q': 'lulu', 'page_size': 2})
+
+        self.assertEqual(len(response.context['results']['transactions']), 2)
+        self.assertContains(response, 'q=lulu&amp;page_size=2&amp;page=2')
+
+
+
+class DimensionTests(TestCase):
+    def test_names_are_interned_by_normalised_key(self):
+        self.assertEqual(normalize_name('  Lulu\tHYPERMARKET '), 'lulu hypermarket')
+        TransactionRepository.bulk_create_transactions([
+            {'account_number': '0001', 'amount': 5, 'transaction_type': 'expense', 'bank_name': 'Bank Muscat',
+             'counterparty_name': 'LULU HYPERMARKET', 'from_party': 'me', 'to_party': 'LULU HYPERMARKET',
+             'date_time': '2024-01-05T10:00:00+00:00'},
+            {'account_number': '0001', 'amount': 7, 'transaction_type': 'expense',
+             'counterparty_name': 'Lulu  Hypermarket', 'from_party': 'me', 'date_time': '2024-02-05T10:00:00+00:00'},
+        ])
+        TransactionRepository.create_transaction({
+            'account_number': '0002', 'amount': 9, 'transaction_type': 'income', 'counterparty_name': 'lulu hypermarket',
+            'transaction_sender': 'Lulu Hypermarket', 'to_party': 'ME', 'date_time': '2024-03-05T10:00:00+00:00'
+        })
+
+        self.assertEqual(sorted(Counterparty.objects.values_list('name', flat=True)), ['LULU HYPERMARKET', 'me'])
+        transaction = Transaction.objects.get(account__account_number='0002')
+        self.assertEqual(transaction.counterparty_name, 'LULU HYPERMARKET')
+        self.assertEqual(transaction.transaction_sender, 'LULU HYPERMARKET')
+        self.assertIsNone(transaction.bank_name)
+
+        totals = TransactionRepository.get_counterparty_totals(counterparty='LULU HYPERMARKET')
+        self.assertEqual(
+            [(row['transaction_type'], row['transaction_count'], row['total_amount']) for row in totals],
+            [('expense', 2, Decimal('12.000')), ('income', 1, Decimal('9.000'))]
+        )
+        self.assertEqual(TransactionRepository.get_counterparty_totals(account_number='0003'), [])
+
+    def test_resolver_caches_committed_ids_up_to_its_size(self):
+        resolver = DimensionResolver(Counterparty, max_size=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            ids = resolver.resolve_many(['A', 'b', ' B '])
+        self.assertEqual(len(ids), 2)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(resolver.resolve('a'), ids['a'])
+        with self.captureOnCommitCallbacks(execute=True):
+            resolver.resolve('C')
+        # 'b' was least recently used
+        with self.assertNumQueries(1):
+            self.assertEqual(resolver.resolve('B'), ids['b'])
+        self.assertEqual(resolver.stats, {'hits': 1, 'misses': 4})
+
+        # Ids read in a transaction that is rolled back are not kept
+        with self.captureOnCommitCallbacks(execute=False):
+            resolver.resolve('D')
+        with self.assertNumQueries(1):
+            resolver.resolve('D')
+
+
+class ServiceRegistryTests(SimpleTestCase):
+    def test_services_are_built_once_on_first_use(self):
+        built = []
+        registry = ServiceRegistry()
+        registry.register('echo', lambda: built.append(1) or EchoParser())
+        registry.register('broken', lambda: 1 / 0)
+
+        self.assertFalse(registry.is_built('echo'))
+        self.assertIs(registry.get('echo'), registry.get('echo'))
+        self.assertEqual(built, [1])
+        with self.assertRaises(KeyError):
+            registry.get('missing')
+
+        # A failing warm-up is logged, not raised
+        with self.assertLogs('money_tracker_app.services', 'ERROR'):
+            registry.warm()
+        registry.reset()
+        self.assertFalse(registry.is_built('echo'))
+
+    def test_importtime_output_is_parsed(self):
+        imports = parse_importtime([
+            'import time: self [us] | cumulative | imported package',
+            'import time:       120 |        120 |     encodings.idna',
+            'import time:       300 |        420 |   encodings',
+            'import time:      1000 |       1420 | django',
+            'import time:        80 |         80 | money_tracker_app.views',
+        ])
+
+        self.assertEqual([entry['depth'] for entry in imports], [2, 1, 0, 0])
+        summary = summarize_imports(imports, top=1, prefixes=('money_tracker_app',))
+        self.assertEqual(summary['total_ms'], 1.5)
+        self.assertEqual([entry['module'] for entry in summary['slowest']], ['money_tracker_app.views'])
+
+
+class TransactionAdminTests(TestCase):
+    def setUp(self):
+        TransactionRepository.bulk_create_transactions([
+            {'account_number': '0001', 'amount': index + 1, 'transaction_type': 'expense', 'currency': 'OMR',
+             'transaction_id': f'A{index}', 'date_time': f'2024-01-{index + 1:02d}T10:00:00+00:00'}
+            for index in range(5)
+        ])
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        self.url = reverse('admin:money_tracker_app_transaction_changelist')
+
+    def act(self, action, pks, **data):
+        return self.client.post(self.url, {
+            'action': action, helpers.ACTION_CHECKBOX_NAME: pks, **data
+        }, follow=True)
+
+    @override_settings(ADMIN_COUNT_LIMIT=3)
+    def test_changelist_counts_from_rollups_or_up_to_the_limit(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.context['cl'].result_count, 5)
+
+        response = self.client.get(self.url, {'currency': 'OMR'})
+        self.assertEqual(response.context['cl'].result_count, 3)
+
+    def test_actions_are_set_based(self):
+        pks = list(Transaction.objects.order_by('pk').values_list('pk', flat=True))
+
+        self.act('recategorize_selected', pks[:2], category='GROCERIES')
+        self.assertEqual(Transaction.objects.filter(transaction_details='GROCERIES').count(), 2)
+
+        response = self.act('reparse_selected', pks[:1])
+        self.assertContains(response, 'None of the selected transactions has a stored email')
+
+        self.act('delete_selected', pks[:3], post='yes')
+        self.assertEqual(Transaction.objects.count(), 2)
+        rollup = AccountRollup.objects.get()
+        self.assertEqual((rollup.transaction_count, rollup.total_expense), (2, 9000))
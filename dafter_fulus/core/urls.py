@@ -9,7 +9,12 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('parse/', views.parse_email, name='parse_email'),
     path('results/', views.results, name='results'),
+    path('results/<int:batch_id>/', views.results, name='batch_results'),
+    path('results/<int:batch_id>/save/', views.save_parse_batch, name='save_parse_batch'),
     path('accounts/', views.accounts, name='accounts'),
     path('account/<str:account_number>/', views.account_details, name='account_details'),
+    path('account/<str:account_number>/export/', views.export_transactions, name='export_transactions'),
+    path('search/', views.search_transactions, name='search_transactions'),
     path('fetch_emails/', views.fetch_emails, name='fetch_emails'),
+    path('metrics', views.metrics, name='metrics'),
 ]
\ No newline at end of file
@@ -2,32 +2,34 @@
 Views for the Money Tracker app.
 """
 
-import os
+import hmac
 import logging
-from datetime import datetime
+import zipfile
+from datetime import datetime, time
+from django.core.paginator import Paginator
 from django.shortcuts import render, redirect
 from django.urls import reverse
 from django.contrib import messages
 from django.conf import settings
-from django.http import HttpResponse
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
-
-# Import path_setup to add the parent directory to the Python path
-from . import path_setup
-
-from .forms import EmailContentForm, EmailFetchForm
-from .models import TransactionRepository
-from money_tracker.services.parser_service import TransactionParser
-from money_tracker.services.email_service import EmailService
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .export import EXPORT_FORMATS, export_transactions as stream_export
+from .forms import EmailContentForm, EmailFetchForm, TransactionExportForm, TransactionSearchForm
+from .ingest import ingest_emails
+from .metrics import REGISTRY, timed
+from .models import ParseBatchRepository, ParseBatchSource, TransactionRepository
+from .parse_cache import get_parse_cache
+from .pagination import TRANSACTION_LIST_FIELDS, TRANSACTION_LIST_RELATED, paginate
+from .services import get_parse_executor
+from . import summary_cache
+from email_tracker.archive import import_archive
+from email_tracker.sync import fetch_mailbox
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
-# Initialize services
-parser = TransactionParser()
-email_service = EmailService()
-
 def index(request):
     """Home page with options to input email data."""
     email_content_form = EmailContentForm()
@@ -45,6 +47,8 @@ def parse_email(request):
     form = EmailContentForm(request.POST, request.FILES)
     if not form.is_valid():
         messages.error(request, 'Please correct the errors in the form.')
+        for error in form.errors.get('email_file', []):
+            messages.error(request, error)
         return redirect('index')
 
     email_data = {}
@@ -73,15 +77,8 @@ def parse_email(request):
             return redirect('index')
 
         try:
-            # Save the file temporarily
-            file_path = default_storage.save(
-                os.path.join(settings.UPLOAD_FOLDER, email_file.name),
-                ContentFile(email_file.read())
-            )
-
-            # Read the file content
-            with default_storage.open(file_path) as f:
-                email_content = f.read().decode('utf-8')
+            # Read the upload directly rather than round-tripping it through storage
+            email_content = email_file.read().decode('utf-8')
 
             email_data = {
                 'id': f'upload_{datetime.now().strftime("%Y%m%d%H%M%S")}',
@@ -90,63 +87,114 @@ def parse_email(request):
                 'date': datetime.now().strftime('%a, %d %b %Y %H:%M:%S %z'),
                 'body': email_content
             }
-
-            # Clean up the uploaded file
-            default_storage.delete(file_path)
         except Exception as e:
             logger.error(f"Error reading uploaded file: {str(e)}")
             messages.error(request, f'Error reading file: {str(e)}')
             return redirect('index')
 
+    elif source == 'archive':
+        return import_email_archive(request, form)
+
     else:
         messages.error(request, 'Invalid source')
         return redirect('index')
 
-    # Parse the email data
-    transaction_data = parser.parse_email(email_data)
+    # Parse the email, reusing the cached result of an identical one, and optionally save it
+    save_to_db = form.cleaned_data.get('save_to_db', False)
+    try:
+        stats = ingest_emails([email_data], get_parse_executor(), cache=get_parse_cache(), save=save_to_db)
+    except Exception as e:
+        logger.error(f"Error saving transaction to database: {str(e)}")
+        messages.error(request, f'Error saving to database: {str(e)}')
+        return redirect('index')
 
-    if not transaction_data:
+    if not stats['parsed']:
         messages.error(request, 'Failed to parse email content. Make sure it contains valid transaction data.')
         return redirect('index')
 
-    # Store the transaction data in session for display
-    request.session['transaction_data'] = transaction_data
+    # Keep the result in a parse batch; the session only holds its id
+    batch = ParseBatchRepository.create_batch(source, [email_data], stats['results'])
+    request.session['parse_batch_id'] = batch.pk
 
-    # Optionally save to database if requested
-    save_to_db = form.cleaned_data.get('save_to_db', False)
+    if stats['hits']:
+        messages.info(request, 'Reused the cached parse result of an identical email')
     if save_to_db:
-        try:
-            transaction = TransactionRepository.create_transaction(transaction_data)
-            if transaction:
-                messages.success(request, 'Transaction saved to database')
-            else:
-                messages.error(request, 'Failed to save transaction to database')
-        except Exception as e:
-            logger.error(f"Error saving transaction to database: {str(e)}")
-            messages.error(request, f'Error saving to database: {str(e)}')
+        if stats['created'] or stats['duplicates']:
+            messages.success(request, 'Transaction saved to database')
+        else:
+            messages.error(request, 'Failed to save transaction to database')
+
+    return redirect('batch_results', batch_id=batch.pk)
 
-    return redirect('results')
+def import_email_archive(request, form):
+    """Stream an uploaded mbox or zip of .eml files into the database."""
+    email_file = form.cleaned_data.get('email_file')
+    save_to_db = form.cleaned_data.get('save_to_db', False)
+    try:
+        stats = import_archive(email_file, get_parse_executor(), name=email_file.name, save=save_to_db)
+    except (ValueError, zipfile.BadZipFile) as e:
+        logger.error(f"Error importing archive {email_file.name}: {str(e)}")
+        messages.error(request, f'Error importing archive: {str(e)}')
+        return redirect('index')
 
-def results(request):
-    """Display the parsed transaction data."""
-    transaction_data = request.session.get('transaction_data')
-    if not transaction_data:
+    messages.success(
+        request,
+        f"Imported {stats['messages']} emails from {email_file.name}: {stats['parsed']} parsed, "
+        f"{stats['created']} saved, {stats['duplicates']} duplicates in {stats['seconds']:.1f}s"
+    )
+    if stats['errors']:
+        messages.warning(request, f"{stats['errors']} emails could not be parsed")
+    return redirect('accounts' if stats['created'] else 'index')
+
+def results(request, batch_id=None):
+    """Display the parsed transactions of a parse batch, a page at a time."""
+    if batch_id is None:
+        batch_id = request.session.get('parse_batch_id')
+    batch = ParseBatchRepository.get_batch(batch_id) if batch_id else None
+    if batch is None:
         messages.error(request, 'No transaction data available')
         return redirect('index')
 
-    return render(request, 'results.html', {'transaction': transaction_data})
+    items = batch.items.select_related('transaction__account').order_by('position')
+    page = Paginator(items, settings.PARSE_BATCH_PAGE_SIZE).get_page(request.GET.get('page'))
+    context = {'batch': batch, 'page': page}
+    if batch.message_count == 1 and page.object_list:
+        context['transaction'] = page.object_list[0].transaction_data
+    return render(request, 'results.html', context)
 
+def save_parse_batch(request, batch_id):
+    """Store every parsed, unsaved transaction of a parse batch."""
+    if request.method != 'POST':
+        return redirect('batch_results', batch_id=batch_id)
+
+    batch = ParseBatchRepository.get_batch(batch_id)
+    if batch is None:
+        messages.error(request, 'No transaction data available')
+        return redirect('index')
+
+    try:
+        with timed('db_persist'):
+            stats = ParseBatchRepository.save_batch(batch)
+    except Exception as e:
+        logger.error(f"Error saving parse batch {batch_id}: {str(e)}")
+        messages.error(request, f'Error saving to database: {str(e)}')
+        return redirect('batch_results', batch_id=batch_id)
+
+    if stats['created']:
+        messages.success(request, f"Saved {stats['created']} transactions to database")
+    if stats['duplicates']:
+        messages.info(request, f"Skipped {stats['duplicates']} transactions already in the database")
+    if stats['rejected']:
+        messages.warning(request, f"Rejected {stats['rejected']} transactions")
+    if not any(stats.values()):
+        messages.info(request, 'No unsaved transactions in this batch')
+    return redirect('batch_results', batch_id=batch_id)
+
+@condition(etag_func=summary_cache.accounts_etag, last_modified_func=summary_cache.accounts_last_modified)
 def accounts(request):
     """Display all accounts and their summaries."""
     try:
-        from .models import Account
-        accounts = Account.objects.all()
-
-        summaries = []
-        for account in accounts:
-            summary = TransactionRepository.get_account_summary(account.account_number)
-            if summary:
-                summaries.append(summary)
+        summaries = summary_cache.get_account_summaries(summary_cache.request_state(request))
 
         return render(request, 'accounts.html', {'summaries': summaries})
     except Exception as e:
@@ -154,30 +202,92 @@ def accounts(request):
         messages.error(request, f'Error getting account summaries: {str(e)}')
         return redirect('index')
 
+@condition(etag_func=summary_cache.account_etag, last_modified_func=summary_cache.account_last_modified)
 def account_details(request, account_number):
     """Display details for a specific account."""
     try:
-        from .models import Account, Transaction
+        from .models import Transaction
 
-        try:
-            account = Account.objects.get(account_number=account_number)
-        except Account.DoesNotExist:
+        summary = summary_cache.get_account_summary(
+            account_number, summary_cache.request_state(request, account_number)
+        )
+        if not summary:
             messages.error(request, f'Account {account_number} not found')
             return redirect('accounts')
 
-        transactions = Transaction.objects.filter(account=account).order_by('-date_time')
-        summary = TransactionRepository.get_account_summary(account_number)
+        account = summary['account']
+        page = paginate(
+            Transaction.objects.filter(account=account).select_related(*TRANSACTION_LIST_RELATED).only(
+                *TRANSACTION_LIST_FIELDS
+            ),
+            before=request.GET.get('before'),
+            after=request.GET.get('after'),
+            page_size=request.GET.get('page_size')
+        )
 
         return render(request, 'account_details.html', {
             'account': account,
-            'transactions': transactions,
-            'summary': summary
+            'transactions': page['transactions'],
+            'page': page,
+            'summary': summary,
+            'export_form': TransactionExportForm()
         })
     except Exception as e:
         logger.error(f"Error getting account details: {str(e)}")
         messages.error(request, f'Error getting account details: {str(e)}')
         return redirect('accounts')
 
+def export_transactions(request, account_number):
+    """Stream the transactions of an account as CSV or JSON Lines, optionally gzipped."""
+    form = TransactionExportForm(request.GET)
+    if not form.is_valid():
+        messages.error(request, 'Please correct the export dates.')
+        return redirect('account_details', account_number=account_number)
+
+    start_date = form.cleaned_data['start_date']
+    end_date = form.cleaned_data['end_date']
+    export_format = form.cleaned_data['format'] or 'csv'
+    compress = form.cleaned_data['gzip']
+
+    start = timezone.make_aware(datetime.combine(start_date, time.min)) if start_date else None
+    end = timezone.make_aware(datetime.combine(end_date, time.max)) if end_date else None
+
+    filename = f"transactions-{account_number}.{export_format}" + ('.gz' if compress else '')
+    response = StreamingHttpResponse(
+        stream_export(account_number, start, end, export_format, compress=compress),
+        content_type='application/gzip' if compress else f'{EXPORT_FORMATS[export_format]}; charset=utf-8'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def search_transactions(request):
+    """Search transactions by description, counterparty, parties, details, branch or reference."""
+    form = TransactionSearchForm(request.GET or None)
+    results = None
+    if form.is_valid() and form.cleaned_data['q']:
+        start_date = form.cleaned_data['start_date']
+        end_date = form.cleaned_data['end_date']
+        date_range = (
+            timezone.make_aware(datetime.combine(start_date, time.min)) if start_date else None,
+            timezone.make_aware(datetime.combine(end_date, time.max)) if end_date else None
+        )
+        results = TransactionRepository.search(
+            form.cleaned_data['q'],
+            account=form.cleaned_data['account'] or None,
+            date_range=date_range,
+            page=request.GET.get('page'),
+            page_size=request.GET.get('page_size')
+        )
+
+    # Links to other pages keep the search parameters
+    query = request.GET.copy()
+    query.pop('page', None)
+    return render(request, 'search.html', {
+        'form': form,
+        'results': results,
+        'query_string': query.urlencode()
+    })
+
 def fetch_emails(request):
     """Fetch emails directly from the email account."""
     if request.method != 'POST':
@@ -198,72 +308,62 @@ def fetch_emails(request):
         bank_email_addresses = form.cleaned_data['bank_email_addresses']
         bank_email_subjects = form.cleaned_data['bank_email_subjects']
 
-        # Create a custom email service with user-provided settings
-        custom_email_service = EmailService(
-            host=email_host,
-            port=email_port,
-            username=email_username,
-            password=email_password,
-            use_ssl=email_use_ssl,
-            bank_email_addresses=bank_email_addresses.split(','),
-            bank_email_subjects=bank_email_subjects.split(',')
-        )
-
-        # Connect to email
-        if not custom_email_service.connect():
-            messages.error(request, 'Failed to connect to email server. Check your email settings.')
-            return redirect('index')
-
-        # Get bank emails
-        folder = form.cleaned_data['folder']
-        unread_only = form.cleaned_data['unread_only']
+        # Only messages above the watermark stored for this mailbox folder are downloaded
+        mailbox = {
+            'host': email_host,
+            'port': email_port,
+            'username': email_username,
+            'password': email_password,
+            'use_ssl': email_use_ssl,
+            'folder': form.cleaned_data['folder'],
+            'bank_email_addresses': bank_email_addresses.split(','),
+            'bank_email_subjects': bank_email_subjects.split(',')
+        }
 
-        emails = custom_email_service.get_bank_emails(folder=folder, unread_only=unread_only)
+        # Parse each email, reusing cached results for emails seen before,
+        # and optionally save to database if requested
+        save_to_db = form.cleaned_data['save_to_db']
+        emails, stats = fetch_mailbox(
+            mailbox, get_parse_executor(), save=save_to_db, unread_only=form.cleaned_data['unread_only']
+        )
 
         if not emails:
-            messages.info(request, 'No bank emails found')
+            messages.info(request, 'No new bank emails found')
             return redirect('index')
 
-        # Parse each email and store results
-        parsed_emails = []
-        for email_data in emails:
-            transaction_data = parser.parse_email(email_data)
-            if transaction_data:
-                parsed_emails.append({
-                    'email': email_data,
-                    'transaction': transaction_data
-                })
-
-        if not parsed_emails:
+        parsed_transactions = [result['transaction'] for result in stats['results'] if result['transaction']]
+
+        if not parsed_transactions:
             messages.info(request, 'No transaction data found in the emails')
             return redirect('index')
 
-        # Store the first transaction in session for display
-        request.session['transaction_data'] = parsed_emails[0]['transaction']
+        # Keep every result in a parse batch; the session only holds its id
+        batch = ParseBatchRepository.create_batch(ParseBatchSource.FETCH, emails, stats['results'])
+        request.session['parse_batch_id'] = batch.pk
+
+        if stats['hits'] > 0:
+            messages.info(request, f"Reused cached parse results for {stats['hits']} of {stats['messages']} emails")
 
-        # Optionally save to database if requested
-        save_to_db = form.cleaned_data['save_to_db']
         if save_to_db:
-            try:
-                saved_count = 0
-                for parsed_email in parsed_emails:
-                    transaction = TransactionRepository.create_transaction(parsed_email['transaction'])
-                    if transaction:
-                        saved_count += 1
-
-                if saved_count > 0:
-                    messages.success(request, f'Saved {saved_count} transactions to database')
-                else:
-                    messages.error(request, 'Failed to save transactions to database')
-            except Exception as e:
-                logger.error(f"Error saving transactions to database: {str(e)}")
-                messages.error(request, f'Error saving to database: {str(e)}')
-
-        # Disconnect from email
-        custom_email_service.disconnect()
-
-        return redirect('results')
+            if stats['created'] > 0:
+                messages.success(request, f"Saved {stats['created']} transactions to database")
+            if stats['duplicates'] > 0:
+                messages.info(request, f"Skipped {stats['duplicates']} transactions already in the database")
+            if stats['created'] == 0 and stats['duplicates'] == 0:
+                messages.error(request, 'Failed to save transactions to database')
+
+        return redirect('batch_results', batch_id=batch.pk)
     except Exception as e:
         logger.error(f"Error fetching emails: {str(e)}")
         messages.error(request, f'Error fetching emails: {str(e)}')
         return redirect('index')
+
+def metrics(request):
+    """Expose the in-process metrics in Prometheus text format to METRICS_TOKEN holders, else METRICS_ALLOWED_IPS."""
+    if settings.METRICS_TOKEN:
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+        if not hmac.compare_digest(authorization.encode(), f'Bearer {settings.METRICS_TOKEN}'.encode()):
+            return HttpResponseForbidden('A valid metrics token is required')
+    elif request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return HttpResponseForbidden('Metrics are only available locally')
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
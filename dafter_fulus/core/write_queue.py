@@ -0,0 +1,184 @@
+"""
+Single-writer queue for TransactionRepository writes.
+
+SQLite takes one writer at a time. Rather than request threads racing for the
+lock and paying an fsync per transaction, writes submitted here run on one
+writer thread per process, which commits whatever has queued up meanwhile in
+a single transaction (a group commit). Each write runs in its own savepoint,
+so a failing write is rolled back alone and its exception is raised in its
+caller. With WAL, readers keep reading the last committed snapshot and never
+wait for the writer.
+
+The queue serialises writers within a process. Writers in different
+processes (the web server and sync_mailboxes, say) wait for each other
+through SQLite's busy_timeout instead.
+"""
+
+import logging
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import Future
+from functools import wraps
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction as db_transaction
+
+from .metrics import WRITE_BATCH_SIZE, WRITE_WAIT_SECONDS
+from .middleware import current_query_recorder
+
+logger = logging.getLogger(__name__)
+
+# Sentinel asking the writer thread to exit
+_STOP = object()
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+class WriteQueue:
+    """
+    Run callables on a dedicated writer thread, committing them in groups.
+
+    ``stats`` counts writes and commits over the life of the object.
+    """
+
+    def __init__(self, max_batch=None, max_delay_ms=None):
+        """
+        Args:
+            max_batch (int): Writes committed together at most
+                (default: WRITE_QUEUE_MAX_BATCH).
+            max_delay_ms (float): Time the writer waits for more writes once
+                one has arrived (default: WRITE_QUEUE_MAX_DELAY_MS).
+        """
+        self.max_batch = max_batch or settings.WRITE_QUEUE_MAX_BATCH
+        if max_delay_ms is None:
+            max_delay_ms = settings.WRITE_QUEUE_MAX_DELAY_MS
+        self.max_delay = max_delay_ms / 1000
+        self.stats = {'writes': 0, 'commits': 0}
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue a write.
+
+        Its queries count towards the metrics of the request submitting it, if any.
+
+        Args:
+            fn (callable): Write to run on the writer thread.
+            *args, **kwargs: Passed to fn.
+
+        Returns:
+            Future: Resolves to the return value of fn once committed.
+        """
+        self._start()
+        future = Future()
+        self._queue.put((future, time.perf_counter(), current_query_recorder(), fn, args, kwargs))
+        return future
+
+    def run(self, fn, *args, **kwargs):
+        """Queue a write and wait for its commit, returning its result or raising its exception."""
+        return self.submit(fn, *args, **kwargs).result()
+
+    def on_writer_thread(self):
+        """Whether the caller is the writer thread."""
+        return threading.current_thread() is self._thread
+
+    def stop(self, timeout=None):
+        """Commit the writes already queued and stop the writer thread."""
+        with self._lock:
+            thread = self._thread
+            if thread is None:
+                return
+            self._queue.put(_STOP)
+            self._thread = None
+        thread.join(timeout)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name='write-queue', daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        try:
+            stopping = False
+            while not stopping:
+                jobs = [self._queue.get()]
+                deadline = time.perf_counter() + self.max_delay
+                while len(jobs) < self.max_batch:
+                    remaining = deadline - time.perf_counter()
+                    try:
+                        jobs.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if _STOP in jobs:
+                    stopping = True
+                    jobs = [job for job in jobs if job is not _STOP]
+                if jobs:
+                    self._commit(jobs)
+        finally:
+            connection.close()
+
+    def _commit(self, jobs):
+        """Run a group of writes in one transaction, each in its own savepoint."""
+        # Drop a connection past CONN_MAX_AGE or broken by an earlier error
+        close_old_connections()
+        outcomes = []
+        try:
+            with db_transaction.atomic():
+                for future, submitted_at, recorder, fn, args, kwargs in jobs:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    recording = connection.execute_wrapper(recorder) if recorder else nullcontext()
+                    try:
+                        with recording, db_transaction.atomic():
+                            outcomes.append((future, submitted_at, fn(*args, **kwargs), None))
+                    except Exception as e:
+                        outcomes.append((future, submitted_at, None, e))
+        except Exception as e:
+            logger.error(f"Group commit of {len(jobs)} writes failed: {str(e)}")
+            for future, _, _, error in outcomes:
+                future.set_exception(error or e)
+            return
+
+        committed_at = time.perf_counter()
+        self.stats['writes'] += len(outcomes)
+        self.stats['commits'] += 1
+        WRITE_BATCH_SIZE.observe(len(outcomes))
+        for future, submitted_at, result, error in outcomes:
+            WRITE_WAIT_SECONDS.observe(committed_at - submitted_at)
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+def get_write_queue():
+    """The process-wide WriteQueue, created on first use."""
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = WriteQueue()
+        return _default_queue
+
+
+def serialized(fn):
+    """
+    Run the decorated write on the writer thread when WRITE_QUEUE_ENABLED.
+
+    Calls made on the writer thread itself, or inside an atomic block the
+    caller must stay part of, run directly.
+    """
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not settings.WRITE_QUEUE_ENABLED or connection.in_atomic_block:
+            return fn(*args, **kwargs)
+        write_queue = get_write_queue()
+        if write_queue.on_writer_thread():
+            return fn(*args, **kwargs)
+        return write_queue.run(fn, *args, **kwargs)
+    return wrapper
@@ -6,6 +6,9 @@ This module loads configuration from environment variables or a .env file.
 
 import os
 from pathlib import Path
+
+import django
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -35,9 +38,12 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'money_tracker_app',
+    'email_tracker',
 ]
 
 MIDDLEWARE = [
+    # First, so the queries of every other middleware count towards the request
+    'money_tracker_app.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,27 +76,50 @@ WSGI_APPLICATION = 'money_tracker_django.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-# Default to SQLite, but can be overridden with DATABASE_URL
+# SQLite only; DATABASE_URL picks the file
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///transactions.db')
-
-# Convert SQLAlchemy URL to Django format
-if DATABASE_URL.startswith('sqlite:///'):
-    db_path = DATABASE_URL.replace('sqlite:///', '')
-    DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': os.path.join(BASE_DIR, db_path),
-        }
-    }
-else:
-    # For other database types, you would need to parse the URL and configure accordingly
-    # This is a simplified example for SQLite only
-    DATABASES = {
-        'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': os.path.join(BASE_DIR, 'transactions.db'),
-        }
+if not DATABASE_URL.startswith('sqlite:///'):
+    raise ImproperlyConfigured(f"Unsupported DATABASE_URL {DATABASE_URL!r}: only sqlite:/// URLs are supported")
+
+# 'production' turns on WAL and the tuned pragmas below, persistent
+# connections and the single-writer queue (core/write_queue.py)
+DATABASE_PROFILE = os.getenv('DATABASE_PROFILE', 'development')
+PRODUCTION_DATABASE = DATABASE_PROFILE == 'production'
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, DATABASE_URL.replace('sqlite:///', '')),
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 600 if PRODUCTION_DATABASE else 0)),  # Seconds
+        'CONN_HEALTH_CHECKS': PRODUCTION_DATABASE,
+        'OPTIONS': {},
     }
+}
+if PRODUCTION_DATABASE and django.VERSION >= (5, 1):
+    # Take the write lock at BEGIN, so a transaction never fails upgrading from read to write
+    DATABASES['default']['OPTIONS']['transaction_mode'] = 'IMMEDIATE'
+
+# Applied to every new SQLite connection by core/database.py
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))  # Wait for locks instead of failing
+SQLITE_PRAGMAS = {'busy_timeout': SQLITE_BUSY_TIMEOUT_MS}
+if PRODUCTION_DATABASE:
+    SQLITE_PRAGMAS.update({
+        # Readers never block the writer, and commits append to the log instead of rewriting pages
+        'journal_mode': 'WAL',
+        # Safe with WAL: a power loss may drop the last commits but never corrupts the file
+        'synchronous': 'NORMAL',
+        'cache_size': -int(os.getenv('SQLITE_CACHE_SIZE_KB', 65536)),  # Negative means KiB, per connection
+        'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 268435456)),  # Bytes of the file read through mmap
+        'temp_store': 'MEMORY',
+    })
+
+# Single writer thread per process running TransactionRepository writes as group commits
+WRITE_QUEUE_ENABLED = os.getenv('WRITE_QUEUE_ENABLED', str(PRODUCTION_DATABASE)).lower() in ('true', '1', 't')
+WRITE_QUEUE_MAX_BATCH = int(os.getenv('WRITE_QUEUE_MAX_BATCH', 64))  # Writes committed together at most
+WRITE_QUEUE_MAX_DELAY_MS = float(os.getenv('WRITE_QUEUE_MAX_DELAY_MS', 2))  # Wait for more writes to group
+
+# Services built at startup rather than on first use, see core/services.py (e.g. 'parse_executor')
+SERVICE_WARMUP = [name.strip() for name in os.getenv('SERVICE_WARMUP', '').split(',') if name.strip()]
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -145,10 +174,92 @@ EMAIL_USERNAME = os.getenv('EMAIL_USERNAME', '')
 EMAIL_PASSWORD = os.getenv('EMAIL_PASSWORD', '')
 EMAIL_USE_SSL = os.getenv('EMAIL_USE_SSL', 'True').lower() in ('true', '1', 't')
 
+# Mailboxes polled by the sync_mailboxes command, one per folder
+EMAIL_SYNC_FOLDERS = os.getenv('EMAIL_SYNC_FOLDERS', 'INBOX').split(',')
+MAILBOXES = [
+    {
+        'host': EMAIL_HOST,
+        'port': EMAIL_PORT,
+        'username': EMAIL_USERNAME,
+        'password': EMAIL_PASSWORD,
+        'use_ssl': EMAIL_USE_SSL,
+        'folder': folder.strip(),
+    }
+    for folder in EMAIL_SYNC_FOLDERS
+] if EMAIL_USERNAME else []
+
 # Bank email filter settings
 BANK_EMAIL_ADDRESSES = os.getenv('BANK_EMAIL_ADDRESSES', 'bankmuscat@bankmuscat.com').split(',')
 BANK_EMAIL_SUBJECTS = os.getenv('BANK_EMAIL_SUBJECTS', 'transaction,alert,notification').split(',')
 
 # Application settings
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
-FETCH_INTERVAL = int(os.getenv('FETCH_INTERVAL', 3600))  # Default: 1 hour
\ No newline at end of file
+FETCH_INTERVAL = int(os.getenv('FETCH_INTERVAL', 3600))  # Default: 1 hour
+FETCH_BATCH_SIZE = int(os.getenv('FETCH_BATCH_SIZE', 100))  # Messages per IMAP FETCH and DB write
+FETCH_CONCURRENCY = int(os.getenv('FETCH_CONCURRENCY', 4))  # Mailboxes synced at once
+FETCH_TIMEOUT = float(os.getenv('FETCH_TIMEOUT', 300))  # Seconds per mailbox sync attempt
+FETCH_SOCKET_TIMEOUT = float(os.getenv('FETCH_SOCKET_TIMEOUT', 60))  # Seconds one IMAP read may block
+FETCH_RETRIES = int(os.getenv('FETCH_RETRIES', 3))
+FETCH_BACKOFF = float(os.getenv('FETCH_BACKOFF', 5))  # Base delay in seconds between retries
+
+# Parallel parsing of large fetch batches
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', os.cpu_count() or 1))
+PARSE_CHUNK_SIZE = int(os.getenv('PARSE_CHUNK_SIZE', 100))  # Emails sent to a worker at a time
+PARSE_MIN_POOL_BATCH = int(os.getenv('PARSE_MIN_POOL_BATCH', 500))  # Smaller batches are parsed in process
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 1000))  # Archive messages parsed and saved together
+IMPORT_UPLOAD_MAX_BYTES = int(os.getenv('IMPORT_UPLOAD_MAX_BYTES', 50 * 1024 * 1024))  # Larger archives: manage.py import_emails
+
+# Parse results cached by email content and parser version
+PARSE_CACHE_ENABLED = os.getenv('PARSE_CACHE_ENABLED', 'True').lower() in ('true', '1', 't')
+PARSE_CACHE_MAX_ENTRIES = int(os.getenv('PARSE_CACHE_MAX_ENTRIES', 100000))
+
+# Keep every fetched or imported message so it can be reparsed without the mail server
+ARCHIVE_RAW_EMAILS = os.getenv('ARCHIVE_RAW_EMAILS', 'True').lower() in ('true', '1', 't')
+REPARSE_BATCH_SIZE = int(os.getenv('REPARSE_BATCH_SIZE', 1000))
+
+# Transaction history pagination
+TRANSACTIONS_PAGE_SIZE = int(os.getenv('TRANSACTIONS_PAGE_SIZE', 50))
+TRANSACTIONS_MAX_PAGE_SIZE = int(os.getenv('TRANSACTIONS_MAX_PAGE_SIZE', 500))
+
+# Full-text search: matches ranked by relevance, newest first beyond this many
+SEARCH_RANK_WINDOW = int(os.getenv('SEARCH_RANK_WINDOW', 2000))
+
+# Bank, branch and counterparty names interned by ingestion, see core/dimensions.py
+DIMENSION_CACHE_SIZE = int(os.getenv('DIMENSION_CACHE_SIZE', 10000))  # Names cached per dimension and process
+
+# Admin changelists of large tables, see core/admin_tools.py
+ADMIN_COUNT_LIMIT = int(os.getenv('ADMIN_COUNT_LIMIT', 10000))  # Filtered rows counted at most
+ADMIN_FILTER_CACHE_SECONDS = int(os.getenv('ADMIN_FILTER_CACHE_SECONDS', 300))  # Filter choice lists kept
+
+# Transaction exports
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))  # Rows read and encoded at a time
+
+# Account summary cache, see core/summary_cache.py. Any Django cache backend
+# works; the local-memory default keeps one cache per process, which is safe
+# because entries are keyed by version counters stored in the database.
+SUMMARY_CACHE_ALIAS = 'summaries'
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    SUMMARY_CACHE_ALIAS: {
+        'BACKEND': os.getenv('SUMMARY_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('SUMMARY_CACHE_LOCATION', 'account-summaries'),
+        'TIMEOUT': int(os.getenv('SUMMARY_CACHE_TTL', 300)),  # Seconds
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('SUMMARY_CACHE_MAX_ENTRIES', 1000)),
+        },
+    },
+}
+
+# Parse batches, reviewed on the results page before saving
+PARSE_BATCH_PAGE_SIZE = int(os.getenv('PARSE_BATCH_PAGE_SIZE', 50))
+PARSE_BATCH_RETENTION_DAYS = int(os.getenv('PARSE_BATCH_RETENTION_DAYS', 7))  # 0 keeps batches forever
+
+# Request metrics, served in Prometheus format at /metrics. With a token set, scrapers must send
+# "Authorization: Bearer <token>"; without one, only REMOTE_ADDR is checked, and behind a reverse
+# proxy every client has the proxy's address, so the proxy must then block /metrics itself
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')  # Used when no token is set
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 0))  # Log slower requests with their top SQL; 0 disables
+SLOW_REQUEST_TOP_SQL = int(os.getenv('SLOW_REQUEST_TOP_SQL', 5))
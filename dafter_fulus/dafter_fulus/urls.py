@@ -10,6 +10,7 @@ from django.conf.urls.static import static
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('money_tracker_app.urls')),
+    path('mail/', include('email_tracker.urls')),
 ]
 
 # Serve media files in development
@@ -1,3 +1,27 @@
+"""
+Admin configuration for the email tracker app.
+"""
+
 from django.contrib import admin
 
-# Register your models here.
+from money_tracker_app.admin_tools import CachedValuesFieldListFilter, LargeTableAdmin
+
+from .models import MailboxSyncState, RawEmail
+
+@admin.register(MailboxSyncState)
+class MailboxSyncStateAdmin(admin.ModelAdmin):
+    """Admin configuration for the MailboxSyncState model."""
+    list_display = ('username', 'host', 'folder', 'uidvalidity', 'last_uid', 'messages_fetched', 'bytes_received', 'last_synced_at')
+    search_fields = ('username', 'host', 'folder')
+    readonly_fields = ('created_at', 'updated_at')
+
+@admin.register(RawEmail)
+class RawEmailAdmin(LargeTableAdmin):
+    """Admin configuration for the RawEmail model."""
+    list_display = ('message_id', 'sender', 'subject', 'sent_at', 'source', 'size', 'parse_status', 'transaction')
+    list_select_related = ('transaction',)
+    search_fields = ('message_id', 'sender', 'subject')
+    list_filter = ('parse_status', ('source', CachedValuesFieldListFilter))
+    exclude = ('raw',)
+    readonly_fields = ('content_hash', 'parser_version', 'parse_error', 'parsed_at', 'created_at')
+    raw_id_fields = ('transaction',)
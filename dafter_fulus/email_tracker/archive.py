@@ -0,0 +1,260 @@
+"""
+Streaming import of mail archives: mbox files, zip files of .eml messages
+and single .eml files.
+
+Messages are read one at a time and fed line by line (or chunk by chunk)
+into an incremental MIME parser, so memory use depends on the batch size and
+the largest single message, never on the size of the archive.
+"""
+
+import logging
+import re
+import time
+import zipfile
+from email import policy
+from email.parser import BytesFeedParser
+
+from django.conf import settings
+
+from money_tracker_app.ingest import ingest_emails
+from money_tracker_app.parse_cache import get_parse_cache
+
+from .imap import email_data_from_message, message_to_email_data
+from .models import RawEmailRepository
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMATS = ('mbox', 'zip', 'eml')
+
+# Body lines quoted by mboxrd writers, e.g. ">From " or ">>From "
+QUOTED_FROM_RE = re.compile(rb'^>+From ')
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def detect_format(name, fileobj):
+    """
+    Guess the archive format from the file name, then from its first bytes.
+
+    Args:
+        name (str): File name.
+        fileobj: Seekable binary file.
+
+    Returns:
+        str: 'mbox', 'zip' or 'eml'.
+    """
+    lower = (name or '').lower()
+    if lower.endswith('.zip'):
+        return 'zip'
+    if lower.endswith(('.mbox', '.mbx')):
+        return 'mbox'
+    if lower.endswith('.eml'):
+        return 'eml'
+
+    head = fileobj.read(5)
+    fileobj.seek(0)
+    if head.startswith(b'PK\x03\x04'):
+        return 'zip'
+    if head == b'From ':
+        return 'mbox'
+    return 'eml'
+
+
+def _new_parser():
+    return BytesFeedParser(policy=policy.default)
+
+
+def iter_mbox(fileobj):
+    """
+    Yield the messages of an mbox file, one at a time.
+
+    Args:
+        fileobj: Binary file positioned at the start of the mbox.
+
+    Yields:
+        email.message.EmailMessage: Parsed messages.
+    """
+    feed = None
+    for line in fileobj:
+        if line.startswith(b'From '):
+            if feed is not None:
+                yield feed.close()
+            feed = _new_parser()
+            continue
+        if feed is None:
+            continue
+        if QUOTED_FROM_RE.match(line):
+            line = line[1:]
+        feed.feed(line)
+    if feed is not None:
+        yield feed.close()
+
+
+def _parse_stream(stream):
+    """Feed a binary stream into a MIME parser in fixed-size chunks."""
+    feed = _new_parser()
+    for chunk in iter(lambda: stream.read(READ_CHUNK_SIZE), b''):
+        feed.feed(chunk)
+    return feed.close()
+
+
+def iter_zip(fileobj):
+    """
+    Yield the .eml messages of a zip archive, one at a time.
+
+    Members are decompressed as streams; only the zip directory is read up front.
+
+    Args:
+        fileobj: Seekable binary file containing the zip archive.
+
+    Yields:
+        email.message.EmailMessage: Parsed messages.
+    """
+    with zipfile.ZipFile(fileobj) as archive:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith('.eml'):
+                continue
+            with archive.open(info) as member:
+                yield _parse_stream(member)
+
+
+def iter_messages(fileobj, archive_format):
+    """
+    Yield the messages of an archive.
+
+    Args:
+        fileobj: Binary file.
+        archive_format (str): 'mbox', 'zip' or 'eml'.
+
+    Yields:
+        email.message.EmailMessage: Parsed messages.
+    """
+    if archive_format == 'mbox':
+        yield from iter_mbox(fileobj)
+    elif archive_format == 'zip':
+        yield from iter_zip(fileobj)
+    elif archive_format == 'eml':
+        yield _parse_stream(fileobj)
+    else:
+        raise ValueError(f"Unknown archive format: {archive_format}")
+
+
+def import_archive(fileobj, parse_executor, name='', archive_format=None, batch_size=None, save=True,
+                   progress=None):
+    """
+    Parse every message of an archive and persist the transactions in batches.
+
+    Each message is also stored as a RawEmail (when ARCHIVE_RAW_EMAILS is on)
+    so it can be reparsed later. Without ``save`` nothing is written: no
+    transactions, raw emails or parse cache entries.
+
+    Args:
+        fileobj: Binary file (a path opened in 'rb' mode or an UploadedFile).
+        parse_executor (ParseExecutor): Executor used to parse each batch.
+        name (str): File name, used to detect the format and to label messages
+            without a Message-ID.
+        archive_format (str): 'mbox', 'zip' or 'eml'; detected when omitted.
+        batch_size (int): Messages parsed and saved together (default: IMPORT_BATCH_SIZE).
+        save (bool): Save the transactions, raw emails and parse cache entries;
+            False parses without writing anything.
+        progress (callable): Called with the running statistics after each batch.
+
+    Returns:
+        dict: Counts of messages, parsed, created, duplicate, errored and
+        parse-cache-hit messages, plus elapsed seconds and messages per second.
+    """
+    archive_format = archive_format or detect_format(name, fileobj)
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    stats = {
+        'format': archive_format, 'messages': 0, 'parsed': 0, 'created': 0, 'duplicates': 0,
+        'errors': 0, 'hits': 0, 'seconds': 0.0, 'rate': 0.0
+    }
+    start = time.perf_counter()
+
+    def flush(batch):
+        emails = [email_data for _, email_data in batch]
+        raw_emails = []
+        if save and settings.ARCHIVE_RAW_EMAILS:
+            raw_emails = RawEmailRepository.store_messages(batch, 'archive')
+        # Even a lookup writes to the parse cache (it marks entries used), so a dry run skips it
+        batch_stats = ingest_emails(emails, parse_executor, cache=get_parse_cache() if save else None, save=save)
+        RawEmailRepository.record_parse_results(
+            raw_emails, batch_stats['results'], getattr(parse_executor, 'version', None)
+        )
+        for field in ('messages', 'parsed', 'created', 'duplicates', 'errors', 'hits'):
+            stats[field] += batch_stats[field]
+
+        stats['seconds'] = time.perf_counter() - start
+        stats['rate'] = stats['messages'] / stats['seconds'] if stats['seconds'] else 0.0
+        if progress:
+            progress(stats)
+
+    batch = []
+    for index, message in enumerate(iter_messages(fileobj, archive_format)):
+        email_data = email_data_from_message(message)
+        if not email_data['id']:
+            email_data['id'] = f"{name or archive_format}:{index}"
+        try:
+            raw_message = message.as_bytes()
+        except Exception as e:
+            logger.error(f"Cannot serialise {email_data['id']} for storage: {str(e)}")
+            raw_message = None
+        batch.append((raw_message, email_data))
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch or not stats['messages']:
+        flush(batch)
+
+    logger.info(f"Imported {name or archive_format}: {stats}")
+    return stats
+
+
+def reparse_raw_emails(raw_emails, parse_executor, batch_size=None, save=True, progress=None):
+    """
+    Parse stored emails again and upsert their transactions, in batches.
+
+    Args:
+        raw_emails (QuerySet): RawEmail rows to reparse.
+        parse_executor (ParseExecutor): Executor used to parse each batch.
+        batch_size (int): Emails parsed and saved together (default: REPARSE_BATCH_SIZE).
+        save (bool): Save the results; False parses without writing anything.
+        progress (callable): Called with the running totals after each batch.
+
+    Returns:
+        dict: Counts of messages, parsed, created, updated, duplicate and errored emails.
+    """
+    batch_size = batch_size or settings.REPARSE_BATCH_SIZE
+    version = getattr(parse_executor, 'version', None)
+    totals = {'messages': 0, 'parsed': 0, 'created': 0, 'updated': 0, 'duplicates': 0, 'errors': 0}
+    last_pk = 0
+    while True:
+        # Keyset over the primary key, so batches stay cheap however many rows are selected
+        batch = list(raw_emails.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        emails = []
+        for raw_email in batch:
+            email_data = message_to_email_data(raw_email.raw_message, raw_email.uid)
+            if raw_email.email_id:
+                # Archived messages without a Message-ID were named after their archive position
+                email_data['id'] = raw_email.email_id
+            emails.append(email_data)
+        stats = ingest_emails(
+            emails,
+            parse_executor,
+            save=save,
+            upsert=True,
+            existing_ids=[raw_email.transaction_id for raw_email in batch]
+        )
+        if save:
+            RawEmailRepository.record_parse_results(batch, stats['results'], version)
+
+        for field in totals:
+            totals[field] += stats[field]
+        if progress:
+            progress(totals)
+
+    return totals
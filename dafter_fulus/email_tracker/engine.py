@@ -0,0 +1,171 @@
+"""
+Asyncio engine that syncs many mailboxes concurrently.
+
+Each (host, username, folder) target runs as its own task. Blocking IMAP
+calls run on a worker thread of their own per target, since imaplib
+connections are not thread-safe, while parsing and persistence run through
+sync_to_async on Django's single thread-sensitive executor, so database
+writes stay serialised. The next batch is downloaded while the current one
+is being ingested.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from .sync import MailboxSync, mailbox_label
+
+logger = logging.getLogger(__name__)
+
+_background_lock = threading.Lock()
+_background_sync = None
+
+
+async def sync_target(mailbox, parser, batch_size=None, connection_factory=None, timeout=None):
+    """
+    Sync one mailbox folder, ingesting each batch as soon as it arrives.
+
+    If the task is cancelled, e.g. by a timeout, or fails, the socket is shut
+    down so a blocked download returns, and the connection is dropped without
+    LOGOUT once the network thread is done with it.
+
+    Args:
+        mailbox (dict): Mailbox settings.
+        parser: Object with a ``parse_email(email_data)`` method.
+        batch_size (int): Messages per FETCH and per database write.
+        connection_factory (callable): Passed to MailboxClient.
+        timeout (float): Socket timeout for the IMAP connection (default: FETCH_SOCKET_TIMEOUT).
+
+    Returns:
+        dict: Sync statistics, as returned by sync_mailbox.
+    """
+    sync = MailboxSync(
+        mailbox, parser, batch_size=batch_size, connection_factory=connection_factory,
+        timeout=timeout or settings.FETCH_SOCKET_TIMEOUT
+    )
+    await sync_to_async(sync.load_state)()
+    # Every call on the connection runs on this one thread, in submission order
+    network = ThreadPoolExecutor(max_workers=1, thread_name_prefix='imap')
+
+    def run(fn, *args):
+        return asyncio.wrap_future(network.submit(fn, *args))
+
+    error = None
+    next_fetch = None
+    try:
+        batches = await run(sync.open)
+        for index, batch in enumerate(batches):
+            messages = await (next_fetch or run(sync.fetch_batch, batch))
+            next_fetch = None
+            if index + 1 < len(batches):
+                next_fetch = run(sync.fetch_batch, batches[index + 1])
+            await sync_to_async(sync.ingest_batch)(batch, messages)
+        return sync.stats
+    except BaseException as e:
+        error = e
+        if next_fetch is not None:
+            next_fetch.cancel()
+        sync.abort()
+        raise
+    finally:
+        # Queued behind any download still in flight, so the connection is never used by two threads
+        await asyncio.shield(run(sync.close, error is None))
+        network.shutdown(wait=False)
+        await sync_to_async(sync.save_state)(error)
+
+
+async def sync_all(mailboxes, parser, concurrency=None, timeout=None, retries=None, backoff=None,
+                   batch_size=None, connection_factory=None, socket_timeout=None):
+    """
+    Sync many mailboxes concurrently with timeouts and retries.
+
+    At most ``concurrency`` targets are connected at once. A target that fails
+    or runs longer than ``timeout`` seconds is retried up to ``retries`` times,
+    waiting ``backoff * 2 ** attempt`` seconds (plus jitter) in between; a retry
+    resumes from the watermark saved by the failed attempt.
+
+    Args:
+        mailboxes (list): Mailbox settings dicts.
+        parser: Object with a ``parse_email(email_data)`` method.
+        concurrency (int): Maximum targets synced at once (default: FETCH_CONCURRENCY).
+        timeout (float): Seconds allowed per attempt (default: FETCH_TIMEOUT).
+        retries (int): Retries per target (default: FETCH_RETRIES).
+        backoff (float): Base backoff in seconds (default: FETCH_BACKOFF).
+        batch_size (int): Messages per FETCH and per database write.
+        connection_factory (callable): Passed to MailboxClient.
+        socket_timeout (float): Seconds one IMAP read may block (default: FETCH_SOCKET_TIMEOUT).
+
+    Returns:
+        dict: Mailbox label to sync statistics, or to ``{'error': message}``.
+    """
+    concurrency = concurrency or settings.FETCH_CONCURRENCY
+    timeout = timeout or settings.FETCH_TIMEOUT
+    retries = settings.FETCH_RETRIES if retries is None else retries
+    backoff = settings.FETCH_BACKOFF if backoff is None else backoff
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(mailbox):
+        label = mailbox_label(mailbox)
+        for attempt in range(retries + 1):
+            try:
+                async with semaphore:
+                    return await asyncio.wait_for(
+                        sync_target(mailbox, parser, batch_size, connection_factory, socket_timeout),
+                        timeout
+                    )
+            except Exception as e:
+                message = str(e) or e.__class__.__name__
+                if attempt == retries:
+                    logger.error(f"Giving up on {label} after {attempt + 1} attempts: {message}")
+                    return {'error': message}
+                delay = backoff * 2 ** attempt * (1 + random.random() / 2)
+                logger.warning(f"Sync of {label} failed ({message}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    labels = [mailbox_label(mailbox) for mailbox in mailboxes]
+    results = await asyncio.gather(*(run(mailbox) for mailbox in mailboxes))
+    return dict(zip(labels, results))
+
+
+def start_background_sync(mailboxes, parser, **kwargs):
+    """
+    Run sync_all on a background thread of this process, unless one is still running.
+
+    Outcomes are logged and recorded on each MailboxSyncState, as for the
+    sync_mailboxes command.
+
+    Args:
+        mailboxes (list): Mailbox settings dicts.
+        parser: Object with a ``parse_email(email_data)`` method.
+        **kwargs: Passed to sync_all.
+
+    Returns:
+        bool: Whether a sync was started.
+    """
+    global _background_sync
+    with _background_lock:
+        if _background_sync is not None and _background_sync.is_alive():
+            return False
+        _background_sync = threading.Thread(
+            target=_run_background_sync, args=(mailboxes, parser), kwargs=kwargs, name='mailbox-sync', daemon=True
+        )
+        _background_sync.start()
+        return True
+
+
+def _run_background_sync(mailboxes, parser, **kwargs):
+    try:
+        results = asyncio.run(sync_all(mailboxes, parser, **kwargs))
+        for label, stats in results.items():
+            if 'error' not in stats:
+                logger.info(f"Background sync of {label}: created {stats['created']} from {stats['fetched']} emails")
+    except Exception as e:
+        logger.error(f"Error in background mailbox sync: {str(e)}")
+    finally:
+        connections.close_all()
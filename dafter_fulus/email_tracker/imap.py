@@ -0,0 +1,344 @@
+"""
+UID-based IMAP client used for incremental mailbox syncing.
+"""
+
+import email
+import functools
+import imaplib
+import logging
+import re
+import socket
+from email import policy
+from email.parser import BytesHeaderParser
+from email.utils import parseaddr
+
+logger = logging.getLogger(__name__)
+
+FETCH_UID_RE = re.compile(rb'UID (\d+)')
+
+# Only the headers needed to decide whether a message is a bank alert
+HEADER_FIELDS = 'FROM SUBJECT DATE MESSAGE-ID'
+
+
+def uid_set(uids):
+    """
+    Compress UIDs into an IMAP sequence set such as ``1:5,7,9:12``.
+
+    Args:
+        uids (iterable): UIDs.
+
+    Returns:
+        str: IMAP sequence set.
+    """
+    ranges = []
+    for uid in sorted(set(uids)):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ','.join(str(low) if low == high else f'{low}:{high}' for low, high in ranges)
+
+
+def quote(value):
+    """Quote a string for use in an IMAP command."""
+    return '"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def any_of(key, values):
+    """
+    Build an IMAP search key matching any of the values, e.g. ``OR FROM a FROM b``.
+
+    Args:
+        key (str): Search key such as FROM or SUBJECT.
+        values (list): Values to match.
+
+    Returns:
+        str: Search criteria, or '' when there are no values.
+    """
+    terms = [f'{key} {quote(value)}' for value in values]
+    if not terms:
+        return ''
+    criteria = terms[-1]
+    for term in reversed(terms[:-1]):
+        criteria = f'OR {term} {criteria}'
+    return criteria
+
+
+def message_to_email_data(raw_message, uid=None, folder=None):
+    """
+    Convert a raw RFC 822 message into the dict TransactionParser expects.
+
+    Args:
+        raw_message (bytes): Raw message.
+        uid (int): IMAP UID of the message, if known.
+        folder (str): Folder the message came from, if known.
+
+    Returns:
+        dict: Email data with id, subject, from, date and body.
+    """
+    return email_data_from_message(email.message_from_bytes(raw_message, policy=policy.default), uid, folder)
+
+
+def email_data_from_message(message, uid=None, folder=None):
+    """
+    Convert a parsed message into the dict TransactionParser expects.
+
+    Args:
+        message (email.message.EmailMessage): Message parsed with policy.default.
+        uid (int): IMAP UID of the message, if known.
+        folder (str): Folder the message came from, if known.
+
+    Returns:
+        dict: Email data with id, subject, from, date and body.
+    """
+    body = ''
+    part = message.get_body(preferencelist=('plain', 'html'))
+    if part is not None:
+        try:
+            body = part.get_content()
+        except (LookupError, UnicodeDecodeError):
+            body = part.get_payload(decode=True).decode('utf-8', errors='replace')
+
+    return {
+        'id': str(uid) if uid is not None else (message.get('Message-ID') or ''),
+        'uid': uid,
+        'folder': folder,
+        'message_id': message.get('Message-ID'),
+        'subject': str(message.get('Subject', '')),
+        'from': str(message.get('From', '')),
+        'date': str(message.get('Date', '')),
+        'body': body
+    }
+
+
+class MailboxClient:
+    """
+    Thin wrapper around imaplib that talks in UIDs.
+
+    Sender and subject filters are pushed into the server-side SEARCH, then
+    checked exactly against headers fetched on their own, so full messages are
+    only downloaded for bank alerts. ``stats`` counts round trips and bytes
+    received for every command sent.
+    """
+
+    def __init__(self, host, port=993, username='', password='', use_ssl=True,
+                 bank_email_addresses=None, bank_email_subjects=None, connection_factory=None, timeout=None):
+        """
+        Args:
+            host (str): IMAP host.
+            port (int): IMAP port.
+            username (str): Login name.
+            password (str): Login password.
+            use_ssl (bool): Use IMAP over SSL.
+            bank_email_addresses (list): Only keep mail from these senders.
+            bank_email_subjects (list): Only keep mail whose subject contains one of these.
+            connection_factory (callable): Returns an imaplib-compatible
+                connection for (host, port); used to substitute the server.
+            timeout (float): Socket timeout in seconds for the default connection.
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.bank_email_addresses = [a.strip().lower() for a in bank_email_addresses or [] if a.strip()]
+        self.bank_email_subjects = [s.strip().lower() for s in bank_email_subjects or [] if s.strip()]
+        if connection_factory is None:
+            imap_class = imaplib.IMAP4_SSL if use_ssl else imaplib.IMAP4
+            connection_factory = functools.partial(imap_class, timeout=timeout)
+        self.connection_factory = connection_factory
+        self.connection = None
+        self.folder = None
+        self.stats = {'round_trips': 0, 'bytes_received': 0}
+
+    def _command(self, name, *args, **kwargs):
+        """Run a connection method and count its round trip and response size."""
+        typ, data = getattr(self.connection, name)(*args, **kwargs)
+        self.stats['round_trips'] += 1
+        for item in data or []:
+            parts = item if isinstance(item, tuple) else (item,)
+            self.stats['bytes_received'] += sum(len(part) for part in parts if isinstance(part, bytes))
+        return typ, data
+
+    def connect(self):
+        """Open the connection and log in."""
+        self.connection = self.connection_factory(self.host, self.port)
+        self._command('login', self.username, self.password)
+        logger.info(f"Connected to {self.host} as {self.username}")
+
+    def disconnect(self, logout=True):
+        """
+        Log out, ignoring errors from an already broken connection.
+
+        Args:
+            logout (bool): Send LOGOUT; when False the socket is closed without
+                a word to the server, for a connection left mid-command.
+        """
+        if self.connection is None:
+            return
+        try:
+            if logout:
+                self._command('logout')
+            else:
+                self.connection.shutdown()
+        except Exception as e:
+            logger.error(f"Error disconnecting from {self.host}: {str(e)}")
+        self.connection = None
+
+    def abort(self):
+        """
+        Shut the socket down so a command blocked on it fails at once.
+
+        Safe to call from another thread than the one running commands: only
+        the socket is touched, and that thread should then disconnect with
+        ``logout=False``.
+        """
+        sock = getattr(self.connection, 'sock', None)
+        if sock is None:
+            return
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def select(self, folder):
+        """
+        Select a folder read-only.
+
+        Args:
+            folder (str): Folder name.
+
+        Returns:
+            int: The folder's UIDVALIDITY.
+        """
+        typ, data = self._command('select', f'"{folder}"', readonly=True)
+        if typ != 'OK':
+            raise imaplib.IMAP4.error(f"Cannot select folder {folder}: {data}")
+        self.folder = folder
+        _, values = self.connection.response('UIDVALIDITY')
+        return int(values[0]) if values and values[0] else 0
+
+    def search_criteria(self, last_uid=0, unread_only=False):
+        """
+        Build the UID SEARCH criteria for new bank emails.
+
+        Non-ASCII filter values cannot be sent without a CHARSET and are only
+        applied by the header check.
+
+        Args:
+            last_uid (int): Highest UID already processed.
+            unread_only (bool): Only match unseen messages.
+
+        Returns:
+            str: Search criteria.
+        """
+        criteria = [f'UID {last_uid + 1}:*']
+        if unread_only:
+            criteria.append('UNSEEN')
+        addresses = [a for a in self.bank_email_addresses if a.isascii()]
+        if addresses and len(addresses) == len(self.bank_email_addresses):
+            criteria.append(any_of('FROM', addresses))
+        subjects = [s for s in self.bank_email_subjects if s.isascii()]
+        if subjects and len(subjects) == len(self.bank_email_subjects):
+            criteria.append(any_of('SUBJECT', subjects))
+        return ' '.join(criteria)
+
+    def search_uids(self, last_uid=0, unread_only=False):
+        """
+        List the UIDs of candidate bank emails above a watermark.
+
+        Args:
+            last_uid (int): Highest UID already processed.
+            unread_only (bool): Only match unseen messages.
+
+        Returns:
+            list: Ascending UIDs greater than last_uid.
+        """
+        typ, data = self._command('uid', 'SEARCH', None, self.search_criteria(last_uid, unread_only))
+        if typ != 'OK':
+            raise imaplib.IMAP4.error(f"UID SEARCH failed: {data}")
+        # "n:*" always matches the highest UID, even when it is below n
+        uids = (int(uid) for uid in (data[0] or b'').split())
+        return sorted(uid for uid in uids if uid > last_uid)
+
+    def _fetch_items(self, uids, items):
+        """Run one UID FETCH for all UIDs and return (uid, payload) pairs."""
+        if not uids:
+            return []
+        typ, data = self._command('uid', 'FETCH', uid_set(uids), items)
+        if typ != 'OK':
+            raise imaplib.IMAP4.error(f"UID FETCH failed: {data}")
+
+        messages = []
+        for item in data:
+            if not isinstance(item, tuple):
+                continue
+            match = FETCH_UID_RE.search(item[0])
+            if match:
+                messages.append((int(match.group(1)), item[1]))
+        return sorted(messages)
+
+    def fetch_headers(self, uids):
+        """
+        Fetch only the filtering headers for a list of UIDs in one command.
+
+        Args:
+            uids (list): UIDs to fetch.
+
+        Returns:
+            list: (uid, email.message.Message of headers) pairs in ascending UID order.
+        """
+        parser = BytesHeaderParser(policy=policy.default)
+        return [
+            (uid, parser.parsebytes(headers))
+            for uid, headers in self._fetch_items(uids, f'(UID BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})])')
+        ]
+
+    def is_bank_email(self, headers):
+        """
+        Check headers against the sender and subject filters.
+
+        Args:
+            headers (email.message.Message): Message headers.
+
+        Returns:
+            bool: True if the message passes both filters.
+        """
+        if self.bank_email_addresses:
+            sender = parseaddr(str(headers.get('From', '')))[1].lower()
+            if sender not in self.bank_email_addresses:
+                return False
+        if self.bank_email_subjects:
+            subject = str(headers.get('Subject', '')).lower()
+            if not any(keyword in subject for keyword in self.bank_email_subjects):
+                return False
+        return True
+
+    def fetch(self, uids):
+        """
+        Fetch full messages for a list of UIDs in one command.
+
+        Args:
+            uids (list): UIDs to fetch.
+
+        Returns:
+            list: (uid, raw message bytes) pairs in ascending UID order.
+        """
+        return self._fetch_items(uids, '(UID BODY.PEEK[])')
+
+    def fetch_bank_emails(self, uids):
+        """
+        Fetch headers for a batch of UIDs, then full bodies of the matching ones.
+
+        Takes at most two round trips per batch.
+
+        Args:
+            uids (list): UIDs to consider.
+
+        Returns:
+            list: (uid, raw message bytes) pairs for messages passing the filters.
+        """
+        if not self.bank_email_addresses and not self.bank_email_subjects:
+            return self.fetch(uids)
+        matching = [uid for uid, headers in self.fetch_headers(uids) if self.is_bank_email(headers)]
+        return self.fetch(matching)
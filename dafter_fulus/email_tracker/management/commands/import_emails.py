@@ -0,0 +1,63 @@
+"""
+Management command that bulk imports mbox files and zip archives of .eml files.
+"""
+
+import zipfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from money_tracker_app.parsing import ParseExecutor
+
+from ...archive import ARCHIVE_FORMATS, import_archive
+
+
+class Command(BaseCommand):
+    """Stream every message of one or more archives through the parser into the database."""
+    help = 'Import bank emails from mbox files, zip archives of .eml files or single .eml files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Archive files to import.')
+        parser.add_argument(
+            '--format',
+            choices=ARCHIVE_FORMATS,
+            help='Archive format (default: detected from the file name and contents).'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.IMPORT_BATCH_SIZE,
+            help='Messages parsed and saved together (default: IMPORT_BATCH_SIZE).'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Parse without writing anything to the database.')
+
+    def handle(self, *args, **options):
+        def progress(stats):
+            if options['verbosity'] > 0:
+                self.stdout.write(
+                    f"  {stats['messages']} messages, {stats['parsed']} parsed, "
+                    f"{stats['created']} created, {stats['rate']:.0f} messages/s"
+                )
+
+        with ParseExecutor() as parse_executor:
+            for path in options['paths']:
+                try:
+                    with open(path, 'rb') as fileobj:
+                        stats = import_archive(
+                            fileobj,
+                            parse_executor,
+                            name=path,
+                            archive_format=options['format'],
+                            batch_size=options['batch_size'],
+                            save=not options['dry_run'],
+                            progress=progress
+                        )
+                except (OSError, ValueError, zipfile.BadZipFile) as e:
+                    raise CommandError(f"Cannot import {path}: {str(e)}")
+
+                self.stdout.write(self.style.SUCCESS(
+                    f"{path} ({stats['format']}): {stats['messages']} messages, {stats['parsed']} parsed "
+                    f"({stats['hits']} cached), "
+                    f"{stats['created']} created, {stats['duplicates']} duplicates, {stats['errors']} errors "
+                    f"in {stats['seconds']:.1f}s ({stats['rate']:.0f} messages/s)"
+                ))
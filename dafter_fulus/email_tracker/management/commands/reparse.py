@@ -0,0 +1,89 @@
+"""
+Management command that re-runs the current parser over stored raw emails.
+"""
+
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from money_tracker_app.parsing import ParseExecutor
+
+from ...archive import reparse_raw_emails
+from ...models import ParseStatus, RawEmail
+
+
+def _date(value):
+    try:
+        return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    """Parse stored emails again, in parallel batches, and upsert their transactions."""
+    help = 'Reparse stored raw emails with the current parser, without contacting the mail server.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--status',
+            nargs='+',
+            choices=ParseStatus.values,
+            default=[ParseStatus.PENDING, ParseStatus.UNPARSED, ParseStatus.FAILED],
+            help='Parse statuses to select (default: pending, unparsed and failed).'
+        )
+        parser.add_argument('--all', action='store_true', help='Select every stored email, whatever its status.')
+        parser.add_argument(
+            '--stale',
+            action='store_true',
+            help='Only select emails last parsed by a different parser version.'
+        )
+        parser.add_argument('--since', type=_date, help='Only emails sent on or after this date (YYYY-MM-DD).')
+        parser.add_argument('--until', type=_date, help='Only emails sent before this date (YYYY-MM-DD).')
+        parser.add_argument('--sender', help='Only emails whose sender contains this text.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.REPARSE_BATCH_SIZE,
+            help='Emails parsed and saved together (default: REPARSE_BATCH_SIZE).'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Parse without saving anything.')
+
+    def handle(self, *args, **options):
+        with ParseExecutor() as parse_executor:
+            version = parse_executor.version
+            raw_emails = RawEmail.objects.all()
+            if not options['all']:
+                raw_emails = raw_emails.filter(parse_status__in=options['status'])
+            if options['stale']:
+                raw_emails = raw_emails.filter(~Q(parser_version=version) | Q(parser_version__isnull=True))
+            if options['since']:
+                raw_emails = raw_emails.filter(sent_at__gte=options['since'])
+            if options['until']:
+                raw_emails = raw_emails.filter(sent_at__lt=options['until'])
+            if options['sender']:
+                raw_emails = raw_emails.filter(sender__icontains=options['sender'])
+
+            start = time.perf_counter()
+
+            def progress(totals):
+                elapsed = time.perf_counter() - start
+                if options['verbosity'] > 0:
+                    self.stdout.write(
+                        f"  {totals['messages']} emails, {totals['parsed']} parsed, "
+                        f"{totals['messages'] / elapsed if elapsed else 0:.0f} emails/s"
+                    )
+
+            totals = reparse_raw_emails(
+                raw_emails, parse_executor, options['batch_size'], save=not options['dry_run'], progress=progress
+            )
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Reparsed {totals['messages']} emails in {elapsed:.1f}s: {totals['parsed']} parsed, "
+            f"{totals['created']} created, {totals['updated']} updated, {totals['duplicates']} duplicates, "
+            f"{totals['errors']} errors"
+        ))
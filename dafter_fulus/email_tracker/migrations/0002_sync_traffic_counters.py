@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('email_tracker', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mailboxsyncstate',
+            name='bytes_received',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mailboxsyncstate',
+            name='round_trips',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('email_tracker', '0002_sync_traffic_counters'),
+        ('money_tracker_app', '0004_parse_cache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RawEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('raw', models.BinaryField()),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('source', models.CharField(max_length=20)),
+                ('mailbox', models.CharField(blank=True, max_length=255, null=True)),
+                ('uid', models.BigIntegerField(blank=True, null=True)),
+                ('sender', models.CharField(blank=True, max_length=255, null=True)),
+                ('subject', models.CharField(blank=True, max_length=500, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('parse_status', models.CharField(choices=[('pending', 'Pending'), ('parsed', 'Parsed'), ('unparsed', 'No transaction found'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('parser_version', models.CharField(blank=True, max_length=64, null=True)),
+                ('parse_error', models.TextField(blank=True, null=True)),
+                ('parsed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='raw_emails', to='money_tracker_app.transaction')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['parse_status', 'sent_at'], name='raw_email_status_sent_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('message_id__isnull', False)), fields=('message_id',), name='unique_raw_email_message_id')],
+            },
+        ),
+    ]
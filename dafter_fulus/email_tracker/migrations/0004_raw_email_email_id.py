@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('email_tracker', '0003_raw_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawemail',
+            name='email_id',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -1,3 +1,228 @@
+"""
+Database models for the email tracker app.
+"""
+
+import datetime
+import hashlib
+import logging
+import zlib
+from email.utils import parsedate_to_datetime
+
 from django.db import models
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+class MailboxSyncState(models.Model):
+    """Incremental IMAP sync watermark for one mailbox folder."""
+    host = models.CharField(max_length=255)
+    username = models.CharField(max_length=255)
+    folder = models.CharField(max_length=255, default='INBOX')
+
+    # A new UIDVALIDITY means the server renumbered the folder, so last_uid is reset
+    uidvalidity = models.BigIntegerField(blank=True, null=True)
+    last_uid = models.BigIntegerField(default=0)
+
+    # Cumulative traffic counters, to measure what server-side filtering saves
+    messages_fetched = models.BigIntegerField(default=0)
+    round_trips = models.BigIntegerField(default=0)
+    bytes_received = models.BigIntegerField(default=0)
+    last_synced_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['host', 'username', 'folder'], name='unique_sync_state_per_mailbox')
+        ]
+
+    def __str__(self):
+        return f"{self.username}@{self.host}/{self.folder} (UID {self.last_uid})"
+
+
+class ParseStatus(models.TextChoices):
+    """Enum for the outcome of the last parse of a stored email."""
+    PENDING = 'pending', 'Pending'
+    PARSED = 'parsed', 'Parsed'
+    UNPARSED = 'unparsed', 'No transaction found'
+    FAILED = 'failed', 'Failed'
+
+
+class RawEmail(models.Model):
+    """A fetched message stored once, compressed, so it can be parsed again without the mail server."""
+    message_id = models.CharField(max_length=255, blank=True, null=True)
+    # Identifier the message was first parsed under, reused on reparse so dedupe keys stay the same
+    email_id = models.CharField(max_length=255, blank=True, null=True)
+    content_hash = models.CharField(max_length=64, unique=True)
+    raw = models.BinaryField()  # zlib-compressed RFC 822 bytes
+    size = models.PositiveIntegerField(default=0)
+
+    source = models.CharField(max_length=20)  # imap, upload or archive
+    mailbox = models.CharField(max_length=255, blank=True, null=True)
+    uid = models.BigIntegerField(blank=True, null=True)
+    sender = models.CharField(max_length=255, blank=True, null=True)
+    subject = models.CharField(max_length=500, blank=True, null=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    parse_status = models.CharField(max_length=10, choices=ParseStatus.choices, default=ParseStatus.PENDING)
+    parser_version = models.CharField(max_length=64, blank=True, null=True)
+    parse_error = models.TextField(blank=True, null=True)
+    parsed_at = models.DateTimeField(blank=True, null=True)
+    transaction = models.ForeignKey(
+        'money_tracker_app.Transaction', on_delete=models.SET_NULL, related_name='raw_emails', blank=True, null=True
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Selecting messages to reparse
+            models.Index(fields=['parse_status', 'sent_at'], name='raw_email_status_sent_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['message_id'],
+                condition=models.Q(message_id__isnull=False),
+                name='unique_raw_email_message_id'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.message_id or self.content_hash[:12]} ({self.parse_status})"
+
+    @staticmethod
+    def compress(raw_message):
+        """Compress raw message bytes for storage."""
+        return zlib.compress(raw_message, 6)
+
+    @property
+    def raw_message(self):
+        """The decompressed RFC 822 bytes."""
+        return zlib.decompress(bytes(self.raw))
+
+
+class RawEmailRepository:
+    """Repository for storing raw emails and tracking their parse status."""
+
+    @staticmethod
+    def store_messages(messages, source, mailbox=None):
+        """
+        Store raw messages that are not stored yet.
+
+        A message is already stored if a row has the same Message-ID or the
+        same SHA-256 of its bytes. Uses a fixed number of queries per call.
+
+        Args:
+            messages (list): (raw message bytes, email data dict) pairs; pairs
+                whose bytes are None are skipped.
+            source (str): Where the messages came from: imap, upload or archive.
+            mailbox (str): Mailbox label, for IMAP messages.
+
+        Returns:
+            list: The RawEmail for each message (new or existing, None if
+            skipped), in input order.
+        """
+        keyed = []
+        for raw_message, email_data in messages:
+            if raw_message is None:
+                keyed.append((None, None))
+                continue
+            message_id = (email_data.get('message_id') or '').strip()[:255] or None
+            keyed.append((hashlib.sha256(raw_message).hexdigest(), message_id))
+
+        hashes = {content_hash for content_hash, _ in keyed if content_hash}
+        message_ids = {message_id for _, message_id in keyed if message_id}
+        if not hashes:
+            return [None] * len(keyed)
+
+        def existing():
+            found = {}
+            rows = RawEmail.objects.filter(
+                models.Q(content_hash__in=hashes) | models.Q(message_id__in=message_ids)
+            ).defer('raw')
+            for row in rows:
+                found[row.content_hash] = row
+                if row.message_id:
+                    found[row.message_id] = row
+            return found
+
+        found = existing()
+        new_rows = []
+        seen = set(found)
+        for (raw_message, email_data), (content_hash, message_id) in zip(messages, keyed):
+            if content_hash is None or content_hash in seen or message_id in seen:
+                continue
+            seen.update(key for key in (content_hash, message_id) if key)
+            new_rows.append(RawEmail(
+                message_id=message_id,
+                email_id=(email_data.get('id') or '')[:255] or None,
+                content_hash=content_hash,
+                raw=RawEmail.compress(raw_message),
+                size=len(raw_message),
+                source=source,
+                mailbox=mailbox,
+                uid=email_data.get('uid'),
+                sender=(email_data.get('from') or '')[:255],
+                subject=(email_data.get('subject') or '')[:500],
+                sent_at=_sent_at(email_data.get('date'))
+            ))
+
+        if new_rows:
+            # Rows written concurrently by another sync are skipped, then read back below
+            RawEmail.objects.bulk_create(new_rows, batch_size=500, ignore_conflicts=True)
+            found = existing()
+            logger.info(f"Stored {len(new_rows)} raw emails from {source}")
+
+        return [
+            (found.get(content_hash) or found.get(message_id)) if content_hash else None
+            for content_hash, message_id in keyed
+        ]
+
+    @staticmethod
+    def record_parse_results(raw_emails, results, parser_version=None):
+        """
+        Save the outcome of parsing stored emails.
+
+        Args:
+            raw_emails (list): RawEmail rows (or None to skip an item).
+            results (list): Results of core.ingest.ingest_emails, aligned with raw_emails.
+            parser_version (str): Version of the parser that produced the results.
+        """
+        now = timezone.now()
+        rows = {}
+        for raw_email, result in zip(raw_emails, results):
+            if raw_email is None:
+                continue
+            if result['error']:
+                raw_email.parse_status = ParseStatus.FAILED
+            elif result['transaction']:
+                raw_email.parse_status = ParseStatus.PARSED
+            else:
+                raw_email.parse_status = ParseStatus.UNPARSED
+            raw_email.parse_error = result['error']
+            raw_email.parser_version = parser_version
+            raw_email.parsed_at = now
+            if result.get('stored_id'):
+                raw_email.transaction_id = result['stored_id']
+            rows[raw_email.pk] = raw_email
+
+        if rows:
+            RawEmail.objects.bulk_update(
+                rows.values(),
+                ['parse_status', 'parse_error', 'parser_version', 'parsed_at', 'transaction'],
+                batch_size=500
+            )
+
 
-# Create your models here.
+def _sent_at(date_header):
+    """Parse a Date header into an aware datetime, or None."""
+    try:
+        sent_at = parsedate_to_datetime(date_header)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if timezone.is_naive(sent_at):
+        sent_at = timezone.make_aware(sent_at, datetime.timezone.utc)
+    return sent_at
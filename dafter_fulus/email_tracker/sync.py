@@ -0,0 +1,283 @@
+"""
+Incremental mailbox sync: fetch only messages above the stored UID watermark.
+"""
+
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+
+from money_tracker_app.ingest import ingest_emails
+from money_tracker_app.metrics import timed
+from money_tracker_app.parse_cache import get_parse_cache
+
+from .imap import MailboxClient, message_to_email_data
+from .models import MailboxSyncState, RawEmailRepository
+
+logger = logging.getLogger(__name__)
+
+
+def mailbox_label(mailbox):
+    """Return a short ``user@host/folder`` label for a mailbox."""
+    return f"{mailbox['username']}@{mailbox['host']}/{mailbox.get('folder') or 'INBOX'}"
+
+
+def _filter_values(values):
+    """Normalise a sender or subject filter the way MailboxClient does."""
+    return {value.strip().lower() for value in values or [] if value.strip()}
+
+
+def matches_daemon_search(mailbox, unread_only=False):
+    """
+    Whether a search of a mailbox finds every message its background sync would.
+
+    The watermark of a folder is shared with the sync_mailboxes daemon, so it
+    may only move past UIDs when the search was at least as broad as the
+    daemon's: every unseen and seen message, with sender and subject filters
+    that keep everything the daemon's filters keep.
+
+    Args:
+        mailbox (dict): Mailbox settings, with the filters used for the search.
+        unread_only (bool): Whether the search was limited to unseen messages.
+
+    Returns:
+        bool: True if skipping the searched UIDs loses nothing the daemon would fetch.
+    """
+    if unread_only:
+        return False
+    folder = mailbox.get('folder') or 'INBOX'
+    daemon = next(
+        (
+            configured for configured in settings.MAILBOXES
+            if (configured['host'], configured['username'], configured.get('folder') or 'INBOX')
+            == (mailbox['host'], mailbox['username'], folder)
+        ),
+        {}
+    )
+    for key, default in (('bank_email_addresses', settings.BANK_EMAIL_ADDRESSES),
+                         ('bank_email_subjects', settings.BANK_EMAIL_SUBJECTS)):
+        used = _filter_values(mailbox.get(key, default))
+        wanted = _filter_values(daemon.get(key, default))
+        # No filter keeps everything; otherwise every value the daemon filters on must be in use
+        if used and not (wanted and wanted <= used):
+            return False
+    return True
+
+
+class MailboxSync:
+    """
+    One incremental sync of a mailbox folder, split into steps.
+
+    The network steps (open, fetch_batch, close) and the database steps
+    (load_state, ingest_batch, save_state) are separate so that the asyncio
+    engine can run them on different threads; sync_mailbox runs them in order.
+    """
+
+    def __init__(self, mailbox, parser, batch_size=None, connection_factory=None, timeout=None):
+        """
+        Args:
+            mailbox (dict): Mailbox settings (host, port, username, password, use_ssl, folder).
+            parser: ParseExecutor, or any object with a ``parse_email(email_data)`` method.
+            batch_size (int): Messages per FETCH and per database write.
+            connection_factory (callable): Passed to MailboxClient.
+            timeout (float): Socket timeout for the IMAP connection.
+        """
+        self.mailbox = mailbox
+        self.parser = parser
+        self.batch_size = batch_size or settings.FETCH_BATCH_SIZE
+        self.folder = mailbox.get('folder') or 'INBOX'
+        self.client = MailboxClient(
+            host=mailbox['host'],
+            port=mailbox.get('port', 993),
+            username=mailbox['username'],
+            password=mailbox.get('password', ''),
+            use_ssl=mailbox.get('use_ssl', True),
+            bank_email_addresses=mailbox.get('bank_email_addresses', settings.BANK_EMAIL_ADDRESSES),
+            bank_email_subjects=mailbox.get('bank_email_subjects', settings.BANK_EMAIL_SUBJECTS),
+            connection_factory=connection_factory,
+            timeout=timeout
+        )
+        self.state = None
+        self.stats = {
+            'candidates': 0, 'fetched': 0, 'parsed': 0, 'created': 0, 'duplicates': 0, 'errors': 0, 'hits': 0
+        }
+
+    def load_state(self):
+        """Load (or create) the stored watermark."""
+        self.state, _ = MailboxSyncState.objects.get_or_create(
+            host=self.mailbox['host'],
+            username=self.mailbox['username'],
+            folder=self.folder
+        )
+
+    def open(self, unread_only=False):
+        """
+        Connect, select the folder and search for new candidates.
+
+        Args:
+            unread_only (bool): Only consider unseen messages.
+
+        Returns:
+            list: Batches of candidate UIDs above the watermark.
+        """
+        self.client.connect()
+        uidvalidity = self.client.select(self.folder)
+        if self.state.uidvalidity != uidvalidity:
+            if self.state.uidvalidity is not None:
+                logger.info(f"UIDVALIDITY of {self.state} changed, resyncing folder")
+            self.state.uidvalidity = uidvalidity
+            self.state.last_uid = 0
+
+        uids = self.client.search_uids(self.state.last_uid, unread_only)
+        self.stats['candidates'] = len(uids)
+        return [uids[start:start + self.batch_size] for start in range(0, len(uids), self.batch_size)]
+
+    def fetch_batch(self, batch):
+        """
+        Download the bank emails of one batch.
+
+        Returns:
+            list: (uid, raw message bytes) pairs.
+        """
+        with timed('imap_fetch'):
+            messages = self.client.fetch_bank_emails(batch)
+        self.stats['fetched'] += len(messages)
+        return messages
+
+    def ingest_batch(self, batch, messages, save=True, advance=True):
+        """
+        Parse and persist one batch, then advance the watermark past it.
+
+        Args:
+            batch (list): UIDs of the batch.
+            messages (list): Output of fetch_batch for the batch.
+            save (bool): Persist transactions, raw emails and parse cache
+                entries and advance the watermark; when False the batch is
+                only parsed, and fetched again by the next sync.
+            advance (bool): Advance the watermark when saving; False for a
+                search narrower than the daemon's (see matches_daemon_search).
+
+        Returns:
+            tuple: (email data dicts, ingest_emails statistics) of the batch.
+        """
+        emails = [message_to_email_data(raw_message, uid, self.folder) for uid, raw_message in messages]
+        raw_emails = []
+        if save and settings.ARCHIVE_RAW_EMAILS:
+            raw_emails = RawEmailRepository.store_messages(
+                [(raw_message, email_data) for (_, raw_message), email_data in zip(messages, emails)],
+                'imap',
+                mailbox=mailbox_label(self.mailbox)
+            )
+        # Even a lookup writes to the parse cache (it marks entries used), so a preview skips it
+        stats = ingest_emails(emails, self.parser, cache=get_parse_cache() if save else None, save=save)
+        RawEmailRepository.record_parse_results(raw_emails, stats['results'], getattr(self.parser, 'version', None))
+        for field in ('parsed', 'created', 'duplicates', 'errors', 'hits'):
+            self.stats[field] += stats[field]
+
+        if save and advance:
+            self.state.last_uid = batch[-1]
+            self.state.save()
+        return emails, stats
+
+    def close(self, logout=True):
+        """Log out of the server, or with ``logout=False`` just drop the connection."""
+        self.client.disconnect(logout)
+
+    def abort(self):
+        """Unblock a network step running in another thread; see MailboxClient.abort."""
+        self.client.abort()
+
+    def save_state(self, error=None):
+        """
+        Record the outcome and traffic counters of this sync.
+
+        Args:
+            error (Exception): Error that ended the sync, if any.
+        """
+        self.stats.update(self.client.stats)
+        if error is None:
+            self.state.last_synced_at = timezone.now()
+            self.state.last_error = None
+            logger.info(f"Synced {self.state}: {self.stats}")
+        else:
+            self.state.last_error = str(error) or error.__class__.__name__
+        self.state.messages_fetched += self.stats['fetched']
+        self.state.round_trips += self.client.stats['round_trips']
+        self.state.bytes_received += self.client.stats['bytes_received']
+        self.state.save()
+
+
+def sync_mailbox(mailbox, parser, batch_size=None, connection_factory=None):
+    """
+    Sync one mailbox folder from its watermark and persist parsed transactions.
+
+    The watermark is saved after every batch, so an interrupted sync resumes
+    where it stopped instead of rescanning the folder.
+
+    Args:
+        mailbox (dict): Mailbox settings (host, port, username, password, use_ssl, folder).
+        parser: Object with a ``parse_email(email_data)`` method.
+        batch_size (int): Messages per FETCH and per database write.
+        connection_factory (callable): Passed to MailboxClient.
+
+    Returns:
+        dict: Counts of candidate, fetched, parsed, created, duplicate,
+        unparseable and parse-cache-hit messages, plus the IMAP round trips
+        and bytes received.
+    """
+    sync = MailboxSync(mailbox, parser, batch_size=batch_size, connection_factory=connection_factory)
+    sync.load_state()
+    error = None
+    try:
+        for batch in sync.open():
+            sync.ingest_batch(batch, sync.fetch_batch(batch))
+        return sync.stats
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        sync.close()
+        sync.save_state(error)
+
+
+def fetch_mailbox(mailbox, parser, save=True, unread_only=False, connection_factory=None):
+    """
+    Fetch and parse the new bank emails of one mailbox folder, keeping every result.
+
+    Like sync_mailbox, only messages above the stored watermark are
+    downloaded, but the emails and per-email results are returned for
+    display. The watermark only moves when the search was as broad as the
+    daemon's; a narrower one saves its transactions and leaves the skipped
+    messages to the next full sync. Without ``save`` only the sync state's
+    traffic counters and outcome are written.
+
+    Args:
+        mailbox (dict): Mailbox settings (host, port, username, password, use_ssl, folder).
+        parser: Object with a ``parse_email(email_data)`` method.
+        save (bool): Persist transactions and advance the watermark.
+        unread_only (bool): Only consider unseen messages; never advances the watermark.
+        connection_factory (callable): Passed to MailboxClient.
+
+    Returns:
+        tuple: (email data dicts, statistics); the statistics are those of
+        sync_mailbox plus ``messages`` and the per-email ``results`` of
+        ingest_emails.
+    """
+    sync = MailboxSync(mailbox, parser, connection_factory=connection_factory)
+    sync.load_state()
+    advance = matches_daemon_search(mailbox, unread_only)
+    emails = []
+    results = []
+    error = None
+    try:
+        for batch in sync.open(unread_only):
+            batch_emails, stats = sync.ingest_batch(batch, sync.fetch_batch(batch), save=save, advance=advance)
+            emails.extend(batch_emails)
+            results.extend(stats['results'])
+        return emails, dict(sync.stats, messages=len(emails), results=results)
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        sync.close()
+        sync.save_state(error)
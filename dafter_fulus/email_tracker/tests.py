@@ -1,3 +1,598 @@
-from django.test import TestCase
+import io
+import re
+import shlex
+import threading
+import zipfile
+from email.message import EmailMessage
+from email.parser import BytesHeaderParser
 
-# Create your tests here.
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from money_tracker_app.models import ParseBatch, ParseCacheEntry, Transaction, TransactionRepository
+from money_tracker_app.parsing import ParseExecutor
+
+from .archive import import_archive, iter_mbox, reparse_raw_emails
+from . import engine
+from .engine import start_background_sync, sync_all
+from .models import MailboxSyncState, ParseStatus, RawEmail, RawEmailRepository
+from .sync import sync_mailbox
+
+MAILBOX = {
+    'host': 'imap.test',
+    'port': 993,
+    'username': 'alerts@example.com',
+    'password': 'secret',
+    'use_ssl': True,
+    'folder': 'INBOX',
+}
+
+
+class FakeIMAPServer:
+    """In-process stand-in for an IMAP server, keyed by folder name."""
+
+    def __init__(self, uidvalidity=1):
+        self.uidvalidity = uidvalidity
+        self.folders = {}
+        self.fetched_uids = []
+        self.header_uids = []
+        self.seen = set()
+
+    def add_message(self, folder, reference, amount, sender='bankmuscat@bankmuscat.com', subject=None):
+        messages = self.folders.setdefault(folder, {})
+        uid = max(messages, default=0) + 1
+        message = EmailMessage()
+        message['From'] = sender
+        message['Subject'] = subject or f'Transaction alert {reference}'
+        message['Message-ID'] = f'<{reference}@bank.test>'
+        message.set_content(f'Account: 0001 Reference: {reference} Amount: {amount}')
+        messages[uid] = message.as_bytes()
+        return uid
+
+    def __call__(self, host, port):
+        return FakeIMAPConnection(self)
+
+
+class FakeIMAPConnection:
+    """imaplib-compatible connection to a FakeIMAPServer."""
+
+    def __init__(self, server):
+        self.server = server
+        self.messages = None
+
+    def login(self, username, password):
+        return 'OK', [b'Logged in']
+
+    def logout(self):
+        return 'BYE', [b'Logging out']
+
+    def select(self, mailbox, readonly=False):
+        self.messages = self.server.folders.get(mailbox.strip('"'), {})
+        return 'OK', [str(len(self.messages)).encode()]
+
+    def response(self, code):
+        return code, [str(self.server.uidvalidity).encode()]
+
+    def uid(self, command, *args):
+        if command == 'SEARCH':
+            tokens = shlex.split(args[1])
+            uids = [uid for uid in sorted(self.messages) if self._matches(list(tokens), uid)]
+            # Like a real server, "n:*" also matches the highest UID
+            if self.messages and not uids and tokens[:1] == ['UID'] and len(tokens) == 2:
+                uids = [max(self.messages)]
+            return 'OK', [' '.join(str(uid) for uid in uids).encode()]
+        if command == 'FETCH':
+            headers_only = 'HEADER' in args[1]
+            data = []
+            for uid in self._uids(args[0]):
+                raw = self.messages[uid]
+                if headers_only:
+                    self.server.header_uids.append(uid)
+                    raw = re.split(rb'\r?\n\r?\n', raw, maxsplit=1)[0] + b'\n\n'
+                else:
+                    self.server.fetched_uids.append(uid)
+                data.append((f'{uid} (UID {uid} BODY[] {{{len(raw)}}}'.encode(), raw))
+                data.append(b')')
+            return 'OK', data
+        raise AssertionError(f'Unexpected command {command}')
+
+    def _uids(self, sequence_set):
+        uids = []
+        for part in sequence_set.split(','):
+            low, _, high = part.partition(':')
+            high = max(self.messages) if high == '*' else int(high or low)
+            uids.extend(uid for uid in range(int(low), high + 1) if uid in self.messages)
+        return uids
+
+    def _matches(self, tokens, uid):
+        while tokens:
+            if not self._key(tokens, uid):
+                return False
+        return True
+
+    def _key(self, tokens, uid):
+        key = tokens.pop(0)
+        if key == 'OR':
+            first = self._key(tokens, uid)
+            second = self._key(tokens, uid)
+            return first or second
+        if key == 'UID':
+            return uid in self._uids(tokens.pop(0))
+        if key == 'UNSEEN':
+            return uid not in self.server.seen
+        headers = BytesHeaderParser().parsebytes(self.messages[uid])
+        value = tokens.pop(0).lower()
+        return value in str(headers[key.capitalize()]).lower()
+
+
+class StubParser:
+    """Parses the one-line bodies written by FakeIMAPServer.add_message."""
+
+    def parse_email(self, email_data):
+        words = email_data['body'].split()
+        fields = dict(zip(words[0::2], words[1::2]))
+        return {
+            'account_number': fields['Account:'],
+            'transaction_id': fields['Reference:'],
+            'amount': float(fields['Amount:']),
+            'transaction_type': 'income',
+            'date_time': '2024-01-01T10:00:00+00:00',
+            'email_id': email_data['id'],
+        }
+
+
+class VersionedStubParser(StubParser):
+    """StubParser with a version, so its results go through the parse cache."""
+    version = 'stub-1'
+
+
+class SyncMailboxTests(TestCase):
+    def setUp(self):
+        self.server = FakeIMAPServer()
+        self.parser = StubParser()
+
+    def sync(self, batch_size=2):
+        return sync_mailbox(MAILBOX, self.parser, batch_size=batch_size, connection_factory=self.server)
+
+    def test_first_sync_fetches_everything_and_stores_watermark(self):
+        for reference in ('R1', 'R2', 'R3'):
+            self.server.add_message('INBOX', reference, 10)
+
+        stats = self.sync()
+
+        self.assertEqual(stats['fetched'], 3)
+        self.assertEqual(stats['created'], 3)
+        self.assertEqual(Transaction.objects.count(), 3)
+        state = MailboxSyncState.objects.get()
+        self.assertEqual(state.last_uid, 3)
+        self.assertEqual(state.uidvalidity, 1)
+        self.assertIsNotNone(state.last_synced_at)
+
+    def test_restart_resumes_from_watermark(self):
+        self.server.add_message('INBOX', 'R1', 10)
+        self.server.add_message('INBOX', 'R2', 20)
+        self.sync()
+        self.server.fetched_uids.clear()
+
+        new_uid = self.server.add_message('INBOX', 'R3', 30)
+        stats = self.sync()
+
+        self.assertEqual(self.server.fetched_uids, [new_uid])
+        self.assertEqual(stats['created'], 1)
+        self.assertEqual(MailboxSyncState.objects.get().last_uid, new_uid)
+
+    def test_no_new_messages_fetches_nothing(self):
+        self.server.add_message('INBOX', 'R1', 10)
+        self.sync()
+        self.server.fetched_uids.clear()
+
+        stats = self.sync()
+
+        self.assertEqual(self.server.fetched_uids, [])
+        self.assertEqual(stats['fetched'], 0)
+
+    def test_uidvalidity_change_resyncs_folder(self):
+        self.server.add_message('INBOX', 'R1', 10)
+        self.sync()
+        self.server.uidvalidity = 2
+        self.server.fetched_uids.clear()
+
+        stats = self.sync()
+
+        self.assertEqual(self.server.fetched_uids, [1])
+        self.assertEqual(stats['duplicates'], 1)
+        self.assertEqual(MailboxSyncState.objects.get().uidvalidity, 2)
+
+    def test_filters_are_searched_server_side_and_bodies_fetched_only_for_matches(self):
+        self.server.add_message('INBOX', 'R1', 10)
+        self.server.add_message('INBOX', 'N1', 0, sender='news@shop.test', subject='Weekly deals')
+        self.server.add_message('INBOX', 'N2', 0, subject='Your statement is ready')
+        self.server.add_message('INBOX', 'N3', 0, sender='bankmuscat@bankmuscat.com.evil.test')
+        self.server.add_message('INBOX', 'R2', 20)
+
+        stats = self.sync(batch_size=10)
+
+        # N1 and N2 never leave the server; N3 passes the substring SEARCH but not the header check
+        self.assertEqual(self.server.header_uids, [1, 4, 5])
+        self.assertEqual(self.server.fetched_uids, [1, 5])
+        self.assertEqual(stats['candidates'], 3)
+        self.assertEqual(stats['created'], 2)
+        # login, select, search, one header fetch, one body fetch, logout
+        self.assertEqual(stats['round_trips'], 6)
+        self.assertGreater(stats['bytes_received'], 0)
+        state = MailboxSyncState.objects.get()
+        self.assertEqual(state.last_uid, 5)
+        self.assertEqual(state.round_trips, 6)
+
+
+class FetchEmailsViewTests(TestCase):
+    def setUp(self):
+        self.server = FakeIMAPServer()
+        for reference in ('R1', 'R2'):
+            self.server.add_message('INBOX', reference, 10)
+        self.form = {
+            'email_host': 'imap.test', 'email_port': 993, 'email_username': 'alerts@example.com',
+            'email_password': 'secret', 'email_use_ssl': 'on', 'bank_email_addresses': 'bankmuscat@bankmuscat.com',
+            'bank_email_subjects': 'transaction,alert,notification', 'folder': 'INBOX', 'save_to_db': 'on'
+        }
+        self.parser = StubParser()
+
+    def fetch(self, **fields):
+        with mock.patch('email_tracker.imap.imaplib.IMAP4_SSL', lambda host, port, timeout=None: self.server(host, port)), \
+                mock.patch('money_tracker_app.views.get_parse_executor', return_value=self.parser):
+            return self.client.post(reverse('fetch_emails'), dict(self.form, **fields), follow=True)
+
+    def test_fetch_downloads_only_messages_above_the_watermark(self):
+        self.fetch()
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(MailboxSyncState.objects.get().last_uid, 2)
+
+        self.server.add_message('INBOX', 'R3', 10)
+        self.fetch()
+
+        self.assertEqual(self.server.fetched_uids, [1, 2, 3])
+        self.assertEqual(Transaction.objects.count(), 3)
+        self.assertContains(self.fetch(), 'No new bank emails found')
+        self.assertEqual(self.server.fetched_uids, [1, 2, 3])
+
+    def test_preview_leaves_the_watermark(self):
+        self.parser = VersionedStubParser()
+        response = self.fetch(save_to_db='')
+
+        self.assertRedirects(response, reverse('batch_results', args=[ParseBatch.objects.get().pk]))
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(RawEmail.objects.exists())
+        self.assertFalse(ParseCacheEntry.objects.exists())
+        self.assertEqual(MailboxSyncState.objects.get().last_uid, 0)
+
+        self.fetch()
+        self.assertEqual(Transaction.objects.count(), 2)
+
+    def test_narrower_fetch_leaves_the_watermark(self):
+        # R1 has been read, R2 has not
+        self.server.seen.add(1)
+        self.fetch(unread_only='on')
+
+        self.assertEqual(list(Transaction.objects.values_list('transaction_id', flat=True)), ['R2'])
+        self.assertEqual(MailboxSyncState.objects.get().last_uid, 0)
+
+        self.fetch(bank_email_subjects='alert')
+        self.assertEqual(MailboxSyncState.objects.get().last_uid, 0)
+
+        self.fetch()
+        self.assertEqual(Transaction.objects.count(), 2)
+        self.assertEqual(MailboxSyncState.objects.get().last_uid, 2)
+
+
+class FlakyFactory:
+    """Connection factory that refuses the first ``failures`` connections."""
+
+    def __init__(self, server, failures):
+        self.server = server
+        self.failures = failures
+
+    def __call__(self, host, port):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError('Connection refused')
+        return self.server(host, port)
+
+
+class FakeSocket:
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def shutdown(self, how):
+        self.closed.set()
+
+
+class HangingIMAPConnection(FakeIMAPConnection):
+    """Connection whose body FETCH blocks until the socket is shut down, recording every call."""
+
+    def __init__(self, server):
+        super().__init__(server)
+        self.sock = FakeSocket()
+        self.calls = []
+        self.in_use = threading.Lock()
+        self.overlapped = False
+
+    def _call(self, name, method, *args):
+        if not self.in_use.acquire(blocking=False):
+            self.overlapped = True
+            return method(*args)
+        try:
+            self.calls.append(name)
+            return method(*args)
+        finally:
+            self.in_use.release()
+
+    def uid(self, command, *args):
+        return self._call(command, self._uid, command, *args)
+
+    def _uid(self, command, *args):
+        if command == 'FETCH' and 'HEADER' not in args[1]:
+            self.sock.closed.wait(5)
+            raise OSError('socket closed')
+        return super().uid(command, *args)
+
+    def logout(self):
+        return self._call('LOGOUT', super().logout)
+
+    def shutdown(self):
+        self._call('SHUTDOWN', lambda: None)
+
+
+class SyncAllTests(TransactionTestCase):
+    def setUp(self):
+        self.server = FakeIMAPServer()
+        self.parser = StubParser()
+
+    def sync_all(self, mailboxes, connection_factory, retries=0):
+        return async_to_sync(sync_all)(
+            mailboxes, self.parser, concurrency=2, timeout=30, retries=retries, backoff=0,
+            batch_size=2, connection_factory=connection_factory
+        )
+
+    def test_syncs_every_folder(self):
+        for reference in ('R1', 'R2', 'R3'):
+            self.server.add_message('INBOX', reference, 10)
+        self.server.add_message('Archive', 'A1', 5)
+        mailboxes = [MAILBOX, dict(MAILBOX, folder='Archive')]
+
+        results = self.sync_all(mailboxes, self.server)
+
+        self.assertEqual(results['alerts@example.com@imap.test/INBOX']['created'], 3)
+        self.assertEqual(results['alerts@example.com@imap.test/Archive']['created'], 1)
+        self.assertEqual(Transaction.objects.count(), 4)
+        self.assertEqual(
+            dict(MailboxSyncState.objects.values_list('folder', 'last_uid')),
+            {'INBOX': 3, 'Archive': 1}
+        )
+
+    def test_failed_target_is_retried(self):
+        self.server.add_message('INBOX', 'R1', 10)
+
+        results = self.sync_all([MAILBOX], FlakyFactory(self.server, failures=1), retries=1)
+
+        self.assertEqual(results['alerts@example.com@imap.test/INBOX']['created'], 1)
+        self.assertIsNone(MailboxSyncState.objects.get().last_error)
+
+    def test_gives_up_after_retries(self):
+        results = self.sync_all([MAILBOX], FlakyFactory(self.server, failures=5), retries=1)
+
+        self.assertEqual(results, {'alerts@example.com@imap.test/INBOX': {'error': 'Connection refused'}})
+        self.assertEqual(MailboxSyncState.objects.get().last_error, 'Connection refused')
+
+    def test_timeout_mid_fetch_drops_the_connection_once_the_fetch_returns(self):
+        self.server.add_message('INBOX', 'R1', 10)
+        connections = []
+
+        def connect(host, port):
+            connections.append(HangingIMAPConnection(self.server))
+            return connections[-1]
+
+        results = async_to_sync(sync_all)(
+            [MAILBOX], self.parser, timeout=0.2, retries=0, backoff=0, connection_factory=connect
+        )
+
+        self.assertEqual(results, {'alerts@example.com@imap.test/INBOX': {'error': 'TimeoutError'}})
+        connection = connections[0]
+        self.assertTrue(connection.sock.closed.is_set())
+        self.assertEqual(connection.calls, ['SEARCH', 'FETCH', 'FETCH', 'SHUTDOWN'])
+        self.assertFalse(connection.overlapped)
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(MailboxSyncState.objects.get().last_uid, 0)
+
+    def test_background_sync_runs_one_at_a_time(self):
+        self.server.add_message('INBOX', 'R1', 10)
+        release = threading.Event()
+
+        def connect(host, port):
+            release.wait(5)
+            return self.server(host, port)
+
+        self.assertTrue(start_background_sync([MAILBOX], self.parser, retries=0, connection_factory=connect))
+        self.assertFalse(start_background_sync([MAILBOX], self.parser, retries=0, connection_factory=connect))
+        release.set()
+        engine._background_sync.join(5)
+
+        self.assertEqual(Transaction.objects.count(), 1)
+        self.assertIsNotNone(MailboxSyncState.objects.get().last_synced_at)
+
+    @override_settings(MAILBOXES=[MAILBOX])
+    def test_view_starts_the_sync_and_returns(self):
+        with mock.patch('email_tracker.views.get_parse_executor', return_value=self.parser), \
+                mock.patch('email_tracker.views.start_background_sync', side_effect=[True, False]) as start:
+            started = self.client.post(reverse('sync_mailboxes'), follow=True)
+            running = self.client.post(reverse('sync_mailboxes'), follow=True)
+
+        start.assert_called_with([MAILBOX], self.parser)
+        self.assertContains(started, 'Mailbox sync started')
+        self.assertContains(running, 'already running')
+
+
+def alert(reference, amount, body_extra=''):
+    message = EmailMessage()
+    message['From'] = 'bankmuscat@bankmuscat.com'
+    message['Subject'] = f'Transaction alert {reference}'
+    message['Message-ID'] = f'<{reference}@bank.test>'
+    message.set_content(f'Account: 0001 Reference: {reference} Amount: {amount}{body_extra}')
+    return message.as_bytes()
+
+
+def mbox(*messages):
+    quoted = [re.sub(rb'(?m)^From ', b'>From ', message) for message in messages]
+    return b''.join(b'From MAILER-DAEMON Mon Jan  1 10:00:00 2024\n' + message + b'\n' for message in quoted)
+
+
+class ArchiveImportTests(TestCase):
+    def setUp(self):
+        self.executor = ParseExecutor(StubParser, workers=1)
+
+    def test_mbox_is_streamed_message_by_message(self):
+        data = mbox(alert('R1', 10, '\nFrom the bank'), alert('R2', 20), alert('R3', 30))
+
+        messages = list(iter_mbox(io.BytesIO(data)))
+
+        self.assertEqual([m['Message-ID'] for m in messages], ['<R1@bank.test>', '<R2@bank.test>', '<R3@bank.test>'])
+        self.assertIn('\nFrom the bank', messages[0].get_content())
+
+    def test_import_mbox_in_batches(self):
+        progress = []
+        data = mbox(*(alert(f'R{i}', i) for i in range(5)), alert('R0', 0))
+
+        stats = import_archive(
+            io.BytesIO(data), self.executor, name='export.mbox', batch_size=2,
+            progress=lambda stats: progress.append(stats['messages'])
+        )
+
+        self.assertEqual(progress, [2, 4, 6])
+        self.assertEqual((stats['messages'], stats['created'], stats['duplicates']), (6, 5, 1))
+        self.assertEqual(Transaction.objects.count(), 5)
+
+    def test_import_zip_of_eml_files(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('alerts/1.eml', alert('R1', 10))
+            archive.writestr('alerts/2.eml', alert('R2', 20))
+            archive.writestr('README.txt', 'not an email')
+        buffer.seek(0)
+
+        stats = import_archive(buffer, self.executor, name='alerts.bin')
+
+        self.assertEqual(stats['format'], 'zip')
+        self.assertEqual(stats['created'], 2)
+
+    def test_parse_errors_are_counted(self):
+        broken = EmailMessage()
+        broken.set_content('no transaction here')
+
+        stats = import_archive(io.BytesIO(mbox(alert('R1', 10), broken.as_bytes())), self.executor)
+
+        self.assertEqual((stats['format'], stats['created'], stats['errors']), ('mbox', 1, 1))
+
+    def test_dry_run_writes_nothing(self):
+        with ParseExecutor(VersionedStubParser, workers=1) as executor:
+            stats = import_archive(io.BytesIO(mbox(alert('R1', 10), alert('R2', 20))), executor, save=False)
+
+        self.assertEqual((stats['messages'], stats['parsed'], stats['created']), (2, 2, 0))
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(RawEmail.objects.exists())
+        self.assertFalse(ParseCacheEntry.objects.exists())
+
+    @override_settings(IMPORT_UPLOAD_MAX_BYTES=100)
+    def test_view_sends_large_archives_to_the_command(self):
+        upload = SimpleUploadedFile('export.mbox', mbox(alert('R1', 10)))
+
+        response = self.client.post(reverse('parse_email'), {'source': 'archive', 'email_file': upload}, follow=True)
+
+        self.assertContains(response, 'manage.py import_emails')
+        self.assertFalse(RawEmail.objects.exists())
+
+
+def bank_muscat_alert(message_id, amount, reference):
+    message = EmailMessage()
+    message['From'] = 'bankmuscat@bankmuscat.com'
+    message['Subject'] = 'Account transaction'
+    message['Message-ID'] = f'<{message_id}@bank.test>'
+    message['Date'] = 'Tue, 02 Jan 2024 09:00:00 +0400'
+    message.set_content(f'Your account xxxx0123 has been debited with OMR {amount} on 02/01/2024. Ref No: {reference}')
+    return message.as_bytes()
+
+
+class RawEmailTests(TestCase):
+    def test_sync_stores_each_message_once_with_parse_status(self):
+        server = FakeIMAPServer()
+        server.add_message('INBOX', 'R1', 10)
+        uid = server.add_message('INBOX', 'N1', 0)
+        server.folders['INBOX'][uid] = server.folders['INBOX'][uid].replace(b' Amount: 0', b'')
+        sync_mailbox(MAILBOX, StubParser(), connection_factory=server)
+
+        # A new UIDVALIDITY refetches both messages, which are already stored
+        server.uidvalidity = 2
+        sync_mailbox(MAILBOX, StubParser(), connection_factory=server)
+
+        self.assertEqual(RawEmail.objects.count(), 2)
+        stored = RawEmail.objects.get(message_id='<R1@bank.test>')
+        self.assertEqual(stored.parse_status, ParseStatus.PARSED)
+        self.assertEqual(stored.transaction, Transaction.objects.get())
+        self.assertEqual(stored.raw_message, server.folders['INBOX'][1])
+        failed = RawEmail.objects.get(message_id='<N1@bank.test>')
+        self.assertEqual(failed.parse_status, ParseStatus.FAILED)
+        self.assertIn('Amount:', failed.parse_error)
+
+    def test_store_deduplicates_by_message_id_and_content(self):
+        first = bank_muscat_alert('a', '1.000', 'TX000001')
+        rewrapped = first.replace(b'\n', b'\r\n')
+        data = {'message_id': '<a@bank.test>'}
+
+        rows = RawEmailRepository.store_messages([(first, data), (rewrapped, data), (first, {})], 'archive')
+
+        self.assertEqual(RawEmail.objects.count(), 1)
+        self.assertEqual({row.pk for row in rows}, {RawEmail.objects.get().pk})
+
+    def test_reparse_recovers_failed_messages_and_upserts(self):
+        RawEmailRepository.store_messages(
+            [(bank_muscat_alert(index, f'{index}.500', f'TX00000{index}'), {'message_id': f'<{index}@bank.test>'})
+             for index in range(3)],
+            'archive'
+        )
+        RawEmail.objects.update(parse_status=ParseStatus.FAILED)
+
+        call_command('reparse', verbosity=0, stdout=io.StringIO())
+
+        self.assertEqual(Transaction.objects.count(), 3)
+        self.assertFalse(RawEmail.objects.exclude(parse_status=ParseStatus.PARSED).exists())
+        self.assertEqual(RawEmail.objects.filter(transaction__isnull=False).count(), 3)
+
+        # Simulate a transaction stored by a buggy parser
+        Transaction.objects.filter(transaction_id='TX000001').update(amount_minor=999000)
+        TransactionRepository.rebuild_rollups()
+        call_command('reparse', '--all', verbosity=0, stdout=io.StringIO())
+
+        self.assertEqual(Transaction.objects.count(), 3)
+        self.assertEqual(Transaction.objects.get(transaction_id='TX000001').amount_minor, 1500)
+        self.assertEqual(TransactionRepository.rebuild_rollups(dry_run=True), [])
+
+    def test_reparse_keeps_the_import_email_id(self):
+        seen = []
+
+        class RecordingParser(StubParser):
+            def parse_email(self, email_data):
+                seen.append(email_data['id'])
+                return super().parse_email(email_data)
+
+        without_id = EmailMessage()
+        without_id['From'] = 'bankmuscat@bankmuscat.com'
+        without_id.set_content('Account: 0001 Reference: R1 Amount: 10')
+        with ParseExecutor(RecordingParser, workers=1) as executor:
+            import_archive(io.BytesIO(mbox(without_id.as_bytes())), executor, name='export.mbox')
+            reparse_raw_emails(RawEmail.objects.all(), executor)
+
+        self.assertEqual(seen, ['export.mbox:0', 'export.mbox:0'])
+        self.assertEqual(RawEmail.objects.get().email_id, 'export.mbox:0')
@@ -0,0 +1,10 @@
+"""
+URL patterns for the email tracker app.
+"""
+
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('sync/', views.sync_mailboxes, name='sync_mailboxes'),
+]
@@ -1,3 +1,37 @@
-from django.shortcuts import render
+"""
+Views for the email tracker app.
+"""
 
-# Create your views here.
+import logging
+
+from django.conf import settings
+from django.contrib import messages
+from django.shortcuts import redirect
+
+from money_tracker_app.services import get_parse_executor
+
+from .engine import start_background_sync
+
+# Setup logging
+logger = logging.getLogger(__name__)
+
+def sync_mailboxes(request):
+    """
+    Start syncing every configured mailbox in the background and return at once.
+
+    A sync can take retries times FETCH_TIMEOUT per mailbox, far longer than
+    a request should. Progress is recorded on each mailbox's sync state.
+    """
+    if request.method != 'POST':
+        return redirect('index')
+
+    if not settings.MAILBOXES:
+        messages.error(request, 'No mailboxes configured. Set EMAIL_USERNAME and EMAIL_PASSWORD.')
+        return redirect('index')
+
+    if start_background_sync(settings.MAILBOXES, get_parse_executor()):
+        messages.success(request, 'Mailbox sync started. New transactions appear as each mailbox is synced.')
+    else:
+        messages.info(request, 'A mailbox sync is already running.')
+
+    return redirect('index')